@@ -0,0 +1,132 @@
+"""A script which keeps a compact cooldown state of sent plant alerts.
+
+The state maps (plant_id, error) to the last time an alert was sent, so
+checking for recent alerts is a single read however long the history is."""
+
+import json
+import sqlite3
+from math import isnan
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+from botocore.exceptions import ClientError
+from instrumentation import count_aws_response
+from utils import get_logger
+
+if TYPE_CHECKING:
+    from boto3 import client
+
+ALERT_COOLDOWN = timedelta(hours=1)
+STATE_TTL = timedelta(hours=24)
+DEFAULT_STATE_KEY = "alert_history/alert_state.json"
+
+
+def normalise_alert_key(plant_id, error) -> tuple:
+    """Returns the (plant_id, error) key used to index the alert state."""
+    if plant_id is None or (isinstance(plant_id, float) and isnan(plant_id)):
+        return None, str(error)
+    return int(plant_id), str(error)
+
+
+def state_to_records(state: dict) -> list[dict]:
+    """Converts an alert state into JSON serialisable records."""
+    return [{"plant_id": plant_id, "error": error,
+             "last_alert": last_alert.isoformat()}
+            for (plant_id, error), last_alert in state.items()]
+
+
+def records_to_state(records: list[dict]) -> dict:
+    """Converts alert state records back into an alert state."""
+    return {normalise_alert_key(record["plant_id"], record["error"]):
+            datetime.fromisoformat(record["last_alert"])
+            for record in records}
+
+
+def compact_state(state: dict, now: datetime, ttl: timedelta = STATE_TTL) -> dict:
+    """Drops alert state entries older than the TTL."""
+    return {key: last_alert for key, last_alert in state.items()
+            if now - last_alert < ttl}
+
+
+def was_recently_alerted(state: dict, plant_id, error, now: datetime,
+                         cooldown: timedelta = ALERT_COOLDOWN) -> bool:
+    """Returns whether an alert for this plant and error is still cooling down."""
+    last_alert = state.get(normalise_alert_key(plant_id, error))
+    return last_alert is not None and now - last_alert < cooldown
+
+
+def record_alerts(state: dict, alerts: list[tuple], now: datetime) -> dict:
+    """Returns a new alert state with the given (plant_id, error) alerts stamped."""
+    new_state = dict(state)
+    for plant_id, error in alerts:
+        new_state[normalise_alert_key(plant_id, error)] = now
+    return new_state
+
+
+class S3AlertState:
+    """Alert state stored as a single JSON object in AWS S3."""
+
+    def __init__(self, s3_client: "client", bucket: str, key: str = DEFAULT_STATE_KEY):
+        self.logger = get_logger()
+        self._s3_client = s3_client
+        self._bucket = bucket
+        self._key = key
+
+    def load(self) -> dict:
+        """Reads the alert state object, returning an empty state if missing."""
+        try:
+            file_obj = self._s3_client.get_object(
+                Bucket=self._bucket, Key=self._key)
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                self.logger.info("No previous alert state found in S3.")
+                return {}
+            raise
+        count_aws_response(file_obj)
+        records = json.loads(file_obj["Body"].read().decode("utf-8"))
+        self.logger.info("Loaded %s alert state records from S3.", len(records))
+        return records_to_state(records)
+
+    def save(self, state: dict) -> None:
+        """Overwrites the alert state object."""
+        count_aws_response(self._s3_client.put_object(
+            Bucket=self._bucket,
+            Key=self._key,
+            Body=json.dumps(state_to_records(state)),
+            ContentType="application/json"
+        ))
+        self.logger.info("Alert state saved to S3 (%s entries).", len(state))
+
+
+class SQLiteAlertState:
+    """Alert state stored in a local SQLite database, a stand-in for S3."""
+
+    def __init__(self, db_path: str = ":memory:"):
+        self.logger = get_logger()
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS alert_state (
+                plant_id INTEGER,
+                error TEXT NOT NULL,
+                last_alert TEXT NOT NULL,
+                PRIMARY KEY (plant_id, error)
+            )""")
+        self._conn.commit()
+
+    def load(self) -> dict:
+        """Reads every alert state row."""
+        rows = self._conn.execute(
+            "SELECT plant_id, error, last_alert FROM alert_state").fetchall()
+        self.logger.info("Loaded %s alert state records from SQLite.", len(rows))
+        return records_to_state([{"plant_id": plant_id, "error": error,
+                                  "last_alert": last_alert}
+                                 for plant_id, error, last_alert in rows])
+
+    def save(self, state: dict) -> None:
+        """Replaces the stored alert state."""
+        with self._conn:
+            self._conn.execute("DELETE FROM alert_state")
+            self._conn.executemany(
+                "INSERT INTO alert_state (plant_id, error, last_alert) VALUES (?, ?, ?)",
+                [(record["plant_id"], record["error"], record["last_alert"])
+                 for record in state_to_records(state)])
+        self.logger.info("Alert state saved to SQLite (%s entries).", len(state))
@@ -0,0 +1,190 @@
+"""A script which groups plant errors by responsible botanist and sends
+each botanist a digest email via AWS SES templated bulk sends."""
+
+import json
+import time
+from functools import lru_cache
+from os import environ as ENV
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+from botocore.exceptions import ClientError
+from alert_state import normalise_alert_key
+from instrumentation import count, count_aws_response
+from utils import get_logger
+
+if TYPE_CHECKING:
+    from boto3 import client
+
+ALERT_TEMPLATE_NAME = "PlantHealthAlertDigest"
+MAX_BULK_DESTINATIONS = 50  # SES limit per SendBulkTemplatedEmail call
+
+ALERT_TEMPLATE = {
+    "TemplateName": ALERT_TEMPLATE_NAME,
+    "SubjectPart": "Plant Health Alert - {{error_count}} Attention Required",
+    "TextPart": ("Hi {{botanist_name}}, {{error_count}} of your plant readings "
+                 "triggered alerts as of {{timestamp}}."),
+    "HtmlPart": """
+    <html>
+        <head>
+            <style>
+                body { font-family: Arial, sans-serif; }
+                .alert-table { border-collapse: collapse; width: 100%; }
+                .alert-table th, .alert-table td { border: 1px solid #ddd; padding: 8px; }
+                .alert-table th { background-color: #f2f2f2; text-align: left; }
+            </style>
+        </head>
+        <body>
+            <h2>Plant Health Alert</h2>
+            <p>Hi {{botanist_name}}, these readings triggered alerts as of
+            <strong>{{timestamp}}</strong>:</p>
+            <table class="alert-table">
+                <tr><th>plant_id</th><th>error</th></tr>
+                {{#each errors}}<tr><td>{{plant_id}}</td><td>{{error}}</td></tr>{{/each}}
+            </table>
+            <p>Please investigate these issues promptly.</p>
+        </body>
+    </html>
+    """
+}
+
+
+def create_db_connection():
+    """Returns a pyodbc connection based on .env variables.
+    pyodbc is imported here, and used instead of sqlalchemy, so the
+    lookup adds as little as possible to the alerter's cold start."""
+    import pyodbc  # pylint: disable=import-outside-toplevel
+    return pyodbc.connect(
+        f"DRIVER={ENV['DB_DRIVER']};"
+        f"SERVER={ENV['DB_HOST']},{ENV.get('DB_PORT', '1433')};"
+        f"DATABASE={ENV['DB_NAME']};"
+        f"UID={ENV['DB_USER']};"
+        f"PWD={ENV['DB_PASSWORD']};"
+        "TrustServerCertificate=yes;",
+        timeout=10)
+
+
+@lru_cache(maxsize=1)
+def get_botanist_lookup() -> dict:
+    """Returns a plant_id -> (botanist_name, email) lookup.
+    Cached so it is only loaded once per warm Lambda container."""
+    logger = get_logger()
+    query = """
+    SELECT DIM_plant.plant_id, botanist_name, email
+    FROM DIM_plant
+    JOIN DIM_botanist
+    ON DIM_plant.botanist_id = DIM_botanist.botanist_id
+    WHERE email IS NOT NULL;
+    """
+    conn = create_db_connection()
+    try:
+        count("db_round_trips")
+        rows = conn.cursor().execute(query).fetchall()
+    finally:
+        conn.close()
+    logger.info("Loaded botanist lookup for %s plants.", len(rows))
+    return {int(plant_id): (botanist_name, email)
+            for plant_id, botanist_name, email in rows}
+
+
+def get_current_plant_errors() -> list[dict]:
+    """Returns the plants whose latest reading is in error, from the
+    one-row-per-plant current state kept by the load step."""
+    logger = get_logger()
+    query = """
+    SELECT plant_id, error_msg
+    FROM CURRENT_plant_state
+    WHERE error_msg IS NOT NULL;
+    """
+    conn = create_db_connection()
+    try:
+        count("db_round_trips")
+        rows = conn.cursor().execute(query).fetchall()
+    finally:
+        conn.close()
+    logger.info("Loaded current errors for %s plants.", len(rows))
+    return [{"plant_id": int(plant_id), "error": error_msg} for plant_id, error_msg in rows]
+
+
+def group_errors_by_botanist(errors: list[dict], lookup: dict,
+                             fallback_email: str) -> dict:
+    """Groups error records by the email of the plant's botanist.
+    Plants without a known botanist go to the fallback email."""
+    digests = {}
+    for error in errors:
+        plant_id, error_msg = normalise_alert_key(
+            error.get("plant_id"), error.get("error"))
+        botanist_name, email = lookup.get(
+            plant_id, ("LNHM team", fallback_email))
+        digest = digests.setdefault(
+            email, {"botanist_name": botanist_name, "errors": []})
+        digest["errors"].append({"plant_id": plant_id, "error": error_msg})
+    return digests
+
+
+def ensure_alert_template(ses_client: "client") -> None:
+    """Creates the SES digest template if it does not already exist."""
+    logger = get_logger()
+    try:
+        ses_client.get_template(TemplateName=ALERT_TEMPLATE_NAME)
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") != "TemplateDoesNotExist":
+            raise
+        logger.info("Creating SES template %s...", ALERT_TEMPLATE_NAME)
+        ses_client.create_template(Template=ALERT_TEMPLATE)
+
+
+def batch_destinations(digests: dict, timestamp: str,
+                       batch_size: int = MAX_BULK_DESTINATIONS) -> list[list[dict]]:
+    """Returns SES bulk destinations, split into batches of batch_size."""
+    destinations = [{
+        "Destination": {"ToAddresses": [email]},
+        "ReplacementTemplateData": json.dumps({
+            "botanist_name": digest["botanist_name"],
+            "error_count": len(digest["errors"]),
+            "errors": digest["errors"],
+            "timestamp": timestamp
+        })
+    } for email, digest in digests.items()]
+    return [destinations[i:i + batch_size]
+            for i in range(0, len(destinations), batch_size)]
+
+
+def send_botanist_digests(ses_client: "client", digests: dict) -> set[str]:
+    """Sends each botanist their digest in bulk batches which respect the
+    SES send rate quota. Returns the emails whose digest was sent successfully;
+    a batch which SES rejects outright is logged and the rest still go out."""
+    logger = get_logger()
+    max_send_rate = ses_client.get_send_quota()["MaxSendRate"]
+    batch_size = max(1, min(MAX_BULK_DESTINATIONS, int(max_send_rate)))
+    timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M UTC')
+
+    sent = set()
+    next_send_at = time.monotonic()
+    for batch in batch_destinations(digests, timestamp, batch_size):
+        wait = next_send_at - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        next_send_at = time.monotonic() + len(batch) / max_send_rate
+
+        try:
+            response = ses_client.send_bulk_templated_email(
+                Source=ENV["SES_SOURCE_EMAIL"],
+                Template=ALERT_TEMPLATE_NAME,
+                DefaultTemplateData=json.dumps(
+                    {"botanist_name": "botanist", "error_count": 0,
+                     "errors": [], "timestamp": timestamp}),
+                Destinations=batch
+            )
+        except ClientError as exc:
+            logger.error("Failed to send a batch of %s digests: %s", len(batch), exc)
+            continue
+        count_aws_response(response)
+        for destination, status in zip(batch, response["Status"]):
+            email = destination["Destination"]["ToAddresses"][0]
+            if status["Status"] == "Success":
+                sent.add(email)
+            else:
+                logger.error("Failed to send digest to %s: %s",
+                             email, status.get("Error", status["Status"]))
+    logger.info("Sent %s of %s botanist digests.", len(sent), len(digests))
+    return sent
@@ -0,0 +1,87 @@
+"""An in-memory stand-in for the AWS SES client, used for local runs and tests."""
+
+import json
+import re
+from html import escape
+from itertools import count
+from botocore.exceptions import ClientError
+
+# pylint: disable=invalid-name
+
+EACH_BLOCK = re.compile(r"{{#each (\w+)}}(.*?){{/each}}", re.DOTALL)
+VARIABLE = re.compile(r"{{(\w+)}}")
+
+
+def render_template(template_part: str, data: dict) -> str:
+    """Renders the subset of SES handlebars syntax used by the alert template."""
+    def render_each(match: re.Match) -> str:
+        return "".join(render_template(match.group(2), item)
+                       for item in data.get(match.group(1), []))
+
+    rendered = EACH_BLOCK.sub(render_each, template_part)
+    return VARIABLE.sub(lambda match: escape(str(data.get(match.group(1), ""))),
+                        rendered)
+
+
+class LocalSESClient:
+    """Records templates and sent emails instead of calling AWS SES."""
+
+    def __init__(self, max_send_rate: float = 14.0, max_24_hour_send: float = 50000.0):
+        self.templates = {}
+        self.sent_emails = []
+        self.bulk_calls = 0
+        self._max_send_rate = max_send_rate
+        self._max_24_hour_send = max_24_hour_send
+        self._message_ids = count(1)
+
+    def get_send_quota(self) -> dict:
+        """Returns the configured sending quota."""
+        return {"Max24HourSend": self._max_24_hour_send,
+                "MaxSendRate": self._max_send_rate,
+                "SentLast24Hours": float(len(self.sent_emails))}
+
+    def get_template(self, TemplateName: str) -> dict:
+        """Returns a stored template, raising like SES when it is missing."""
+        if TemplateName not in self.templates:
+            raise ClientError({"Error": {"Code": "TemplateDoesNotExist",
+                                         "Message": TemplateName}}, "GetTemplate")
+        return {"Template": self.templates[TemplateName]}
+
+    def create_template(self, Template: dict) -> dict:
+        """Stores a template, raising like SES when it already exists."""
+        if Template["TemplateName"] in self.templates:
+            raise ClientError({"Error": {"Code": "AlreadyExists",
+                                         "Message": Template["TemplateName"]}},
+                              "CreateTemplate")
+        self.templates[Template["TemplateName"]] = Template
+        return {}
+
+    def send_bulk_templated_email(self, Source: str, Template: str,
+                                  DefaultTemplateData: str, Destinations: list) -> dict:
+        """Records one email per destination and returns a success status for each."""
+        if Template not in self.templates:
+            raise ClientError({"Error": {"Code": "TemplateDoesNotExist",
+                                         "Message": Template}}, "SendBulkTemplatedEmail")
+        if len(Destinations) > 50:
+            raise ClientError({"Error": {"Code": "InvalidParameterValue",
+                                         "Message": "Too many destinations."}},
+                              "SendBulkTemplatedEmail")
+        self.bulk_calls += 1
+        statuses = []
+        for destination in Destinations:
+            template_data = json.loads(destination.get(
+                "ReplacementTemplateData", DefaultTemplateData))
+            message_id = f"local-{next(self._message_ids)}"
+            self.sent_emails.append({
+                "Source": Source,
+                "ToAddresses": destination["Destination"]["ToAddresses"],
+                "Template": Template,
+                "TemplateData": template_data,
+                "Subject": render_template(
+                    self.templates[Template]["SubjectPart"], template_data),
+                "Html": render_template(
+                    self.templates[Template]["HtmlPart"], template_data),
+                "MessageId": message_id
+            })
+            statuses.append({"Status": "Success", "MessageId": message_id})
+        return {"Status": statuses}
@@ -1,191 +1,170 @@
 """A script which processes plant reading errors and sends HTML email
-alerts to botanists via AWS SES"""
+alerts to botanists via AWS SES.
 
-from io import StringIO
+Errors are kept as plain {plant_id, error} records and boto3 clients are
+only created when first needed, so the lambda cold start stays light."""
+
+import json
+from functools import lru_cache
 from os import environ as ENV
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
 from botocore.exceptions import BotoCoreError, ClientError
-import pandas as pd
-from boto3 import client
+from alert_state import (S3AlertState, SQLiteAlertState, compact_state,
+                         record_alerts, was_recently_alerted)
+from botanist_alerts import (ensure_alert_template, get_botanist_lookup,
+                             get_current_plant_errors, group_errors_by_botanist,
+                             send_botanist_digests)
+from local_ses import LocalSESClient
+from instrumentation import count_aws_response, span, start_run
+from profiling import profile_handler
 from utils import set_logger, get_logger
 
+if TYPE_CHECKING:
+    from boto3 import client
+
 
-def create_ses_client() -> client:
-    """Returns an AWS SES client for sending emails."""
+@lru_cache(maxsize=1)
+def create_ses_client() -> "client":
+    """Returns an AWS SES client for sending emails, created once per container."""
     logger = get_logger()
+    if ENV.get("SES_LOCAL"):
+        logger.info("Using local SES stand-in...")
+        return LocalSESClient()
     logger.info("Creating AWS SES client...")
+    from boto3 import client  # pylint: disable=import-outside-toplevel, redefined-outer-name
     return client("ses", region_name=ENV.get("AWS_REGION", "eu-west-2"))
 
 
-def create_s3_client() -> client:
-    """Returns an AWS S3 client for tracking sent alerts."""
+@lru_cache(maxsize=1)
+def create_s3_client() -> "client":
+    """Returns an AWS S3 client for tracking sent alerts, created once per container."""
     logger = get_logger()
     logger.info("Creating S3 client...")
+    from boto3 import client  # pylint: disable=import-outside-toplevel, redefined-outer-name
     return client("s3", region_name=ENV.get("AWS_REGION", "eu-west-2"))
 
 
-def extract_error_from_event(event) -> pd.DataFrame:
-    """Extract the error dataframe from the AWS Step Function."""
+def read_error_data_ref(error_data_ref: dict) -> list[dict]:
+    """Reads error data handed off by the ETL lambda as an S3 or local file pointer."""
+    logger = get_logger()
+    if "bucket" in error_data_ref:
+        logger.info("Reading error data from s3://%s/%s...",
+                    error_data_ref["bucket"], error_data_ref["key"])
+        file_obj = create_s3_client().get_object(
+            Bucket=error_data_ref["bucket"], Key=error_data_ref["key"])
+        count_aws_response(file_obj)
+        return json.loads(file_obj["Body"].read().decode("utf-8"))
+    logger.info("Reading error data from %s...", error_data_ref["path"])
+    with open(error_data_ref["path"], encoding="utf-8") as payload_file:
+        return json.load(payload_file)
+
+
+def extract_error_from_event(event) -> list[dict]:
+    """Extract the error records from the AWS Step Function, either
+    inline or from the pointer the ETL lambda handed off. A scheduled
+    {"source": "current_state"} event alerts on every plant currently in error."""
     logger = get_logger()
 
-    logger.info("Collecting plant errors from last ETL run...")
-    if isinstance(event, dict):
-        error_data = event.get("etl_result", {}).get("error_data", [])
+    if isinstance(event, dict) and event.get("source") == "current_state":
+        logger.info("Collecting plant errors from the current plant state...")
+        error_data = get_current_plant_errors()
+    elif isinstance(event, dict):
+        logger.info("Collecting plant errors from last ETL run...")
+        etl_result = event.get("etl_result", {})
+        error_data = etl_result.get("error_data", [])
+        if not error_data and etl_result.get("error_data_ref"):
+            error_data = read_error_data_ref(etl_result["error_data_ref"])
     else:
         error_data = []
 
     if not error_data:
         logger.info("No plant health readings contain errors.")
-        return pd.DataFrame()
-
-    return pd.DataFrame(error_data)
-
-
-def create_html_email(df: pd.DataFrame) -> str:
-    """Creates a formatted HTML email."""
-    timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M UTC')
-    table_html = df.to_html(index=False, classes='alert-table', border=0)
-    return f"""
-    <html>
-        <head>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                }}
-                .alert-table {{
-                    border-collapse: collapse;
-                    width: 100%;
-                }}
-                .alert-table th, .alert-table td {{
-                    border: 1px solid #ddd;
-                    padding: 8px;
-                }}
-                .alert-table th {{
-                    background-color: #f2f2f2;
-                    text-align: left;
-                }}
-            </style>
-        </head>
-        <body>
-            <h2>Plant Health Alert</h2>
-            <p>These readings triggered alerts as of <strong>{timestamp}</strong>:</p>
-            {table_html}
-            <p>Please investigate these issues promptly.</p>
-        </body>
-    </html>
-    """
-
-
-def send_ses_email(ses_client: client, html_content: str, error_count: int) -> None:
-    """Send the HTML email alert via AWS SES."""
-    logger = get_logger()
-    try:
-        response = ses_client.send_email(
-            Source=ENV["SES_SOURCE_EMAIL"],
-            Destination={
-                "ToAddresses": [ENV["SES_RECIPIENT"]]
-            },
-            Message={
-                "Subject": {
-                    "Data": f"Plant Health Alert - {error_count} Attention Required"
-                },
-                "Body": {
-                    "Html": {
-                        "Data": html_content
-                    }
-                }
-            }
-        )
-        logger.info("SES email sent! Message ID: %s", response["MessageId"])
-    except Exception as e:
-        logger.error("Failed to send SES email: %s", e)
-        raise
-
-
-def get_previous_alerts_from_s3(s3_client: client) -> pd.DataFrame:
-    """Get previously sent alerts from AWS S3."""
-    logger = get_logger()
+        return []
+
+    return error_data
+
+
+def create_alert_state():
+    """Returns the alert cooldown state store.
+    Uses a local SQLite database if ALERT_STATE_DB is set, otherwise AWS S3."""
+    if ENV.get("ALERT_STATE_DB"):
+        return SQLiteAlertState(ENV["ALERT_STATE_DB"])
+    return S3AlertState(create_s3_client(), ENV["S3_BUCKET"])
+
+
+def filter_recent_alerts(errors: list[dict], state: dict,
+                         now: datetime) -> list[dict]:
+    """Removes errors which were already alerted on within the cooldown."""
+    return [error for error in errors
+            if not was_recently_alerted(state, error.get("plant_id"),
+                                        error.get("error"), now)]
+
+
+def load_botanist_lookup() -> dict:
+    """Returns the cached botanist lookup, or an empty lookup if the
+    database is unavailable so every alert goes to SES_RECIPIENT."""
     try:
-        response = s3_client.list_objects(
-            Bucket=ENV["S3_BUCKET"], Prefix="alert_history/")
-        contents = response.get("Contents", [])
-        if not contents:
-            logger.info("No previous alerts found in S3.")
-            return pd.DataFrame()
-
-        dfs = []
-        for obj in contents:
-            key = obj["Key"]
-            file_obj = s3_client.get_object(Bucket=ENV["S3_BUCKET"], Key=key)
-            file_content = file_obj["Body"].read().decode("utf-8")
-            df = pd.read_json(file_content)
-
-            if "last_alert" in df.columns:
-                df["last_alert"] = pd.to_datetime(df["last_alert"], utc=True)
-
-            dfs.append(df)
-
-        combined_df = pd.concat(
-            dfs, ignore_index=True) if dfs else pd.DataFrame()
-        logger.info("Loaded %s previous alert records from S3.",
-                    len(combined_df))
-        return combined_df
-
-    except BotoCoreError as e:
-        logger.error("Error retrieving previous alerts from S3: %s", e)
-        return pd.DataFrame()
-
-
-def save_alert_history_to_s3(s3_client: client, error_data: pd.DataFrame) -> None:
-    """Save the alert history to AWS S3 as a json."""
-    logger = get_logger()
-    error_data["last_alert"] = datetime.now(timezone.utc)
-    json_data = error_data.to_json(orient="records", date_format="iso")
-    json_buffer = StringIO(json_data)
-    s3_client.put_object(
-        Bucket=ENV["S3_BUCKET"],
-        Key=f"alert_history/alert_history_{datetime.now():%Y-%m-%d_%H%M%S}",
-        Body=json_buffer.getvalue(),
-        ContentType="application/json"
-    )
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-    logger.info("Alert history saved to S3: %s", timestamp)
+        return get_botanist_lookup()
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        get_logger().error("Failed to load botanist lookup: %s", exc)
+        return {}
 
 
-def run_plant_alerter(event) -> dict:
-    """Run all components of the plant alerter process."""
-    set_logger()
+def alert_on_errors(errors: list[dict]) -> dict:
+    """Sends alerts for the given plant errors, skipping any still cooling down.
+    Only the errors in digests SES accepted start a cooldown, so the rest
+    are alerted on again by the next run.
+    Called directly by the ETL pipeline when alerting in-process."""
     logger = get_logger()
-
-    error_df = extract_error_from_event(event)
-    if error_df.empty:
+    if not errors:
         logger.info("No errors found, no alert will be sent.")
         return {"alert_sent": False, "message": "No errors detected."}
 
-    s3_client = create_s3_client()
+    alert_state = create_alert_state()
+    now = datetime.now(timezone.utc)
 
-    previous_alerts = get_previous_alerts_from_s3(s3_client)
-    if not previous_alerts.empty:
-        recent_alerts = previous_alerts[previous_alerts["last_alert"]
-                                        > datetime.now(timezone.utc) - timedelta(hours=1)]
-        if "plant_id" in error_df.columns:
-            error_df = error_df[~error_df["plant_id"].isin(
-                recent_alerts["plant_id"])]
+    state = compact_state(alert_state.load(), now)
+    errors = filter_recent_alerts(errors, state, now)
+    if not errors:
+        logger.info(
+            "No new errors after filtering out plants recently alerted.")
+        return {"alert_sent": False, "message": "No new errors after filtering recent alerts."}
 
-        if error_df.empty:
-            logger.info(
-                "No new errors after filtering out plants recently alerted.")
-            return {"alert_sent": False, "message": "No new errors after filtering recent alerts."}
-
-    html_email = create_html_email(error_df)
+    digests = group_errors_by_botanist(errors, load_botanist_lookup(),
+                                       ENV["SES_RECIPIENT"])
     ses_client = create_ses_client()
-    send_ses_email(ses_client, html_email, len(error_df))
-    save_alert_history_to_s3(s3_client, error_df)
+    ensure_alert_template(ses_client)
+    sent = send_botanist_digests(ses_client, digests)
+    alerted = [(error["plant_id"], error["error"])
+               for email in sent for error in digests[email]["errors"]]
+    if alerted:
+        alert_state.save(record_alerts(state, alerted, now))
+
+    failed_count = len(digests) - len(sent)
+    if failed_count:
+        logger.error("%s of %s digests failed and will be retried on the next run.",
+                     failed_count, len(digests))
+    else:
+        logger.info("Plant alerter process completed successfully.")
+    return {"alert_sent": bool(sent), "alert_count": len(alerted),
+            "digest_count": len(sent), "failed_digest_count": failed_count}
+
 
-    logger.info("Plant alerter process completed successfully.")
-    return {"alert_sent": True, "alert_count": len(error_df)}
+def run_plant_alerter(event) -> dict:
+    """Run all components of the plant alerter process."""
+    set_logger()
+    with start_run("alerter"):
+        with span("extract") as extract_span:
+            errors = extract_error_from_event(event)
+            extract_span.rows_out = len(errors)
+        with span("alert", rows_in=len(errors)) as alert_span:
+            result = alert_on_errors(errors)
+            alert_span.rows_out = result.get("alert_count", 0)
+    return result
 
 
+@profile_handler("alerter")
 def alerter_lambda_handler(event, context):
     """AWS Lambda handler to trigger plant alerting process."""
     try:
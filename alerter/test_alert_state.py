@@ -0,0 +1,86 @@
+# pylint: skip-file
+
+"""Tests the alert cooldown state."""
+
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+import pytest
+from botocore.exceptions import ClientError
+from alert_state import (S3AlertState, SQLiteAlertState, compact_state,
+                         record_alerts, was_recently_alerted)
+
+
+NOW = datetime(2025, 6, 5, 12, 0, tzinfo=timezone.utc)
+
+
+def test_compact_state_drops_expired_entries():
+    """Entries older than the TTL are removed."""
+    state = {(1, "low soil moisture error"): NOW - timedelta(hours=30),
+             (2, "high temperature error"): NOW - timedelta(minutes=5)}
+    assert compact_state(state, NOW) == {
+        (2, "high temperature error"): NOW - timedelta(minutes=5)}
+
+
+def test_was_recently_alerted_is_per_error_type():
+    """A plant alerted for one error can still be alerted for another."""
+    state = record_alerts({}, [(1, "low soil moisture error")],
+                          NOW - timedelta(minutes=10))
+    assert was_recently_alerted(state, 1, "low soil moisture error", NOW)
+    assert not was_recently_alerted(state, 1, "high temperature error", NOW)
+
+
+def test_was_recently_alerted_after_cooldown():
+    """Alerts older than the cooldown are sent again."""
+    state = record_alerts({}, [(1.0, "low soil moisture error")],
+                          NOW - timedelta(hours=2))
+    assert not was_recently_alerted(state, 1, "low soil moisture error", NOW)
+
+
+def test_sqlite_state_round_trip():
+    """State saved to SQLite loads back unchanged."""
+    store = SQLiteAlertState()
+    state = record_alerts({}, [(1, "low soil moisture error"),
+                               (None, "sensor fault")], NOW)
+    store.save(state)
+    assert store.load() == state
+
+
+def test_sqlite_state_save_replaces_previous():
+    """Compacted entries do not survive a save."""
+    store = SQLiteAlertState()
+    store.save(record_alerts({}, [(1, "low soil moisture error")], NOW))
+    store.save(record_alerts({}, [(2, "high temperature error")], NOW))
+    assert list(store.load()) == [(2, "high temperature error")]
+
+
+def test_s3_state_is_a_single_read():
+    """Loading S3 state is one GET of a single object."""
+    s3_client = MagicMock()
+    body = json.dumps([{"plant_id": 3, "error": "low temperature error",
+                        "last_alert": NOW.isoformat()}]).encode("utf-8")
+    s3_client.get_object.return_value = {"Body": MagicMock(
+        read=MagicMock(return_value=body))}
+
+    state = S3AlertState(s3_client, "bucket").load()
+
+    s3_client.get_object.assert_called_once()
+    s3_client.list_objects.assert_not_called()
+    assert state == {(3, "low temperature error"): NOW}
+
+
+def test_s3_state_missing_object_is_empty():
+    """A missing state object means no previous alerts."""
+    s3_client = MagicMock()
+    s3_client.get_object.side_effect = ClientError(
+        {"Error": {"Code": "NoSuchKey"}}, "GetObject")
+    assert S3AlertState(s3_client, "bucket").load() == {}
+
+
+def test_s3_state_other_errors_raise():
+    """Errors other than a missing object are not swallowed."""
+    s3_client = MagicMock()
+    s3_client.get_object.side_effect = ClientError(
+        {"Error": {"Code": "AccessDenied"}}, "GetObject")
+    with pytest.raises(ClientError):
+        S3AlertState(s3_client, "bucket").load()
@@ -0,0 +1,111 @@
+# pylint: skip-file
+
+"""Tests the per-botanist alert digests against the local SES stand-in."""
+
+from unittest.mock import patch
+import pytest
+from botocore.exceptions import ClientError
+from botanist_alerts import (ALERT_TEMPLATE_NAME, ensure_alert_template,
+                             group_errors_by_botanist, send_botanist_digests)
+from local_ses import LocalSESClient
+
+
+LOOKUP = {1: ("Marty Lang", "marty.lang@lnhm.co.uk"),
+          2: ("Marty Lang", "marty.lang@lnhm.co.uk"),
+          3: ("Helen Waters", "helen.waters@lnhm.co.uk")}
+
+
+@pytest.fixture
+def ses_client():
+    client = LocalSESClient(max_send_rate=14.0)
+    ensure_alert_template(client)
+    return client
+
+
+@pytest.fixture(autouse=True)
+def source_email(monkeypatch):
+    monkeypatch.setenv("SES_SOURCE_EMAIL", "alerts@lnhm.co.uk")
+
+
+def test_group_errors_by_botanist():
+    """Errors are grouped per botanist email, unknown plants go to the fallback."""
+    errors = [{"plant_id": 1, "error": "low soil moisture error"},
+              {"plant_id": 2.0, "error": "high temperature error"},
+              {"plant_id": 3, "error": "low temperature error"},
+              {"plant_id": 99, "error": "negative value error"}]
+
+    digests = group_errors_by_botanist(errors, LOOKUP, "team@lnhm.co.uk")
+
+    assert list(digests) == ["marty.lang@lnhm.co.uk", "helen.waters@lnhm.co.uk",
+                             "team@lnhm.co.uk"]
+    assert digests["marty.lang@lnhm.co.uk"]["errors"] == [
+        {"plant_id": 1, "error": "low soil moisture error"},
+        {"plant_id": 2, "error": "high temperature error"}]
+    assert digests["team@lnhm.co.uk"]["botanist_name"] == "LNHM team"
+
+
+def test_ensure_alert_template_is_idempotent(ses_client):
+    """The template is only created once."""
+    ensure_alert_template(ses_client)
+    assert list(ses_client.templates) == [ALERT_TEMPLATE_NAME]
+
+
+def test_send_botanist_digests_one_email_per_botanist(ses_client):
+    """Each botanist receives a single digest with all their errors."""
+    digests = group_errors_by_botanist(
+        [{"plant_id": 1, "error": "low soil moisture error"},
+         {"plant_id": 2, "error": "high temperature error"},
+         {"plant_id": 3, "error": "low temperature error"}],
+        LOOKUP, "team@lnhm.co.uk")
+
+    assert send_botanist_digests(ses_client, digests) == {
+        "marty.lang@lnhm.co.uk", "helen.waters@lnhm.co.uk"}
+    assert ses_client.bulk_calls == 1
+    marty_email = ses_client.sent_emails[0]
+    assert marty_email["ToAddresses"] == ["marty.lang@lnhm.co.uk"]
+    assert marty_email["TemplateData"]["error_count"] == 2
+    assert marty_email["Subject"] == "Plant Health Alert - 2 Attention Required"
+    assert "<td>1</td><td>low soil moisture error</td>" in marty_email["Html"]
+
+
+@patch("botanist_alerts.time.sleep")
+def test_send_botanist_digests_respects_send_rate(fake_sleep):
+    """Large fan-outs are batched by the send rate and paced between batches."""
+    ses_client = LocalSESClient(max_send_rate=10.0)
+    ensure_alert_template(ses_client)
+    digests = {f"botanist{i}@lnhm.co.uk": {
+        "botanist_name": f"Botanist {i}",
+        "errors": [{"plant_id": i, "error": "low soil moisture error"}]}
+        for i in range(35)}
+
+    assert send_botanist_digests(ses_client, digests) == set(digests)
+    assert ses_client.bulk_calls == 4
+    assert fake_sleep.call_count == 3
+    assert all(0 < call.args[0] <= 1 for call in fake_sleep.call_args_list)
+
+
+class FailingBatchSESClient(LocalSESClient):
+    """A local SES client whose second bulk send fails outright."""
+
+    def send_bulk_templated_email(self, Source, Template, DefaultTemplateData, Destinations):
+        if self.bulk_calls == 1:
+            self.bulk_calls += 1
+            raise ClientError({"Error": {"Code": "Throttling"}}, "SendBulkTemplatedEmail")
+        return super().send_bulk_templated_email(
+            Source, Template, DefaultTemplateData, Destinations)
+
+
+@patch("botanist_alerts.time.sleep")
+def test_send_botanist_digests_keeps_going_after_a_failed_batch(fake_sleep):
+    """A batch SES rejects is skipped and the digests sent in the others are returned."""
+    ses_client = FailingBatchSESClient(max_send_rate=10.0)
+    ensure_alert_template(ses_client)
+    digests = {f"botanist{i:02}@lnhm.co.uk": {
+        "botanist_name": f"Botanist {i}",
+        "errors": [{"plant_id": i, "error": "low soil moisture error"}]}
+        for i in range(25)}
+
+    sent = send_botanist_digests(ses_client, digests)
+    assert len(sent) == 15
+    assert ses_client.bulk_calls == 3
+
@@ -0,0 +1,105 @@
+# pylint: skip-file
+
+"""Tests the plant alerter lambda."""
+
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import MagicMock, patch
+from alert_state import SQLiteAlertState
+from local_ses import LocalSESClient
+from send_alerts import alert_on_errors, extract_error_from_event
+
+
+def test_extract_error_from_event_inline():
+    """Inline error data is read straight from the event."""
+    event = {"etl_result": {"error_data": [
+        {"plant_id": 1, "error": "low soil moisture error"}]}}
+    assert extract_error_from_event(event) == [
+        {"plant_id": 1, "error": "low soil moisture error"}]
+
+
+def test_extract_error_from_event_local_pointer(tmp_path):
+    """Error data handed off as a local file pointer is loaded from disk."""
+    payload = tmp_path / "error_data.json"
+    payload.write_text(json.dumps(
+        [{"plant_id": 4, "error": "high temperature error"}]))
+    event = {"etl_result": {"error_data_ref": {"path": str(payload)}}}
+
+    assert extract_error_from_event(event) == [
+        {"plant_id": 4, "error": "high temperature error"}]
+
+
+@patch("send_alerts.create_s3_client")
+def test_extract_error_from_event_s3_pointer(fake_s3_client):
+    """Error data handed off as an S3 pointer is fetched with one GET."""
+    body = json.dumps([{"plant_id": 2, "error": "low temperature error"}])
+    fake_s3_client.return_value.get_object.return_value = {
+        "Body": MagicMock(read=MagicMock(return_value=body.encode("utf-8")))}
+    event = {"etl_result": {"error_data_ref": {"bucket": "lnhm", "key": "k.json"}}}
+
+    assert extract_error_from_event(event) == [
+        {"plant_id": 2, "error": "low temperature error"}]
+    fake_s3_client.return_value.get_object.assert_called_once_with(
+        Bucket="lnhm", Key="k.json")
+
+
+def test_extract_error_from_event_empty():
+    """No error data gives no error records."""
+    assert extract_error_from_event({"etl_result": {"error_data": []}}) == []
+
+
+@patch("send_alerts.get_current_plant_errors")
+def test_extract_error_from_event_current_state(fake_current_errors):
+    """A current_state event alerts on the plants whose latest reading is in error."""
+    fake_current_errors.return_value = [{"plant_id": 7, "error": "low soil moisture error"}]
+    assert extract_error_from_event({"source": "current_state"}) == [
+        {"plant_id": 7, "error": "low soil moisture error"}]
+
+
+def test_send_alerts_does_not_import_heavy_dependencies():
+    """The alert path is importable without pulling in pandas or boto3."""
+    alerter_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [alerter_dir, os.path.dirname(alerter_dir)]))
+    code = ("import sys, send_alerts; "
+            "print(any(m in sys.modules for m in ('pandas', 'boto3', 'sqlalchemy')))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                            text=True, check=True, env=env)
+    assert result.stdout.strip() == "False"
+
+
+class RejectingSESClient(LocalSESClient):
+    """A local SES client which rejects the digests to one address."""
+
+    def send_bulk_templated_email(self, Source, Template, DefaultTemplateData, Destinations):
+        response = super().send_bulk_templated_email(
+            Source, Template, DefaultTemplateData, Destinations)
+        for destination, status in zip(Destinations, response["Status"]):
+            if destination["Destination"]["ToAddresses"] == ["helen.waters@lnhm.co.uk"]:
+                status.update({"Status": "MessageRejected", "Error": "Throttled"})
+        return response
+
+
+@patch("send_alerts.load_botanist_lookup")
+@patch("send_alerts.create_ses_client")
+@patch("send_alerts.create_alert_state")
+def test_alert_on_errors_only_records_sent_digests(fake_state, fake_ses, fake_lookup,
+                                                  monkeypatch):
+    """Errors in a rejected digest don't start a cooldown, so they are retried."""
+    monkeypatch.setenv("SES_SOURCE_EMAIL", "alerts@lnhm.co.uk")
+    monkeypatch.setenv("SES_RECIPIENT", "team@lnhm.co.uk")
+    fake_state.return_value = SQLiteAlertState()
+    fake_ses.return_value = RejectingSESClient()
+    fake_lookup.return_value = {1: ("Marty Lang", "marty.lang@lnhm.co.uk"),
+                                3: ("Helen Waters", "helen.waters@lnhm.co.uk")}
+    errors = [{"plant_id": 1, "error": "low soil moisture error"},
+              {"plant_id": 3, "error": "low temperature error"}]
+
+    result = alert_on_errors(errors)
+
+    assert result["alert_count"] == 1
+    assert result["failed_digest_count"] == 1
+    assert list(fake_state.return_value.load()) == [(1, "low soil moisture error")]
+    assert alert_on_errors(errors)["alert_count"] == 0
@@ -0,0 +1,98 @@
+"""A small read API over the archived daily summaries, for reports,
+notebooks and other consumers which shouldn't go to SQL Server or S3
+themselves. Every response comes out of QueryService's cache when it can.
+
+Endpoints (dates are YYYY-MM-DD, inclusive, defaulting to the last 30 days):
+    GET /plants/<plant_id>/timeseries?start=&end=
+    GET /fleet/aggregates?start=&end=
+    GET /fleet/outliers?start=&end=&threshold=3
+    GET /health
+
+Run from the api directory: python3 query_api.py"""
+from datetime import date, timedelta
+from os import environ as ENV
+from dotenv import load_dotenv
+from flask import Flask, Response, jsonify, request
+
+from query_service import (CACHE_SIZE, CACHE_TTL_SECONDS, OUTLIER_THRESHOLD,
+                           QueryService, ResponseCache)
+from storage import HistoricalStore
+from utils import get_logger, set_logger
+
+MAX_RANGE_DAYS = 366
+
+
+class BadRequest(ValueError):
+    """A query parameter which can't be used."""
+
+
+def parse_range(args, service: QueryService) -> tuple[date, date]:
+    """Returns the start and end dates of a request, defaulting to the
+    range of the hot queries."""
+    default_start, default_end = service.default_range()
+    try:
+        end = date.fromisoformat(args["end"]) if "end" in args else default_end
+        start = date.fromisoformat(args["start"]) if "start" in args else \
+            end - (default_end - default_start)
+    except ValueError as exc:
+        raise BadRequest("start and end must be dates in YYYY-MM-DD format.") from exc
+    if start > end:
+        raise BadRequest("start must not be after end.")
+    if end - start >= timedelta(days=MAX_RANGE_DAYS):
+        raise BadRequest(f"The range can be at most {MAX_RANGE_DAYS} days.")
+    return start, end
+
+
+def json_response(body: bytes) -> Response:
+    """Returns a cached response body as a JSON response."""
+    return Response(body, mimetype="application/json")
+
+
+def create_app(service: QueryService) -> Flask:
+    """Returns the API application answering from service."""
+    app = Flask(__name__)
+
+    @app.errorhandler(BadRequest)
+    def bad_request(exc):
+        return jsonify({"error": str(exc)}), 400
+
+    @app.get("/health")
+    def health():
+        return jsonify({"status": "ok", "cache": service.cache.metrics()})
+
+    @app.get("/plants/<int:plant_id>/timeseries")
+    def plant_timeseries(plant_id: int):
+        return json_response(service.timeseries(plant_id, *parse_range(request.args, service)))
+
+    @app.get("/fleet/aggregates")
+    def fleet_aggregates():
+        return json_response(service.fleet(*parse_range(request.args, service)))
+
+    @app.get("/fleet/outliers")
+    def fleet_outliers():
+        try:
+            threshold = float(request.args.get("threshold", OUTLIER_THRESHOLD))
+        except ValueError as exc:
+            raise BadRequest("threshold must be a number.") from exc
+        return json_response(service.outliers(*parse_range(request.args, service), threshold))
+
+    return app
+
+
+def create_service() -> QueryService:
+    """Returns a query service over ARCHIVE_PATTERN, configured from the
+    environment. By default it reads the daily summaries under ARCHIVE_DIR,
+    or the archiver's objects in S3_BUCKET (see storage.archive_pattern)."""
+    return QueryService(
+        lambda: HistoricalStore(ENV.get("ARCHIVE_PATTERN")),
+        ResponseCache(int(ENV.get("API_CACHE_SIZE", CACHE_SIZE)),
+                      float(ENV.get("API_CACHE_TTL_SECONDS", CACHE_TTL_SECONDS))))
+
+
+if __name__ == "__main__":
+    set_logger()
+    load_dotenv()
+    query_service = create_service().start()
+    get_logger().info("Starting the read API.")
+    create_app(query_service).run(host=ENV.get("API_HOST", "127.0.0.1"),
+                                  port=int(ENV.get("API_PORT", "8000")))
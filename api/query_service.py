@@ -0,0 +1,168 @@
+"""The queries behind the read API, answered from an in-memory LRU cache of
+serialised responses in front of the archived daily summaries.
+
+Responses are cached by query and date range for CACHE_TTL_SECONDS, so
+repeated dashboard and notebook queries never reach DuckDB. The hot
+queries (the fleet aggregates, the outliers and every plant's time series
+over the last HOT_DAYS) are recomputed on a background thread every
+WARM_INTERVAL, before they expire, so they are always answered from memory."""
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Callable
+import pandas as pd
+
+from utils import PeriodicTask, get_logger
+
+CACHE_SIZE = 512
+CACHE_TTL_SECONDS = 300.0
+WARM_INTERVAL = 240.0
+HOT_DAYS = 30
+OUTLIER_THRESHOLD = 3.0
+
+
+def default_range(today: date, days: int = HOT_DAYS) -> tuple[date, date]:
+    """Returns the last days days up to and including today."""
+    return today - timedelta(days=days - 1), today
+
+
+def frame_to_records(frame: pd.DataFrame) -> list[dict]:
+    """Returns a frame as JSON-ready records, with ISO dates and nulls for NaN."""
+    return json.loads(frame.to_json(orient="records", date_format="iso"))
+
+
+class ResponseCache:
+    """A thread-safe LRU cache whose entries expire after ttl seconds."""
+
+    def __init__(self, max_entries: int = CACHE_SIZE, ttl: float = CACHE_TTL_SECONDS,
+                 clock: Callable = time.monotonic):
+        self._entries = OrderedDict()
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key):
+        """Returns the cached value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._clock() - entry[0] > self._ttl:
+                self._entries.pop(key, None)
+                self._metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._metrics["hits"] += 1
+            return entry[1]
+
+    def put(self, key, value) -> None:
+        """Caches value under key, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._metrics["evictions"] += 1
+
+    def clear(self) -> None:
+        """Drops every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        """Returns the hit, miss and eviction counts and the number of entries."""
+        with self._lock:
+            return {**self._metrics, "entries": len(self._entries)}
+
+
+class QueryService:  # pylint: disable=too-many-instance-attributes
+    """Answers the read API's queries from the cache, or from the historical
+    store (see storage.HistoricalStore) on a miss. open_store is called on
+    first use, so the service starts before the archive has any files."""
+
+    def __init__(self, open_store: Callable, cache: ResponseCache = None,
+                 hot_days: int = HOT_DAYS, today: Callable = date.today):
+        self._open_store = open_store
+        self._store = None
+        self._store_lock = threading.Lock()
+        self.cache = cache or ResponseCache()
+        self._hot_days = hot_days
+        self._today = today
+        self._warmer = None
+
+    def default_range(self) -> tuple[date, date]:
+        """Returns the range of the hot queries."""
+        return default_range(self._today(), self._hot_days)
+
+    def _query(self, method: str, *args) -> pd.DataFrame:
+        """Runs a HistoricalStore query. DuckDB connections aren't safe to
+        share between threads, so queries run one at a time."""
+        with self._store_lock:
+            if self._store is None:
+                self._store = self._open_store()
+            return getattr(self._store, method)(*args)
+
+    def _cached(self, key: tuple, compute: Callable, refresh: bool = False) -> bytes:
+        """Returns the cached response body for key, computing it on a miss."""
+        body = None if refresh else self.cache.get(key)
+        if body is None:
+            body = json.dumps(compute()).encode("utf-8")
+            self.cache.put(key, body)
+        return body
+
+    def timeseries(self, plant_id: int, start: date, end: date,
+                   refresh: bool = False) -> bytes:
+        """Returns one plant's daily summaries over the range."""
+        return self._cached(("timeseries", plant_id, start, end), lambda: {
+            "plant_id": plant_id, "start": start.isoformat(), "end": end.isoformat(),
+            "days": frame_to_records(self._query("plant_timeseries", plant_id, start, end))},
+            refresh)
+
+    def fleet(self, start: date, end: date, refresh: bool = False) -> bytes:
+        """Returns the fleet's daily averages and each plant's statistics over the range."""
+        return self._cached(("fleet", start, end), lambda: {
+            "start": start.isoformat(), "end": end.isoformat(),
+            "daily": frame_to_records(self._query("fleet_daily", start, end)),
+            "plants": frame_to_records(self._query("plant_statistics", start, end))},
+            refresh)
+
+    def outliers(self, start: date, end: date, threshold: float = OUTLIER_THRESHOLD,
+                 refresh: bool = False) -> bytes:
+        """Returns the plant days more than threshold standard deviations
+        from the plant's mean over the range."""
+        return self._cached(("outliers", start, end, threshold), lambda: {
+            "start": start.isoformat(), "end": end.isoformat(), "threshold": threshold,
+            "outliers": frame_to_records(self._query("outliers", start, end, threshold))},
+            refresh)
+
+    def warm(self) -> int:
+        """Recomputes the hot queries over the default range. Returns how
+        many responses were cached."""
+        start, end = self.default_range()
+        self.fleet(start, end, refresh=True)
+        self.outliers(start, end, refresh=True)
+        plant_ids = self._query("plant_statistics", start, end)["plant_id"].tolist()
+        for plant_id in plant_ids:
+            self.timeseries(int(plant_id), start, end, refresh=True)
+        return 2 + len(plant_ids)
+
+    def start(self, interval: float = WARM_INTERVAL) -> "QueryService":
+        """Starts the background thread which keeps the hot queries warm."""
+        if self._warmer is None:
+            self._warmer = PeriodicTask(self._warm_logged, interval, "lnhm-query-warmer")
+        self._warmer.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stops the background thread."""
+        if self._warmer is not None:
+            self._warmer.stop(timeout)
+
+    def _warm_logged(self) -> None:
+        logger = get_logger()
+        try:
+            logger.info("Warmed %s hot queries.", self.warm())
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            logger.error("Warming hot queries failed: %s", exc)
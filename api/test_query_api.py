@@ -0,0 +1,58 @@
+# pylint: skip-file
+
+"""Tests the read API endpoints over a local archive."""
+
+from datetime import date
+import pytest
+from query_api import create_app
+from query_service import QueryService
+from storage import HistoricalStore, LocalObjectStore
+
+
+@pytest.fixture
+def client(tmp_path):
+    pytest.importorskip("duckdb")
+    objects = LocalObjectStore(str(tmp_path))
+    for day in range(1, 11):
+        temperature = 40.0 if day == 10 else 15.0 + day % 2
+        objects.put_object(Bucket="b", Key=f"daily_summaries/plant_readings_2025-06-{day:02d}.csv",
+                           Body=f"plant_id,avg_temperature,avg_soil_moisture,recording_count,"
+                                f"last_watered,date\n1,{temperature},50.0,1440,"
+                                f"2025-06-{day:02d} 09:00:00,2025-06-{day:02d}\n"
+                                f"2,20.0,60.0,1440,2025-06-{day:02d} 09:00:00,2025-06-{day:02d}\n")
+    service = QueryService(lambda: HistoricalStore(str(tmp_path / "daily_summaries" / "*.csv")),
+                           today=lambda: date(2025, 6, 10))
+    return create_app(service).test_client()
+
+
+def test_plant_timeseries(client):
+    """A plant's days are returned in order, defaulting to the last 30 days."""
+    days = client.get("/plants/1/timeseries").get_json()["days"]
+    assert [day["avg_temperature"] for day in days][-2:] == [16.0, 40.0]
+    assert len(client.get("/plants/1/timeseries?start=2025-06-09").get_json()["days"]) == 2
+
+
+def test_fleet_aggregates_and_outliers(client):
+    """Fleet averages are per day and the spike day is the only outlier."""
+    fleet = client.get("/fleet/aggregates?start=2025-06-01&end=2025-06-02").get_json()
+    assert [day["avg_temperature"] for day in fleet["daily"]] == [18.0, 17.5]
+    assert [plant["days"] for plant in fleet["plants"]] == [2, 2]
+
+    outliers = client.get("/fleet/outliers?threshold=2.5").get_json()["outliers"]
+    assert [(row["plant_id"], row["date"][:10]) for row in outliers] == [(1, "2025-06-10")]
+
+
+def test_repeated_requests_hit_the_cache(client):
+    """The second identical request is served from memory."""
+    client.get("/fleet/aggregates")
+    client.get("/fleet/aggregates")
+    assert client.get("/health").get_json()["cache"]["hits"] == 1
+
+
+@pytest.mark.parametrize("query", ["start=06-01-2025", "start=2025-06-10&end=2025-06-01",
+                                   "start=2020-01-01&end=2025-06-01", "threshold=high"])
+def test_bad_parameters_are_rejected(client, query):
+    """Malformed dates, reversed or overlong ranges and bad thresholds are 400s."""
+    response = client.get(f"/fleet/outliers?{query}")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
@@ -0,0 +1,82 @@
+# pylint: skip-file
+
+"""Tests the response cache and query service behind the read API."""
+
+import json
+from datetime import date
+from unittest.mock import MagicMock
+import pandas as pd
+from query_service import QueryService, ResponseCache, default_range
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_evicts_least_recently_used():
+    """Reading an entry keeps it, the oldest unread one is evicted."""
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    assert cache.get("a") == b"1"
+    cache.put("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1" and cache.get("c") == b"3"
+    assert cache.metrics() == {"hits": 3, "misses": 1, "evictions": 1, "entries": 2}
+
+
+def test_cache_entries_expire():
+    """Entries older than the TTL are misses."""
+    clock = FakeClock()
+    cache = ResponseCache(ttl=10.0, clock=clock)
+    cache.put("a", b"1")
+    clock.now = 10.0
+    assert cache.get("a") == b"1"
+    clock.now = 10.5
+    assert cache.get("a") is None
+
+
+def fake_store():
+    store = MagicMock()
+    store.plant_timeseries.return_value = pd.DataFrame(
+        {"plant_id": [1], "date": pd.to_datetime(["2025-06-05"]), "avg_temperature": [15.0]})
+    store.plant_statistics.return_value = pd.DataFrame({"plant_id": [1, 2]})
+    store.fleet_daily.return_value = pd.DataFrame({"avg_temperature": [float("nan")]})
+    store.outliers.return_value = pd.DataFrame()
+    return store
+
+
+def test_repeated_queries_come_from_the_cache():
+    """Only the first of two identical queries reaches the store, which is opened lazily."""
+    store = fake_store()
+    open_store = MagicMock(return_value=store)
+    service = QueryService(open_store)
+    open_store.assert_not_called()
+
+    first = service.timeseries(1, date(2025, 6, 1), date(2025, 6, 30))
+    assert service.timeseries(1, date(2025, 6, 1), date(2025, 6, 30)) is first
+    assert store.plant_timeseries.call_count == 1
+    assert json.loads(first)["days"] == [
+        {"plant_id": 1, "date": "2025-06-05T00:00:00.000", "avg_temperature": 15.0}]
+    assert json.loads(service.fleet(date(2025, 6, 1), date(2025, 6, 30)))["daily"] == [
+        {"avg_temperature": None}]
+
+
+def test_warm_precomputes_the_hot_queries():
+    """Warming caches the fleet, outliers and every plant's series over the default range."""
+    store = fake_store()
+    service = QueryService(lambda: store, today=lambda: date(2025, 6, 30))
+    start, end = default_range(date(2025, 6, 30))
+    assert start == date(2025, 6, 1)
+
+    assert service.warm() == 4
+    store.reset_mock()
+    service.fleet(start, end)
+    service.outliers(start, end)
+    service.timeseries(2, start, end)
+    assert not store.method_calls
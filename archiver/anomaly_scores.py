@@ -0,0 +1,124 @@
+"""A script which keeps per-plant exponentially weighted (EWMA) means and
+variances of the daily summaries, and scores each day against the plant's
+own history. Scores are uploaded next to the daily summaries."""
+import io
+import json
+from datetime import datetime
+from os import environ as ENV
+import numpy as np
+import pandas as pd
+from botocore.exceptions import ClientError
+from instrumentation import count_aws_response
+from storage import archive_client
+from utils import get_logger
+
+EWMA_ALPHA = 0.3
+MIN_HISTORY_DAYS = 3
+EWMA_STATE_KEY = "anomaly_scores/ewma_state.json"
+SCORES_KEY_FORMAT = "anomaly_scores/plant_scores_{day:%Y-%m-%d}.csv"
+
+METRICS = {"temp": "avg_temperature", "moisture": "avg_soil_moisture"}
+
+
+def state_to_frame(state: dict) -> pd.DataFrame:
+    """Returns the EWMA state as one row per plant. last_date is the last
+    day folded into the plant's history (missing in older states)."""
+    columns = ["plant_id", "days", "last_date"] + [f"{name}_{stat}" for name in METRICS
+                                                   for stat in ("mean", "var")]
+    if not state:
+        return pd.DataFrame(columns=columns)
+    frame = pd.DataFrame.from_dict(state, orient="index")
+    frame["plant_id"] = frame.index.astype(int)
+    return frame.reset_index(drop=True).reindex(columns=columns)
+
+
+def merge_state(summary: pd.DataFrame, state: dict) -> pd.DataFrame:
+    """Returns each plant's day with its EWMA state, and whether the day is
+    already folded into it (e.g. by an archiver run which is being retried)."""
+    day = summary[["plant_id", "date", *METRICS.values()]].merge(
+        state_to_frame(state), on="plant_id", how="left")
+    day["day_key"] = pd.to_datetime(day["date"]).dt.strftime("%Y-%m-%d")
+    day["folded"] = day["last_date"].fillna("").astype(str) >= day["day_key"]
+    return day
+
+
+def is_folded(summary: pd.DataFrame, state: dict) -> bool:
+    """Returns whether every plant's day in the summary is already in the state."""
+    return bool(merge_state(summary, state)["folded"].all())
+
+
+def frame_to_state(frame: pd.DataFrame) -> dict:
+    """Returns the per-plant EWMA rows as a JSON-serialisable dict."""
+    return {str(int(row.pop("plant_id"))): row
+            for row in frame.to_dict("records")}
+
+
+def update_scores(summary: pd.DataFrame, state: dict,
+                  alpha: float = EWMA_ALPHA) -> tuple[pd.DataFrame, dict]:
+    """Scores each plant's day against its EWMA history from before that day,
+    then folds the day into the history. Returns the scores and new state.
+    Plants with fewer than MIN_HISTORY_DAYS of history get no score.
+    A day on or before a plant's last_date is not folded in again, so
+    rerunning a day leaves the state as it was."""
+    day = merge_state(summary, state)
+    new_day = ~day["folded"]
+    day["days"] = day["days"].fillna(0).astype(int)
+    stat_columns = [f"{name}_{stat}" for name in METRICS for stat in ("mean", "var")]
+    day[stat_columns] = day[stat_columns].astype(float)
+
+    for name, column in METRICS.items():
+        mean, var = day[f"{name}_mean"], day[f"{name}_var"]
+        std = np.sqrt(var.where(var > 0))
+        day[f"{name}_zscore"] = ((day[column] - mean) / std).where(
+            day["days"] >= MIN_HISTORY_DAYS)
+
+        # Incremental EWMA mean and variance, seeded by the first value.
+        diff = (day[column] - mean).fillna(0)
+        increment = alpha * diff
+        day[f"{name}_mean"] = (mean + increment).fillna(day[column]).where(new_day, mean)
+        day[f"{name}_var"] = ((1 - alpha) * (var.fillna(0) + diff * increment)).where(
+            new_day, var)
+    day["days"] += new_day.astype(int)
+    day["last_date"] = day["day_key"].where(new_day, day["last_date"])
+
+    known = day.dropna(subset=[f"{name}_mean" for name in METRICS])
+    new_state = {**state, **frame_to_state(known[state_to_frame({}).columns])}
+    scores = day[["plant_id", "date", *METRICS.values(),
+                  *(f"{name}_zscore" for name in METRICS),
+                  *(f"{name}_mean" for name in METRICS)]]
+    return scores, new_state
+
+
+def load_ewma_state(s3_client, bucket: str) -> dict:
+    """Returns the saved EWMA state, or an empty state on the first run."""
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=EWMA_STATE_KEY)
+        count_aws_response(response)
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return {}
+        raise
+    return json.loads(response["Body"].read().decode("utf-8"))
+
+
+def update_anomaly_scores(summary: pd.DataFrame, date: datetime) -> pd.DataFrame:
+    """Updates the EWMA state with a day's summary and uploads that day's scores.
+    If the day is already in the state, the scores uploaded with it are kept."""
+    logger = get_logger()
+    s3_client = archive_client()
+    bucket = ENV.get("S3_BUCKET")
+
+    state = load_ewma_state(s3_client, bucket)
+    if not summary.empty and is_folded(summary, state):
+        logger.info("Anomaly scores for %s were already uploaded.", f"{date:%Y-%m-%d}")
+        return summary
+    scores, state = update_scores(summary, state)
+
+    csv_buffer = io.StringIO()
+    scores.to_csv(csv_buffer, index=False)
+    count_aws_response(s3_client.put_object(
+        Bucket=bucket, Key=SCORES_KEY_FORMAT.format(day=date), Body=csv_buffer.getvalue()))
+    count_aws_response(s3_client.put_object(
+        Bucket=bucket, Key=EWMA_STATE_KEY, Body=json.dumps(state)))
+    logger.info("Uploaded anomaly scores for %s plants.", len(scores))
+    return scores
@@ -1,27 +1,20 @@
 """A script which archives a summary of short term 
-storage data (last 24hr) as a CSV file and uploads to AWS S3."""
+storage data (last 24hr) as a CSV file and uploads to AWS S3
+(or ARCHIVE_DIR when running locally)."""
 import io
 from datetime import datetime
 from os import environ as ENV
-import sqlalchemy
 from sqlalchemy.exc import SQLAlchemyError
 import pandas as pd
 from dotenv import load_dotenv
-from boto3 import client
 from botocore.exceptions import BotoCoreError, ClientError
+from anomaly_scores import update_anomaly_scores
+from instrumentation import count_aws_response, span, start_run, track_db_round_trips
+from profiling import profile_handler
+from storage import ReadingStore, archive_client, get_store
 from utils import set_logger, get_logger
 
 
-def create_tsql_engine() -> sqlalchemy.Engine:
-    """Returns a tsql engine based on .env variables."""
-    return sqlalchemy.create_engine(
-        (f"mssql+pyodbc://{ENV['DB_USER']}:{ENV['DB_PASSWORD']}"
-         f"@{ENV['DB_HOST']}/{ENV['DB_NAME']}?driver={ENV['DB_DRIVER']}"),
-        connect_args={'connect_timeout': 10,
-                      'TrustServerCertificate': 'yes'},
-        echo=False)
-
-
 def dataframe_daily_summary(df: pd.DataFrame, date: datetime) -> pd.DataFrame:
     """Returns a daily summary of plant health data for a given day."""
     logger = get_logger()
@@ -47,47 +40,42 @@ def dataframe_daily_summary(df: pd.DataFrame, date: datetime) -> pd.DataFrame:
     return summarised_day_data
 
 
-def get_day_plant_readings(engine: sqlalchemy.Engine) -> pd.DataFrame:
+def get_day_plant_readings(store: ReadingStore) -> pd.DataFrame:
     """Returns all plant readings as a dataframe."""
     logger = get_logger()
     try:
-        query = "SELECT * FROM FACT_plant_reading"
         logger.info("Successfully retrieved daily plant data.")
-        return pd.read_sql(query, engine)
+        return store.read_readings()
     except SQLAlchemyError as exc:
         logger.critical(exc)
         raise exc
 
 
-def cleanup_plant_readings(engine: sqlalchemy.Engine) -> None:
-    """Deletes all rows from the FACT_plant_reading table."""
+def cleanup_plant_readings(store: ReadingStore) -> None:
+    """Deletes all rows from the FACT_plant_reading table
+    and the dashboard summary tables built from it."""
     logger = get_logger()
-    with engine.connect() as conn:
-        try:
-            conn.execute(sqlalchemy.text("DELETE FROM FACT_plant_reading"))
-            conn.commit()
-            logger.info("All rows deleted from FACT_plant_reading.")
-        except SQLAlchemyError as exc:
-            logger.critical(exc)
-            raise exc
+    try:
+        store.clear_readings()
+        logger.info("All rows deleted from FACT_plant_reading and summaries.")
+    except SQLAlchemyError as exc:
+        logger.critical(exc)
+        raise exc
 
 
 def upload_day_summary_as_csv(df: pd.DataFrame) -> None:
     """Uploads a dataframe of a day's summary of plant readings as CSV."""
-    s3_client = client(
-        's3',
-        region_name=ENV.get('AWS_REGION', 'eu-west-2')
-    )
+    s3_client = archive_client()
 
     csv_buffer = io.StringIO()
     df.to_csv(csv_buffer, index=False)
 
     try:
-        s3_client.put_object(
-            Bucket=ENV["S3_BUCKET"],
+        count_aws_response(s3_client.put_object(
+            Bucket=ENV.get("S3_BUCKET"),
             Key=f"daily_summaries/plant_readings_{datetime.now():%Y-%m-%d}.csv",
             Body=csv_buffer.getvalue()
-        )
+        ))
     except (BotoCoreError, ClientError) as exc:
         get_logger().critical("S3 upload failed: %s", exc)
         raise
@@ -98,13 +86,24 @@ def run_summarise_and_delete() -> None:
     upload to S3 and clear the RDS db."""
     set_logger()
     load_dotenv()
-    eng = create_tsql_engine()
-    df = get_day_plant_readings(eng)
-    summarised_day_data = dataframe_daily_summary(df, datetime.today())
-    upload_day_summary_as_csv(summarised_day_data)
-    cleanup_plant_readings(eng)
-
-
+    with start_run("archiver"):
+        store = get_store()
+        track_db_round_trips(store.engine)
+        with span("extract") as extract_span:
+            df = get_day_plant_readings(store)
+            extract_span.rows_out = len(df)
+        with span("transform", rows_in=len(df)) as transform_span:
+            summarised_day_data = dataframe_daily_summary(df, datetime.today())
+            transform_span.rows_out = len(summarised_day_data)
+        with span("archive", rows_in=len(summarised_day_data)) as archive_span:
+            upload_day_summary_as_csv(summarised_day_data)
+            archive_span.rows_out = len(update_anomaly_scores(
+                summarised_day_data, datetime.today()))
+        with span("cleanup", rows_in=len(df)):
+            cleanup_plant_readings(store)
+
+
+@profile_handler("archiver")
 def archive_lambda_handler(event, context):
     """AWS Lambda handler to trigger ETL pipeline."""
     try:
@@ -0,0 +1,117 @@
+# pylint: skip-file
+
+"""Tests the per-plant EWMA anomaly scores."""
+
+import io
+import json
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+import numpy as np
+import pandas as pd
+import pytest
+from botocore.exceptions import ClientError
+from anomaly_scores import (EWMA_STATE_KEY, load_ewma_state, update_anomaly_scores,
+                            update_scores)
+
+
+def day_summary(day, temperatures, moistures=None):
+    plant_ids = list(range(1, len(temperatures) + 1))
+    return pd.DataFrame({
+        "plant_id": plant_ids,
+        "avg_temperature": temperatures,
+        "avg_soil_moisture": moistures or [50.0] * len(temperatures),
+        "recording_count": [60] * len(temperatures),
+        "date": [day] * len(temperatures)
+    })
+
+
+def test_first_days_are_not_scored():
+    """Plants need some history before they are scored."""
+    state = {}
+    for day in range(1, 4):
+        scores, state = update_scores(day_summary(f"2025-06-0{day}", [15.0]), state)
+        assert scores["temp_zscore"].isna().all()
+    assert state["1"]["days"] == 3
+    assert state["1"]["temp_mean"] == pytest.approx(15.0)
+
+
+def test_scores_are_per_plant():
+    """The same temperature is normal for one plant and an outlier for another."""
+    state = {}
+    for day, (cool, hot) in enumerate([(14.0, 30.0), (15.0, 31.0), (16.0, 29.0),
+                                       (15.0, 30.0)], start=1):
+        _, state = update_scores(day_summary(f"2025-06-0{day}", [cool, hot]), state)
+
+    scores, _ = update_scores(day_summary("2025-06-05", [30.0, 30.0]), state)
+
+    assert scores.loc[0, "temp_zscore"] > 10
+    assert abs(scores.loc[1, "temp_zscore"]) < 1
+    assert scores["moisture_zscore"].isna().all()  # constant moisture has no spread
+
+
+def test_update_matches_ewma():
+    """The incremental update matches pandas' exponentially weighted mean."""
+    temperatures = [14.0, 18.0, 15.0, 21.0, 16.0]
+    state = {}
+    for day, temperature in enumerate(temperatures, start=1):
+        _, state = update_scores(day_summary(f"2025-06-0{day}", [temperature]), state)
+
+    expected = pd.Series(temperatures).ewm(alpha=0.3, adjust=False).mean().iloc[-1]
+    assert state["1"]["temp_mean"] == pytest.approx(expected)
+
+
+def test_unseen_plants_keep_their_state():
+    """Plants missing from a day's summary keep their previous history."""
+    _, state = update_scores(day_summary("2025-06-01", [15.0, 20.0]), {})
+    _, state = update_scores(day_summary("2025-06-02", [16.0]), state)
+    assert state["2"]["days"] == 1
+    assert state["1"]["days"] == 2
+
+
+def test_rerunning_a_day_leaves_the_state_unchanged():
+    """A retried archiver run doesn't fold the same day in twice."""
+    state = {}
+    for day in range(1, 4):
+        _, state = update_scores(day_summary(f"2025-06-0{day}", [15.0, 20.0]), state)
+    _, rerun = update_scores(day_summary("2025-06-03", [15.0, 20.0]), state)
+
+    assert rerun == state
+    assert state["1"]["last_date"] == "2025-06-03"
+    _, state = update_scores(day_summary("2025-06-04", [18.0, 20.0]), state)
+    assert state["1"]["days"] == 4
+
+
+def test_load_ewma_state_first_run():
+    """A missing state object starts from an empty state."""
+    s3_client = MagicMock()
+    s3_client.get_object.side_effect = ClientError(
+        {"Error": {"Code": "NoSuchKey"}}, "GetObject")
+    assert load_ewma_state(s3_client, "lnhm-bucket") == {}
+
+
+@patch("anomaly_scores.archive_client")
+def test_update_anomaly_scores_uploads_scores_and_state(fake_client, monkeypatch):
+    """Scores go next to the daily summaries and the state is saved for tomorrow."""
+    monkeypatch.setenv("S3_BUCKET", "lnhm-bucket")
+    s3_client = fake_client.return_value
+    s3_client.get_object.return_value = {"Body": io.BytesIO(b"{}")}
+
+    update_anomaly_scores(day_summary("2025-06-05", [15.0]), datetime(2025, 6, 5))
+
+    keys = [call.kwargs["Key"] for call in s3_client.put_object.call_args_list]
+    assert keys == ["anomaly_scores/plant_scores_2025-06-05.csv", EWMA_STATE_KEY]
+    saved_state = json.loads(s3_client.put_object.call_args_list[1].kwargs["Body"])
+    assert saved_state["1"]["days"] == 1
+
+
+@patch("anomaly_scores.archive_client")
+def test_update_anomaly_scores_skips_a_day_already_scored(fake_client, monkeypatch):
+    """Rerunning a day keeps the state and the scores uploaded the first time."""
+    monkeypatch.setenv("S3_BUCKET", "lnhm-bucket")
+    _, state = update_scores(day_summary("2025-06-05", [15.0]), {})
+    s3_client = fake_client.return_value
+    s3_client.get_object.return_value = {"Body": io.BytesIO(json.dumps(state).encode())}
+
+    update_anomaly_scores(day_summary("2025-06-05", [15.0]), datetime(2025, 6, 5))
+
+    s3_client.put_object.assert_not_called()
@@ -5,7 +5,9 @@
 import pytest
 from pytest import mark
 from unittest.mock import patch, mock_open
-from archive_plant_reading import dataframe_daily_summary
+from archive_plant_reading import (cleanup_plant_readings, dataframe_daily_summary,
+                                   get_day_plant_readings)
+from storage import SQLiteStore
 from dotenv import load_dotenv
 import pandas as pd
 import datetime
@@ -64,3 +66,22 @@ def test_daily_summary_all_errors():
     summarised_data = dataframe_daily_summary(example_dataframe, date_value)
 
     assert summarised_data.empty
+
+
+def test_readings_are_summarised_and_cleared_from_local_store():
+    """The archiver reads and clears the readings through the storage backend."""
+    store = SQLiteStore.from_path(":memory:")
+    with store.engine.begin() as conn:
+        store.append_readings(conn, pd.DataFrame({
+            'temperature': [15.0, 17.0], 'soil_moisture': [40.0, 50.0],
+            'recording_taken': ['2025-06-05 14:30:00', '2025-06-05 14:31:00'],
+            'last_watered': ['2025-06-05 09:00:00', '2025-06-05 09:00:00'],
+            'error_msg': [None, None], 'plant_id': [1, 1]}))
+
+    summary = dataframe_daily_summary(get_day_plant_readings(store),
+                                      datetime.date(2025, 6, 5))
+    assert summary[['plant_id', 'avg_temperature', 'recording_count']].values.tolist() == \
+        [[1, 16.0, 2]]
+
+    cleanup_plant_readings(store)
+    assert get_day_plant_readings(store).empty
@@ -0,0 +1,75 @@
+"""Benchmarks the alerter lambda's import time, first invocation and peak
+memory in fresh interpreters, with and without pandas also imported and
+used to render the errors with DataFrame.to_html. This isolates what
+pandas adds to a cold start. It is not a run of the previous alerter,
+which needs live AWS clients.
+
+Run from the repository root: python benchmarks/bench_alerter_cold_start.py"""
+import json
+import os
+import subprocess
+import sys
+from statistics import median
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALERTER_DIR = os.path.join(ROOT_DIR, "alerter")
+
+ERROR_DATA = [{"plant_id": plant_id, "error": "low soil moisture error"}
+              for plant_id in range(1, 51)]
+
+COLD_START_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+{preload}
+import send_alerts
+imported = time.perf_counter()
+{pandas_render}
+send_alerts.run_plant_alerter({{"etl_result": {{"error_data": {errors}}}}})
+invoked = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "invoke_ms": (invoked - imported) * 1000,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+}}))
+"""
+
+VARIANTS = {
+    "plain records": {"preload": "", "pandas_render": ""},
+    "plain records + pandas": {
+        "preload": "import pandas as pd",
+        "pandas_render": "pd.DataFrame({errors}).to_html(index=False)"
+    }
+}
+
+
+def run_cold_start(variant: dict) -> dict:
+    """Runs one cold start in a fresh interpreter and returns its timings."""
+    errors = json.dumps(ERROR_DATA)
+    script = COLD_START_SCRIPT.format(
+        preload=variant["preload"],
+        pandas_render=variant["pandas_render"].format(errors=errors),
+        errors=errors)
+    env = dict(os.environ,
+               PYTHONPATH=os.pathsep.join([ALERTER_DIR, ROOT_DIR]),
+               ALERT_STATE_DB=":memory:", SES_LOCAL="true",
+               SES_SOURCE_EMAIL="alerts@lnhm.co.uk",
+               SES_RECIPIENT="team@lnhm.co.uk")
+    env.pop("DB_USER", None)  # use the SES_RECIPIENT fallback, not a live DB
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True,
+                            text=True, check=True, env=env, cwd=ALERTER_DIR)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def benchmark(runs: int = 5) -> None:
+    """Prints the median cold start figures of each variant."""
+    print(f"{'variant':<26}{'import ms':>12}{'invoke ms':>12}{'peak MB':>10}")
+    for name, variant in VARIANTS.items():
+        samples = [run_cold_start(variant) for _ in range(runs)]
+        print(f"{name:<26}"
+              f"{median(s['import_ms'] for s in samples):>12.1f}"
+              f"{median(s['invoke_ms'] for s in samples):>12.1f}"
+              f"{median(s['peak_rss_mb'] for s in samples):>10.1f}")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,70 @@
+"""Benchmarks reading plant readings with utils.read_sql_columnar against
+pd.read_sql, using a SQLite copy of FACT_plant_reading as a stand-in for
+SQL Server. Each reader runs in a fresh interpreter so peak RSS is its own.
+
+Run from the repository root: python benchmarks/bench_columnar_fetch.py [rows]"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from statistics import median
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CREATE_SCRIPT = """
+import random, sqlite3
+conn = sqlite3.connect({db_path!r})
+conn.execute("CREATE TABLE FACT_plant_reading (plant_health_id INTEGER PRIMARY KEY, "
+             "plant_id INT, temperature FLOAT, soil_moisture FLOAT, "
+             "recording_taken TEXT, last_watered TEXT, error_msg TEXT)")
+random.seed(0)
+conn.executemany("INSERT INTO FACT_plant_reading VALUES (?, ?, ?, ?, ?, ?, ?)",
+                 ((i, i % 50, random.uniform(10, 30), random.uniform(0, 100),
+                   "2025-06-05 14:00:00", "2025-06-04 10:00:00",
+                   None if i % 20 else "low soil moisture error")
+                  for i in range({rows})))
+conn.commit()
+"""
+
+READ_SCRIPT = """
+import json, resource, sqlite3, time
+import pandas as pd
+from utils import read_sql_columnar
+conn = sqlite3.connect({db_path!r})
+start = time.perf_counter()
+df = {reader}(QUERY, conn) if {reader!r} == "pd.read_sql" else {reader}(conn, QUERY)
+print(json.dumps({{"seconds": time.perf_counter() - start, "rows": len(df),
+                  "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+""".replace("QUERY", repr("SELECT * FROM FACT_plant_reading"))
+
+READERS = ["pd.read_sql", "read_sql_columnar"]
+
+
+def run_reader(reader: str, db_path: str) -> dict:
+    """Reads the whole table in a fresh interpreter and returns its timings."""
+    result = subprocess.run([sys.executable, "-c", READ_SCRIPT.format(reader=reader,
+                                                                        db_path=db_path)],
+                            capture_output=True, text=True, check=True,
+                            env=dict(os.environ, PYTHONPATH=ROOT_DIR))
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def benchmark(rows: int = 500_000, runs: int = 3) -> None:
+    """Prints the median read time and peak memory of each reader."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "plants.db")
+        subprocess.run([sys.executable, "-c", CREATE_SCRIPT.format(db_path=db_path,
+                                                                   rows=rows)],
+                       check=True)
+        print(f"{rows} readings")
+        print(f"{'reader':<22}{'seconds':>10}{'peak MB':>10}")
+        for reader in READERS:
+            samples = [run_reader(reader, db_path) for _ in range(runs)]
+            print(f"{reader:<22}"
+                  f"{median(s['seconds'] for s in samples):>10.2f}"
+                  f"{median(s['peak_rss_mb'] for s in samples):>10.1f}")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
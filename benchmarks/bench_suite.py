@@ -0,0 +1,163 @@
+"""Benchmarks the transform, summary and chart functions on synthetic fleet
+data, and fails if any of them is slower or uses more memory than the
+stored baseline by more than a threshold.
+
+Each case is timed as the best of a few runs, then run once more under
+tracemalloc for its peak memory above what was allocated before it ran.
+
+Run from the repository root:
+    python benchmarks/bench_suite.py                   # 1k and 100k rows
+    python benchmarks/bench_suite.py --sizes 1k,100k,10M
+    python benchmarks/bench_suite.py --save-baseline   # record a new baseline
+The threshold is --threshold or BENCH_THRESHOLD (default 1.0, i.e. twice as slow
+or twice the memory)."""
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from os import environ as ENV
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT_DIR, os.path.join(ROOT_DIR, "pipeline"), os.path.join(ROOT_DIR, "streamlit")]
+
+# pylint: disable=wrong-import-position, import-error
+import altair as alt
+from fleet_generator import generate_daily_summaries, generate_readings, generate_responses
+from readings import ReadingBatch, decode_reading
+from transform import clean_dataframe, dataframe_daily_summary, save_dataframe_to_csv
+from visualisations.visualisations import get_temperature_line_graph
+from visualisations.visualisations_archived_data import get_temperature_line_chart
+
+BASELINE_PATH = os.path.join(ROOT_DIR, "benchmarks", "baseline.json")
+SIZES = {"1k": 1_000, "100k": 100_000, "10M": 10_000_000}
+DEFAULT_SIZES = "1k,100k"
+DEFAULT_THRESHOLD = 1.0
+SUMMARY_DATE = datetime(2025, 6, 5)
+
+# Differences below these are timer and allocator noise, not regressions.
+MIN_SECONDS_DELTA = 0.005
+MIN_PEAK_MB_DELTA = 1.0
+
+
+def save_csv(cleaned, tmp_dir: str) -> None:
+    """Writes the minute and day files to a fresh pair of paths."""
+    prefix = os.path.join(tmp_dir, f"{time.perf_counter_ns()}_")
+    save_dataframe_to_csv(cleaned, prefix + "minute.csv", prefix + "day.csv")
+
+
+def build_cases(n_rows: int, tmp_dir: str) -> dict:
+    """Returns the benchmark cases for one size, with their inputs prepared.
+    Chart builders are called through __wrapped__ to skip Streamlit's cache,
+    and to_dict() includes the data serialisation. Streamlit has no row
+    limit, so Altair's is lifted."""
+    alt.data_transformers.disable_max_rows()
+    raw = generate_readings(n_rows)
+    cleaned = clean_dataframe(raw)
+    live = cleaned.assign(plant_name="Plant " + cleaned["plant_id"].astype(str))
+    summaries = generate_daily_summaries(n_rows)
+    responses = generate_responses(n_rows)
+    return {
+        "decode_responses": lambda: ReadingBatch.from_readings(
+            map(decode_reading, responses)).to_dataframe(),
+        "clean_dataframe": lambda: clean_dataframe(raw),
+        "dataframe_daily_summary": lambda: dataframe_daily_summary(cleaned, SUMMARY_DATE),
+        "save_dataframe_to_csv": lambda: save_csv(cleaned, tmp_dir),
+        "get_temperature_line_graph": lambda: get_temperature_line_graph.__wrapped__(
+            live, "Plant 1", 0).to_dict(),
+        "get_temperature_line_chart": lambda: get_temperature_line_chart.__wrapped__(
+            summaries, 0, ["Plant 1", "Plant 2", "Plant 3"]).to_dict(),
+    }
+
+
+def measure(case, repeat: int) -> dict:
+    """Returns the best wall time of a case and its peak traced memory."""
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        case()
+        seconds.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    case()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(min(seconds), 6), "peak_mb": round((peak - before) / 2 ** 20, 3)}
+
+
+def run(sizes: list[str], repeat: int) -> dict:
+    """Runs every case at every size, printing results as it goes."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            runs = repeat if SIZES[size] < 10_000_000 else 1
+            for name, case in build_cases(SIZES[size], tmp_dir).items():
+                result = measure(case, runs)
+                results.setdefault(name, {})[size] = result
+                print(f"{name:<30}{size:>6}{result['seconds']:>12.4f}s"
+                      f"{result['peak_mb']:>12.2f} MB", flush=True)
+    return results
+
+
+def find_regressions(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Returns a message for every result worse than its baseline by more than threshold."""
+    regressions = []
+    for name, sizes in results.items():
+        for size, result in sizes.items():
+            expected = baseline.get(name, {}).get(size)
+            if expected is None:
+                continue
+            for metric, min_delta in (("seconds", MIN_SECONDS_DELTA),
+                                      ("peak_mb", MIN_PEAK_MB_DELTA)):
+                limit = expected[metric] * (1 + threshold)
+                if result[metric] > limit and result[metric] - expected[metric] > min_delta:
+                    regressions.append(f"{name} at {size}: {metric} {result[metric]} "
+                                       f"> {expected[metric]} (+{threshold:.0%})")
+    return regressions
+
+
+def main(argv: list[str] = None) -> int:
+    """Runs the suite and compares it against, or saves it as, the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help=f"comma separated sizes out of {', '.join(SIZES)}")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float,
+                        default=float(ENV.get("BENCH_THRESHOLD", DEFAULT_THRESHOLD)))
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    results = run(args.sizes.split(","), args.repeat)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as baseline_file:
+                baseline = json.load(baseline_file)
+        for name, sizes in results.items():
+            baseline.setdefault(name, {}).update(sizes)
+        with open(args.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as baseline_file:
+        regressions = find_regressions(results, json.load(baseline_file), args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(regressions)} regressions against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""A seeded generator of synthetic plant API readings for the benchmarks.
+
+Rows look like the records pipeline/extract.py collects, with the same mix
+of problems as the real API: sensor error rows with no readings, nulls,
+blank strings, non-numeric values and out-of-range or negative readings.
+The same seed and size always give the same frame."""
+import json
+import numpy as np
+import pandas as pd
+
+FLEET_SIZE = 50
+DAY_START = np.datetime64("2025-06-05T00:00:00", "ms")
+DAY_MS = 24 * 60 * 60 * 1000
+
+ERROR_RATE = 0.03
+NULL_RATE = 0.01
+BLANK_RATE = 0.005
+NON_NUMERIC_RATE = 0.005
+OUT_OF_RANGE_RATE = 0.02
+
+SENSOR_ERRORS = np.array(["plant sensor fault", "sensor timeout"], dtype=object)
+PLANT_NAMES = np.array([f"Plant {plant_id}" for plant_id in range(1, FLEET_SIZE + 1)],
+                       dtype=object)
+READING_COLUMNS = ["temperature", "soil_moisture", "recording_taken", "last_watered",
+                   "plant_id"]
+
+
+def iso_timestamps(milliseconds: np.ndarray) -> np.ndarray:
+    """Returns API style timestamps (2025-06-05T14:30:31.531Z) for
+    millisecond offsets from the start of the day."""
+    return np.datetime_as_string(DAY_START + milliseconds.astype("timedelta64[ms]"),
+                                 unit="ms", timezone="UTC").astype(object)
+
+
+def generate_readings(n_rows: int, seed: int = 0, n_plants: int = FLEET_SIZE) -> pd.DataFrame:
+    """Returns n_rows raw readings spread over one day for n_plants plants."""
+    rng = np.random.default_rng(seed)
+    plant_id = np.arange(n_rows) % n_plants + 1
+    temperature = rng.normal(18, 4, n_rows)
+    soil_moisture = rng.normal(55, 15, n_rows)
+
+    out_of_range = rng.random(n_rows) < OUT_OF_RANGE_RATE
+    temperature[out_of_range] = rng.choice([-5.0, 8.0, 35.0], out_of_range.sum())
+    soil_moisture[out_of_range] = rng.choice([-2.0, 15.0, 101.0], out_of_range.sum())
+
+    recorded = np.sort(rng.integers(0, DAY_MS, n_rows))
+    watered = recorded - rng.integers(60_000, DAY_MS // 2, n_rows)
+    readings = {
+        "temperature": temperature.astype(object),
+        "soil_moisture": soil_moisture.astype(object),
+        "recording_taken": iso_timestamps(recorded),
+        "last_watered": iso_timestamps(watered),
+        "plant_id": plant_id.astype(object),
+    }
+
+    # Each problem is applied to one randomly chosen column per affected row.
+    column_choice = rng.integers(0, len(READING_COLUMNS), n_rows)
+    for rate, value in ((NULL_RATE, None), (BLANK_RATE, " ")):
+        affected = rng.random(n_rows) < rate
+        for index, column in enumerate(READING_COLUMNS):
+            readings[column][affected & (column_choice == index)] = value
+    non_numeric = rng.random(n_rows) < NON_NUMERIC_RATE
+    readings["temperature"][non_numeric & (column_choice % 2 == 0)] = "N/A"
+    readings["soil_moisture"][non_numeric & (column_choice % 2 == 1)] = "N/A"
+
+    error = np.full(n_rows, None, dtype=object)
+    failed = rng.random(n_rows) < ERROR_RATE
+    error[failed] = rng.choice(SENSOR_ERRORS, failed.sum())
+    # Like the API, error rows only carry the plant id and the error.
+    for column in READING_COLUMNS[:-1]:
+        readings[column][failed] = None
+
+    return pd.DataFrame({**readings, "error": error,
+                         "name": PLANT_NAMES[(plant_id - 1) % FLEET_SIZE]})
+
+
+def generate_responses(n_rows: int, seed: int = 0, n_plants: int = FLEET_SIZE) -> list[bytes]:
+    """Returns the readings as raw API response bodies, with the nested
+    botanist, origin and image objects the pipeline doesn't use."""
+    readings = generate_readings(n_rows, seed, n_plants).astype(object)
+    responses = []
+    for row in readings.where(readings.notna(), None).to_dict("records"):
+        if row["error"] is None:
+            del row["error"]
+            row.update({
+                "botanist": {"name": "Marty Lang", "email": "marty.lang@lnhm.co.uk",
+                             "phone": "1-539-229-4058"},
+                "origin_location": {"latitude": -58.3733, "longitude": 6.5244,
+                                    "city": "Cutler Bay", "country": "Mexico"},
+                "images": {"license": 451, "regular_url": "https://perenual.com/image.jpg",
+                           "thumbnail": "https://perenual.com/thumbnail.jpg"},
+                "scientific_name": [row["name"]]})
+        else:
+            row = {"plant_id": row["plant_id"], "error": row["error"]}
+        responses.append(json.dumps(row).encode("utf-8"))
+    return responses
+
+
+def generate_daily_summaries(n_rows: int, seed: int = 0,
+                             n_plants: int = FLEET_SIZE) -> pd.DataFrame:
+    """Returns n_rows archived daily summaries, one per plant per day."""
+    rng = np.random.default_rng(seed)
+    plant_id = np.arange(n_rows) % n_plants + 1
+    day = np.arange(n_rows) // n_plants
+    return pd.DataFrame({
+        "plant_id": plant_id,
+        "plant_name": PLANT_NAMES[(plant_id - 1) % FLEET_SIZE],
+        "avg_temperature": rng.normal(18, 3, n_rows),
+        "avg_soil_moisture": rng.normal(55, 10, n_rows),
+        "recording_count": rng.integers(1000, 1440, n_rows),
+        "date": np.datetime_as_string(DAY_START.astype("datetime64[D]") - day,
+                                      unit="D").astype(object),
+    })
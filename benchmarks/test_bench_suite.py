@@ -0,0 +1,29 @@
+# pylint: skip-file
+
+"""Tests the regression check of the benchmark suite."""
+
+from bench_suite import find_regressions
+
+BASELINE = {"clean_dataframe": {"100k": {"seconds": 0.5, "peak_mb": 15.0}}}
+
+
+def test_results_within_threshold_pass():
+    """Small slowdowns and sizes missing from the baseline are not regressions."""
+    results = {"clean_dataframe": {"100k": {"seconds": 0.7, "peak_mb": 15.5},
+                                   "10M": {"seconds": 90.0, "peak_mb": 2000.0}}}
+    assert find_regressions(results, BASELINE, threshold=0.5) == []
+
+
+def test_slower_or_larger_results_fail():
+    """Time and peak memory are both checked against the threshold."""
+    results = {"clean_dataframe": {"100k": {"seconds": 0.8, "peak_mb": 40.0}}}
+    regressions = find_regressions(results, BASELINE, threshold=0.5)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("clean_dataframe at 100k: seconds")
+
+
+def test_noise_on_tiny_timings_is_ignored():
+    """A doubling of a sub-millisecond case is below the noise floor."""
+    baseline = {"dataframe_daily_summary": {"1k": {"seconds": 0.001, "peak_mb": 0.1}}}
+    results = {"dataframe_daily_summary": {"1k": {"seconds": 0.002, "peak_mb": 0.3}}}
+    assert find_regressions(results, baseline, threshold=0.5) == []
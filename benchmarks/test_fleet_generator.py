@@ -0,0 +1,49 @@
+# pylint: skip-file
+
+"""Tests the synthetic fleet readings used by the benchmark suite."""
+
+import pandas as pd
+import json
+from fleet_generator import generate_daily_summaries, generate_readings, generate_responses
+
+
+def test_same_seed_gives_same_readings():
+    """The generator is deterministic for a seed and size."""
+    pd.testing.assert_frame_equal(generate_readings(500, seed=3), generate_readings(500, seed=3))
+    assert not generate_readings(500, seed=3).equals(generate_readings(500, seed=4))
+
+
+def test_readings_include_the_problem_rows():
+    """Error rows, nulls, blanks, non-numeric and out-of-range values all appear."""
+    df = generate_readings(20_000)
+
+    assert len(df) == 20_000
+    assert set(pd.to_numeric(df["plant_id"], errors="coerce").dropna()) <= set(range(1, 51))
+    errors = df["error"].notna()
+    assert 0.01 < errors.mean() < 0.05
+    assert df.loc[errors, ["temperature", "soil_moisture", "recording_taken"]].isna().all().all()
+
+    readings = df[~errors]
+    assert readings["recording_taken"].isna().any()
+    assert (readings["last_watered"] == " ").any()
+    assert (readings["temperature"] == "N/A").any()
+    temperature = pd.to_numeric(readings["temperature"], errors="coerce")
+    assert (temperature < 0).any() and (temperature >= 30).any()
+    timestamps = readings["recording_taken"].dropna()
+    assert timestamps[timestamps != " "].str.endswith("Z").all()
+
+
+def test_daily_summaries_are_one_row_per_plant_per_day():
+    """Summaries cycle through the fleet one day at a time."""
+    df = generate_daily_summaries(120)
+    assert not df.duplicated(["plant_id", "date"]).any()
+    assert df["date"].nunique() == 3
+
+
+def test_responses_are_api_shaped():
+    """Responses are JSON bodies with nested fields, error rows only carry the id and error."""
+    responses = [json.loads(body) for body in generate_responses(2_000)]
+
+    assert len(responses) == 2_000
+    assert all(set(body) == {"plant_id", "error"} for body in responses if "error" in body)
+    assert all("botanist" in body for body in responses if "error" not in body)
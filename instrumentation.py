@@ -0,0 +1,178 @@
+"""Per-stage timing and throughput metrics for the LNHM lambdas.
+
+A run is made of spans (extract, transform, load, archive, alert...).
+Each span records its wall time, rows in and out, and the requests,
+retries and database round trips counted while it was open. Spans and a
+per-run summary are written as CloudWatch Embedded Metric Format (EMF)
+JSON lines to stdout, which Lambda turns into metrics. Only the standard
+library is imported, so the alerter's cold start stays light."""
+import json
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable
+
+NAMESPACE = "LNHM"
+COUNTERS = ("requests", "retries", "db_round_trips")
+
+METRIC_UNITS = {
+    "WallTime": "Milliseconds",
+    "RowsIn": "Count",
+    "RowsOut": "Count",
+    "Requests": "Count",
+    "Retries": "Count",
+    "DbRoundTrips": "Count",
+    "PeakMemory": "Megabytes",
+}
+
+_current_run = ContextVar("current_run", default=None)
+_current_span = ContextVar("current_span", default=None)
+_span_listeners = []
+
+
+def add_span_listener(listener: Callable[[str, "Span"], None]) -> None:
+    """Calls listener("start", span) and listener("end", span) around every span."""
+    _span_listeners.append(listener)
+
+
+def remove_span_listener(listener: Callable[[str, "Span"], None]) -> None:
+    """Stops calling a listener added with add_span_listener."""
+    _span_listeners.remove(listener)
+
+
+def write_stdout(record: dict) -> None:
+    """Writes one EMF record as a JSON line to stdout."""
+    sys.stdout.write(json.dumps(record, default=str) + "\n")
+    sys.stdout.flush()
+
+
+def emf_record(service: str, stage: str, metrics: dict, properties: dict = None,
+               timestamp: float = None) -> dict:
+    """Returns a CloudWatch EMF record for the given metrics, dimensioned
+    by service and stage. Metrics which are None are left out."""
+    metrics = {name: value for name, value in metrics.items() if value is not None}
+    return {
+        "_aws": {
+            "Timestamp": int((timestamp or time.time()) * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": NAMESPACE,
+                "Dimensions": [["Service", "Stage"]],
+                "Metrics": [{"Name": name, "Unit": METRIC_UNITS.get(name, "None")}
+                            for name in metrics]
+            }]
+        },
+        "Service": service,
+        "Stage": stage,
+        **metrics,
+        **(properties or {})
+    }
+
+
+@dataclass
+class Span:
+    """The measurements of one stage of a run."""
+    name: str
+    rows_in: int | None = None
+    rows_out: int | None = None
+    counters: dict = field(default_factory=lambda: dict.fromkeys(COUNTERS, 0))
+    wall_ms: float = 0.0
+    error: str | None = None
+
+    def metrics(self) -> dict:
+        """Returns the span's values by EMF metric name."""
+        return {"WallTime": round(self.wall_ms, 3), "RowsIn": self.rows_in,
+                "RowsOut": self.rows_out, "Requests": self.counters["requests"],
+                "Retries": self.counters["retries"],
+                "DbRoundTrips": self.counters["db_round_trips"]}
+
+
+@dataclass
+class Run:
+    """The spans recorded during one lambda invocation."""
+    service: str
+    sink: Callable[[dict], None] = write_stdout
+    spans: list = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+
+    def summary(self) -> dict:
+        """Returns the per-run summary record."""
+        totals = {counter: sum(span.counters[counter] for span in self.spans)
+                  for counter in COUNTERS}
+        failed = [span.name for span in self.spans if span.error]
+        return emf_record(self.service, "run", {
+            "WallTime": round((time.perf_counter() - self.started) * 1000, 3),
+            "Requests": totals["requests"],
+            "Retries": totals["retries"],
+            "DbRoundTrips": totals["db_round_trips"]
+        }, {"Spans": {span.name: round(span.wall_ms, 3) for span in self.spans},
+            "FailedSpans": failed})
+
+
+@contextmanager
+def start_run(service: str, sink: Callable[[dict], None] = write_stdout):
+    """Records the spans opened inside the block and emits a summary when it ends."""
+    run = Run(service, sink)
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
+        sink(run.summary())
+
+
+@contextmanager
+def span(name: str, rows_in: int = None):
+    """Times a stage of the current run. Set rows_out on the yielded span.
+    Outside a run the span is still measured but not emitted."""
+    current = Span(name, rows_in=rows_in)
+    token = _current_span.set(current)
+    for listener in _span_listeners:
+        listener("start", current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except Exception as exc:
+        current.error = type(exc).__name__
+        raise
+    finally:
+        current.wall_ms = (time.perf_counter() - started) * 1000
+        _current_span.reset(token)
+        for listener in _span_listeners:
+            listener("end", current)
+        run = _current_run.get()
+        if run is not None:
+            run.spans.append(current)
+            run.sink(emf_record(run.service, name, current.metrics(),
+                                {"Error": current.error} if current.error else None))
+
+
+def count(counter: str, amount: int = 1) -> None:
+    """Adds to a counter (requests, retries or db_round_trips) of the
+    innermost open span. Does nothing outside a span."""
+    current = _current_span.get()
+    if current is not None:
+        current.counters[counter] += amount
+
+
+def count_aws_response(response: dict) -> None:
+    """Counts one AWS request and the retries botocore made for it."""
+    count("requests")
+    if isinstance(response, dict):
+        count("retries", response.get("ResponseMetadata", {}).get("RetryAttempts", 0))
+
+
+def _count_db_round_trip(*_args, **_kwargs) -> None:
+    """Counts one statement sent by an instrumented engine."""
+    count("db_round_trips")
+
+
+def track_db_round_trips(engine) -> None:
+    """Counts every statement a SQLAlchemy engine sends as a DB round trip.
+    The listener is only added once per engine, so long-lived engines (the
+    poller's) can be passed in on every run without counting twice."""
+    from sqlalchemy import event  # pylint: disable=import-outside-toplevel
+
+    if not event.contains(engine, "before_cursor_execute", _count_db_round_trip):
+        event.listen(engine, "before_cursor_execute", _count_db_round_trip)
@@ -5,27 +5,80 @@ import pandas as pd
 from extract import PlantAPIClient
 from transform import clean_dataframe
 from load import insert_transformed_data
+from stream_checks import run_stream_checks
+from storage import ReadingStore
 
+from instrumentation import span, start_run
 from utils import set_logger, get_logger
 
 
-def run_pipeline() -> pd.DataFrame:
-    """Runs each stage of the pipeline in succession."""
+def run_in_process_alerts(error_data: pd.DataFrame) -> bool:
+    """Runs the alerter in this process, skipping the separate alerter lambda.
+    Returns whether every alert was sent: if any digest failed, the caller
+    hands all the errors off to the alerter lambda, whose cooldown skips
+    the ones which did go out. Alert failures are logged rather than
+    raised so they don't discard the loaded readings."""
+    logger = get_logger()
+    try:
+        from send_alerts import alert_on_errors  # pylint: disable=import-outside-toplevel
+        with span("alert", rows_in=len(error_data)) as alert_span:
+            result = alert_on_errors(error_data.to_dict("records"))
+            alert_span.rows_out = result.get("alert_count", 0)
+        logger.info("Alert result: %s", result)
+        return result.get("failed_digest_count", 0) == 0
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.error("In-process alerting failed: %s", e)
+        return False
+
+
+def run_pipeline(alert_in_process: bool = False, shard: dict = None,
+                 client: PlantAPIClient = None, store: ReadingStore = None,
+                 raise_errors: bool = False) -> pd.DataFrame:
+    """Runs each stage of the pipeline in succession and returns the error data.
+    If alert_in_process is set, alerts are also sent at the end of the run.
+    If a shard is given only its plants are extracted (see sharding.py).
+    Long-running callers pass their own client and store to keep their
+    HTTP and database connections warm between runs, and can set
+    raise_errors to tell a failed run from one with no errors."""
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    return run_pipeline_and_alert(alert_in_process, shard, client, store, raise_errors)[0]
+
+
+def run_pipeline_and_alert(alert_in_process: bool = False, shard: dict = None,
+                           client: PlantAPIClient = None, store: ReadingStore = None,
+                           raise_errors: bool = False) -> tuple[pd.DataFrame, bool]:
+    """Runs the pipeline like run_pipeline, and returns the error data and
+    whether the alerts were sent in-process. The alert stage is a span of
+    the run, so its metrics are emitted with the other stages'."""
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
     set_logger()
     load_dotenv()
     try:
-        client = PlantAPIClient(ENV["BASE_URL"])
-        plant_data = client.get_all_plants()
-        if not plant_data:
-            return pd.DataFrame()
-
-        plant_df = pd.DataFrame.from_dict(plant_data)
-        transformed_dataframe = clean_dataframe(plant_df)
-        return insert_transformed_data(transformed_dataframe)
+        with start_run("pipeline"):
+            with span("extract") as extract_span:
+                client = client or PlantAPIClient(ENV["BASE_URL"])
+                plant_data = client.get_batch(shard)
+                extract_span.rows_out = len(plant_data)
+            if not plant_data:
+                return pd.DataFrame(), alert_in_process
+
+            with span("transform", rows_in=len(plant_data)) as transform_span:
+                plant_df = plant_data.to_dataframe()
+                transformed_dataframe = clean_dataframe(plant_df)
+                if ENV.get("STREAM_CHECKS", "").lower() == "true":
+                    transformed_dataframe = run_stream_checks(transformed_dataframe)
+                transform_span.rows_out = len(transformed_dataframe)
+            with span("load", rows_in=len(transformed_dataframe)) as load_span:
+                error_data = insert_transformed_data(transformed_dataframe, store=store)
+                load_span.rows_out = len(transformed_dataframe)
+            alerts_sent = alert_in_process and run_in_process_alerts(error_data)
+            return error_data, alerts_sent
     except Exception as e:
         logger = get_logger()
         logger.error(f"Pipeline failed: {str(e)}")
-        return pd.DataFrame()
+        if raise_errors:
+            raise
+        return pd.DataFrame(), False
 
 
 if __name__ == "__main__":
@@ -4,17 +4,33 @@ from os import environ as ENV
 import csv
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
 
+from instrumentation import count
+from readings import PlantReading, ReadingBatch, decode_reading
 from utils import get_logger, set_logger
 
 
+def create_session(pool_size: int = 10) -> requests.Session:
+    """Returns a session which keeps up to pool_size connections to the API
+    open between requests, for long-running callers such as poller.py."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 class PlantAPIClient:
-    """Client for retrieving plant health data from API."""
+    """Client for retrieving plant health data from API.
+    Requests go through session if one is given, reusing its connections."""
 
-    def __init__(self, base_url: str, not_found_limit: int = 5):
+    def __init__(self, base_url: str, not_found_limit: int = 5,
+                 session: requests.Session = None):
         self.logger = get_logger()
         self._base_url = base_url
         self._not_found_limit = not_found_limit
+        self._session = session
 
     @property
     def base_url(self) -> str:
@@ -38,33 +54,50 @@ class PlantAPIClient:
             raise TypeError("not_found_limit must be an integer.")
         self._not_found_limit = value
 
-    def get_request(self, base_url: str) -> dict:
-        """Get request from a given URL string."""
+    def _get(self, base_url: str) -> requests.Response:
+        """Sends a GET request to a given URL string."""
         if not isinstance(base_url, str):
             self.logger.critical("Invalid URL type.")
             raise TypeError("Invalid URL type.")
         try:
-            response = requests.get(base_url, timeout=10)
-            return response.json()
+            count("requests")
+            return (self._session or requests).get(base_url, timeout=10)
         except requests.exceptions.Timeout as exc:
             self.logger.critical("Request timed out.")
             raise exc
 
-    def fetch_data(self, plant_id: int) -> dict:
-        """Connects to the api and returns the data as json."""
-        self.logger.info("Connecting to API...")
+    def get_request(self, base_url: str) -> dict:
+        """Get request from a given URL string."""
+        return self._get(base_url).json()
+
+    def get_reading(self, base_url: str) -> PlantReading:
+        """Get request from a given URL string, decoded as a typed reading."""
+        return decode_reading(self._get(base_url).content)
+
+    def _plant_url(self, plant_id: int) -> str:
+        """Returns the API URL of a plant."""
         if not isinstance(self.base_url, str):
             self.logger.critical("Invalid URL type.")
             raise TypeError("Invalid URL type.")
         if not isinstance(plant_id, int):
             self.logger.critical("Invalid plant_id type.")
             raise TypeError("Invalid plant_id type.")
+        return self.base_url + str(plant_id)
 
-        plant_url = self.base_url + str(plant_id)
-        data = self.get_request(plant_url)
+    def fetch_data(self, plant_id: int) -> dict:
+        """Connects to the api and returns the data as json."""
+        self.logger.info("Connecting to API...")
+        data = self.get_request(self._plant_url(plant_id))
         self.logger.info("Received response for plant %s.", plant_id)
         return data
 
+    def fetch_reading(self, plant_id: int) -> PlantReading:
+        """Connects to the api and returns the plant's reading."""
+        self.logger.info("Connecting to API...")
+        reading = self.get_reading(self._plant_url(plant_id))
+        self.logger.info("Received response for plant %s.", plant_id)
+        return reading
+
     def get_all_plants(self) -> list[dict]:
         """Collects all the plant data and returns as a dataframe."""
         self.logger.info("Collating plants...")
@@ -74,13 +107,19 @@ class PlantAPIClient:
         if not isinstance(self.not_found_limit, int):
             self.logger.critical("Not found limit is invalid. Aborting.")
             raise TypeError("Please use a valid int value.")
+        return self.get_plants_from(1)
 
+    def get_plants_from(self, start_id: int, fetch=None) -> list[dict]:
+        """Collects plants from start_id upwards until not_found_limit
+        plants in a row are not found. Each plant is fetched with fetch,
+        fetch_data unless given."""
         list_of_plants = []
+        fetch = fetch or self.fetch_data
 
-        plant_id = 1  # Start index from 1
+        plant_id = start_id
         not_found_count = 0  # How many plants not found in a row
         while True:
-            json_data = self.fetch_data(plant_id)
+            json_data = fetch(plant_id)
             if json_data.get('error'):
                 error_msg = json_data['error']
                 if error_msg == 'plant not found':
@@ -101,6 +140,34 @@ class PlantAPIClient:
             plant_id += 1
         return list_of_plants
 
+    def get_plants(self, plant_ids: list[int], fetch=None) -> list[dict]:
+        """Collects the given plants, skipping any which are not found."""
+        list_of_plants = []
+        fetch = fetch or self.fetch_data
+        for plant_id in plant_ids:
+            json_data = fetch(int(plant_id))
+            if json_data.get('error') == 'plant not found':
+                self.logger.warning("Plant %s was not found.", plant_id)
+                continue
+            list_of_plants.append(json_data)
+        return list_of_plants
+
+    def get_shard(self, shard: dict, fetch=None) -> list[dict]:
+        """Collects one shard of the plant ID space: either a list of known
+        plant_ids, or an open-ended sweep from start_id (see sharding.py)."""
+        self.logger.info("Collating shard %s...", shard.get("shard"))
+        if "plant_ids" in shard:
+            return self.get_plants(shard["plant_ids"], fetch)
+        return self.get_plants_from(shard["start_id"], fetch)
+
+    def get_batch(self, shard: dict = None) -> ReadingBatch:
+        """Collects every plant, or one shard, as typed readings in a
+        columnar batch, for the ETL pipeline."""
+        if shard:
+            return ReadingBatch.from_readings(self.get_shard(shard, self.fetch_reading))
+        self.logger.info("Collating plants...")
+        return ReadingBatch.from_readings(self.get_plants_from(1, self.fetch_reading))
+
 
 def save_to_csv(plants_list: list[dict], filename: str = "data/output.csv") -> None:
     """Saves data to a local output csv file."""
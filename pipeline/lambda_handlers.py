@@ -1,20 +1,110 @@
 """AWS Lambda entrypoint to run the ETL pipeline."""
-from etl_controller import run_pipeline
+import json
+from os import environ as ENV, makedirs, path
+from datetime import datetime
+from boto3 import client
+from etl_controller import run_pipeline, run_pipeline_and_alert
+from profiling import profile_handler
+from sharding import known_plant_ids, merge_error_data, plan_shards
 import pandas as pd
 
 
+def hand_off_error_data(error_data: pd.DataFrame) -> dict:
+    """Writes error data to S3 (ALERT_PAYLOAD_BUCKET) or a local directory
+    (ALERT_PAYLOAD_DIR) and returns a small pointer to it for the step function.
+    Returns the records inline if neither is configured."""
+    if error_data.empty:
+        return {"error_data": []}
+
+    payload = error_data.to_json(orient="records")
+    file_name = f"error_data_{datetime.now():%Y-%m-%d_%H%M%S_%f}.json"
+
+    if ENV.get("ALERT_PAYLOAD_BUCKET"):
+        key = f"alert_payloads/{file_name}"
+        client("s3", region_name=ENV.get("AWS_REGION", "eu-west-2")).put_object(
+            Bucket=ENV["ALERT_PAYLOAD_BUCKET"], Key=key, Body=payload,
+            ContentType="application/json")
+        return {"error_data_ref": {"bucket": ENV["ALERT_PAYLOAD_BUCKET"], "key": key}}
+
+    if ENV.get("ALERT_PAYLOAD_DIR"):
+        makedirs(ENV["ALERT_PAYLOAD_DIR"], exist_ok=True)
+        file_path = path.join(ENV["ALERT_PAYLOAD_DIR"], file_name)
+        with open(file_path, "w", encoding="utf-8") as payload_file:
+            payload_file.write(payload)
+        return {"error_data_ref": {"path": file_path}}
+
+    return {"error_data": json.loads(payload)}
+
+
+@profile_handler("pipeline")
 def etl_lambda_handler(event, context):
-    """AWS Lambda handler to trigger ETL pipeline."""
+    """AWS Lambda handler to trigger ETL pipeline.
+    Alerts are sent in-process if the event or ALERT_IN_PROCESS env var asks for it.
+    If they can't be, the errors are handed off to the alerter lambda as usual."""
     try:
-        error_data = run_pipeline()
-        return {
+        alert_in_process = event.get(
+            "alert_in_process", ENV.get("ALERT_IN_PROCESS", "").lower() == "true")
+        error_data, alerts_sent = run_pipeline_and_alert(alert_in_process=alert_in_process)
+        response = {
             "statusCode": 200,
             "body": "ETL pipeline executed successfully.",
-            "error_data": error_data.to_dict('records') if not error_data.empty else []
         }
+        if alert_in_process:
+            response["alerts_sent_in_process"] = alerts_sent
+        if alerts_sent:
+            response["error_data"] = []
+        else:
+            response.update(hand_off_error_data(error_data))
+        return response
     except Exception as e:
         return {
             "statusCode": 500,
             "body": f"ETL pipeline failed: {str(e)}",
             "error_data": []
         }
+
+
+def read_error_data(result: dict) -> pd.DataFrame:
+    """Returns the error_data of a handler result, inline or behind a pointer."""
+    ref = result.get("error_data_ref")
+    if not ref:
+        return pd.DataFrame(result.get("error_data", []))
+    if "bucket" in ref:
+        response = client("s3", region_name=ENV.get("AWS_REGION", "eu-west-2")).get_object(
+            Bucket=ref["bucket"], Key=ref["key"])
+        return pd.DataFrame(json.loads(response["Body"].read()))
+    with open(ref["path"], encoding="utf-8") as payload_file:
+        return pd.DataFrame(json.load(payload_file))
+
+
+def plan_shards_lambda_handler(event, context):
+    """Returns the shards for a Step Functions Map over shard_lambda_handler.
+    The event may give plant_ids and shard_count, otherwise DIM_plant is used."""
+    plant_ids = event.get("plant_ids")
+    return {"shards": plan_shards(known_plant_ids() if plant_ids is None else plant_ids,
+                                  event.get("shard_count"))}
+
+
+@profile_handler("pipeline")
+def shard_lambda_handler(event, context):
+    """Runs the ETL pipeline for the one shard in the event."""
+    shard = event.get("shard", event)
+    try:
+        error_data = run_pipeline(shard=shard)
+        return {"statusCode": 200, "shard": shard.get("shard"),
+                **hand_off_error_data(error_data)}
+    except Exception as e:
+        return {"statusCode": 500, "shard": shard.get("shard"),
+                "body": f"ETL shard failed: {str(e)}", "error_data": []}
+
+
+def merge_shards_lambda_handler(event, context):
+    """Merges the error_data of every shard result into one hand-off,
+    shaped like etl_lambda_handler's response for the alerter."""
+    results = event.get("shard_results", []) if isinstance(event, dict) else event
+    failed = [result.get("shard") for result in results if result.get("statusCode") != 200]
+    error_data = merge_error_data([read_error_data(result) for result in results])
+    return {"statusCode": 200,
+            "body": f"ETL pipeline executed in {len(results)} shards.",
+            "failed_shards": failed,
+            **hand_off_error_data(error_data)}
@@ -1,17 +1,102 @@
 """Load script for inserting minute-by-minute data generated by transform into database."""
 
-from os import environ as ENV, path
+from os import path
 from dotenv import load_dotenv
 import sqlalchemy
 import pandas as pd
 import pyodbc
 
+from instrumentation import track_db_round_trips
+from storage import ReadingStore, get_store
 from utils import get_logger, set_logger, load_csv_to_df
 
 
-def insert_transformed_data(transformed_data: pd.DataFrame = None) -> pd.DataFrame:
-    """Calls the connect function to inserts daily data into Microsoft SQL server database.
-    Dataframe that is returned consists of only rows that have errors, for step function"""
+def aggregate_readings(readings: pd.DataFrame, key: str) -> list[dict]:
+    """Returns the reading count and temperature/moisture sums and counts
+    of a batch of readings, grouped by the given key column."""
+    grouped = readings.groupby(key)
+    summary = pd.DataFrame({
+        'reading_count': grouped.size(),
+        'temperature_count': grouped['temperature'].count(),
+        'temperature_sum': grouped['temperature'].sum(),
+        'soil_moisture_count': grouped['soil_moisture'].count(),
+        'soil_moisture_sum': grouped['soil_moisture'].sum(),
+    }).reset_index()
+    return summary.to_dict('records')
+
+
+def summarise_batch(transformed_data: pd.DataFrame) -> tuple[list[dict], list[dict]]:
+    """Returns the per-plant and per-minute aggregates of a batch of readings."""
+    readings = transformed_data[['plant_id', 'temperature', 'soil_moisture',
+                                 'recording_taken']].dropna(subset=['plant_id'])
+    for col in ['temperature', 'soil_moisture']:
+        readings[col] = pd.to_numeric(readings[col], errors='coerce')
+    readings['plant_id'] = readings['plant_id'].astype(int)
+
+    recording_taken = pd.to_datetime(readings['recording_taken'], utc=True)
+    readings['bucket_start'] = recording_taken.dt.floor(
+        'min').dt.tz_localize(None)
+
+    plant_rows = aggregate_readings(readings, 'plant_id')
+    bucket_rows = aggregate_readings(
+        readings.dropna(subset=['bucket_start']), 'bucket_start')
+    for row in bucket_rows:
+        row['bucket_start'] = row['bucket_start'].to_pydatetime()
+    return plant_rows, bucket_rows
+
+
+def summarise_current_state(transformed_data: pd.DataFrame,
+                            plant_rows: list[dict]) -> list[dict]:
+    """Returns each plant's latest reading in a batch, with its error state
+    and the batch's per-plant totals for the running averages. Error rows
+    without a reading sort first, so a plant's latest row is its newest
+    reading unless the batch only has an error for it."""
+    readings = transformed_data[['plant_id', 'recording_taken', 'temperature',
+                                 'soil_moisture', 'last_watered',
+                                 'error_msg']].dropna(subset=['plant_id'])
+    for col in ['temperature', 'soil_moisture']:
+        readings[col] = pd.to_numeric(readings[col], errors='coerce')
+    for col in ['recording_taken', 'last_watered']:
+        readings[col] = pd.to_datetime(readings[col], utc=True).dt.tz_localize(None)
+    readings['plant_id'] = readings['plant_id'].astype(int)
+
+    latest = (readings.sort_values('recording_taken', kind='stable', na_position='first')
+              .groupby('plant_id').tail(1).set_index('plant_id'))
+    state_rows = []
+    for row in plant_rows:
+        reading = latest.loc[row['plant_id']]
+        state_rows.append({
+            **row,
+            'recording_taken': None if pd.isna(reading['recording_taken'])
+            else reading['recording_taken'].to_pydatetime(),
+            'temperature': None if pd.isna(reading['temperature'])
+            else float(reading['temperature']),
+            'soil_moisture': None if pd.isna(reading['soil_moisture'])
+            else float(reading['soil_moisture']),
+            'last_watered': None if pd.isna(reading['last_watered'])
+            else reading['last_watered'].to_pydatetime(),
+            'error_msg': None if pd.isna(reading['error_msg']) else reading['error_msg'],
+        })
+    return state_rows
+
+
+def update_summary_tables(store: ReadingStore, conn: sqlalchemy.Connection,
+                          transformed_data: pd.DataFrame) -> None:
+    """Adds a batch of readings to the pre-aggregated summary tables
+    used by the dashboard charts, and to the current state of each plant."""
+    logger = get_logger()
+    plant_rows, bucket_rows = summarise_batch(transformed_data)
+    store.update_summaries(conn, plant_rows, bucket_rows)
+    store.update_current_state(conn, summarise_current_state(transformed_data, plant_rows))
+    logger.info("Updated summaries for %s plants and %s time buckets.",
+                len(plant_rows), len(bucket_rows))
+
+
+def insert_transformed_data(transformed_data: pd.DataFrame = None,
+                            store: ReadingStore = None) -> pd.DataFrame:
+    """Inserts the batch into the readings database (the STORAGE_BACKEND
+    store unless one is given). Dataframe that is returned consists of only
+    rows that have errors, for step function"""
     logger = get_logger()
 
     if transformed_data is None:
@@ -27,18 +112,15 @@ def insert_transformed_data(transformed_data: pd.DataFrame = None) -> pd.DataFra
 
     logger.info("Inserting data into database setup...")
     try:
-        engine = sqlalchemy.create_engine(
-            (f"mssql+pyodbc://{ENV['DB_USER']}:{ENV['DB_PASSWORD']}"
-             f"@{ENV['DB_HOST']}/{ENV['DB_NAME']}?driver={ENV['DB_DRIVER']}"),
-            connect_args={'connect_timeout': 10,
-                          'TrustServerCertificate': 'yes'},
-            echo=False)
+        store = store or get_store()
     except pyodbc.DataError as exc:
         logger.critical(exc)
         raise exc
+    track_db_round_trips(store.engine)
 
-    transformed_data.to_sql('FACT_plant_reading',
-                            engine, index=False, if_exists='append')
+    with store.engine.begin() as conn:
+        store.append_readings(conn, transformed_data)
+        update_summary_tables(store, conn, transformed_data)
 
     logger.info("Successfully inserted data!")
 
@@ -0,0 +1,179 @@
+"""A long-running worker which polls the plant API on a sub-minute cadence,
+instead of a Lambda fired once a minute.
+
+The worker keeps one HTTP session and one database engine warm between
+runs. Ticks are scheduled on a fixed grid from the start time, so they
+don't drift. Each tick runs the pipeline for the plants which are due:
+plants in error are polled every ERROR_INTERVAL seconds and healthy ones
+every HEALTHY_INTERVAL. The tail of the ID space is swept for new plants
+every DISCOVERY_INTERVAL, and the plants it finds are scheduled like the
+known ones. A run which fails leaves its plants' schedule as it was, so
+plants in error keep their cadence through an outage. If a run overruns, the missed ticks are either
+skipped (wait for the next tick on the grid) or coalesced (run once,
+straight away, for all of them).
+
+Run from the pipeline directory: python3 poller.py"""
+import signal
+import threading
+import time
+from os import environ as ENV
+from dotenv import load_dotenv
+import pandas as pd
+import sqlalchemy
+
+from etl_controller import run_pipeline
+from extract import PlantAPIClient, create_session
+from sharding import known_plant_ids
+from storage import ReadingStore, get_store
+from utils import get_logger, set_logger
+
+TICK_SECONDS = 5.0
+ERROR_INTERVAL = 10.0
+HEALTHY_INTERVAL = 300.0
+DISCOVERY_INTERVAL = 300.0
+OVERRUN_POLICIES = ("skip", "coalesce")
+
+
+def next_deadline(deadline: float, now: float, tick: float,
+                  overrun: str = "skip") -> tuple[float, int]:
+    """Returns the deadline of the next tick after the one due at deadline,
+    and how many ticks were missed because the run ended at now."""
+    deadline += tick
+    if now < deadline:
+        return deadline, 0
+    missed = int((now - deadline) // tick) + 1
+    if overrun == "coalesce":
+        # The latest missed tick, which is already due, so it runs at once.
+        return deadline + (missed - 1) * tick, missed - 1
+    return deadline + missed * tick, missed
+
+
+def loaded_plant_ids(store: ReadingStore, start_id: int) -> list[int]:
+    """Returns the plant IDs from start_id upwards which have a row in
+    CURRENT_plant_state, i.e. which a run has loaded."""
+    with store.engine.connect() as conn:
+        return [row[0] for row in conn.execute(sqlalchemy.text(
+            "SELECT plant_id FROM CURRENT_plant_state WHERE plant_id >= :start_id "
+            "ORDER BY plant_id"), {"start_id": start_id})]
+
+
+class PlantPoller:  # pylint: disable=too-many-instance-attributes
+    """Schedules per-plant polls and runs the pipeline for the due plants."""
+
+    def __init__(self, client: PlantAPIClient, store: ReadingStore, plant_ids: list[int],
+                 tick: float = TICK_SECONDS, error_interval: float = ERROR_INTERVAL,
+                 healthy_interval: float = HEALTHY_INTERVAL, overrun: str = "skip",
+                 clock=time.monotonic):
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(f"overrun must be one of {OVERRUN_POLICIES}.")
+        self._client = client
+        self._store = store
+        self._tick = tick
+        self._error_interval = error_interval
+        self._healthy_interval = healthy_interval
+        self._overrun = overrun
+        self._clock = clock
+        self._stop = threading.Event()
+        self._next_poll = dict.fromkeys(plant_ids, 0.0)
+        self._tail_start = max(plant_ids, default=0) + 1
+        self._next_discovery = 0.0
+        self._metrics = {"ticks": 0, "missed_ticks": 0, "plants_polled": 0,
+                         "last_run_seconds": None}
+
+    def due_plants(self, now: float) -> list[int]:
+        """Returns the plants whose next poll is due."""
+        return sorted(plant_id for plant_id, due in self._next_poll.items() if due <= now)
+
+    def _run_shard(self, shard: dict) -> pd.DataFrame | None:
+        """Runs the pipeline for one shard. Returns its error_data, or None
+        if the run failed."""
+        try:
+            return run_pipeline(
+                alert_in_process=ENV.get("ALERT_IN_PROCESS", "").lower() == "true",
+                shard=shard, client=self._client, store=self._store, raise_errors=True)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            get_logger().error("Poll of the %s plants failed, keeping their schedule: %s",
+                               shard["shard"], exc)
+            return None
+
+    def _reschedule(self, plant_ids: list[int], error_data: pd.DataFrame, now: float) -> None:
+        """Schedules the next poll of each plant by whether it is in error."""
+        in_error = set(error_data["plant_id"].astype(int)) if not error_data.empty else set()
+        for plant_id in set(plant_ids) | in_error:
+            interval = self._error_interval if plant_id in in_error else self._healthy_interval
+            self._next_poll[plant_id] = now + interval
+
+    def poll(self, now: float) -> pd.DataFrame:
+        """Runs the pipeline for the due plants, plus the tail of the ID space
+        if it is time to look for new plants, and reschedules them by health.
+        Plants found by the sweep join the schedule and the tail moves past
+        them, so no plant is fetched twice in one tick."""
+        frames = []
+        plant_ids = self.due_plants(now)
+        if plant_ids:
+            error_data = self._run_shard({"shard": "due", "plant_ids": plant_ids})
+            if error_data is not None:
+                self._reschedule(plant_ids, error_data, now)
+                frames.append(error_data)
+                self._metrics["plants_polled"] += len(plant_ids)
+
+        if now >= self._next_discovery:
+            self._next_discovery = now + DISCOVERY_INTERVAL
+            error_data = self._run_shard({"shard": "discovery", "start_id": self._tail_start})
+            if error_data is not None:
+                discovered = loaded_plant_ids(self._store, self._tail_start)
+                self._reschedule(discovered, error_data, now)
+                self._tail_start = max([self._tail_start - 1, *self._next_poll]) + 1
+                frames.append(error_data)
+
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def run(self) -> None:
+        """Polls on the tick grid until stop() is called."""
+        logger = get_logger()
+        deadline = self._clock()
+        while not self._stop.is_set():
+            started = self._clock()
+            try:
+                self.poll(started)
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                logger.error("Poll failed: %s", exc)
+            now = self._clock()
+            self._metrics["ticks"] += 1
+            self._metrics["last_run_seconds"] = now - started
+            deadline, missed = next_deadline(deadline, now, self._tick, self._overrun)
+            if missed:
+                self._metrics["missed_ticks"] += missed
+                logger.warning("Poll took %.1fs, %s tick(s) %s.", now - started, missed,
+                               "coalesced" if self._overrun == "coalesce" else "skipped")
+            self._stop.wait(max(0.0, deadline - self._clock()))
+
+    def stop(self) -> None:
+        """Asks the poll loop to finish after the current tick."""
+        self._stop.set()
+
+    def metrics(self) -> dict:
+        """Returns tick and poll counts."""
+        return dict(self._metrics)
+
+
+def run_poller() -> None:
+    """Starts a poller configured from the environment, stopping on SIGTERM or SIGINT."""
+    set_logger()
+    load_dotenv()
+    store = get_store()
+    poller = PlantPoller(
+        PlantAPIClient(ENV["BASE_URL"], session=create_session()), store, known_plant_ids(store),
+        tick=float(ENV.get("POLL_TICK_SECONDS", TICK_SECONDS)),
+        error_interval=float(ENV.get("POLL_ERROR_INTERVAL", ERROR_INTERVAL)),
+        healthy_interval=float(ENV.get("POLL_HEALTHY_INTERVAL", HEALTHY_INTERVAL)),
+        overrun=ENV.get("POLL_OVERRUN", "skip"))
+    for signal_number in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signal_number, lambda *_: poller.stop())
+    poller.run()
+    get_logger().info("Poller stopped: %s", poller.metrics())
+
+
+if __name__ == "__main__":
+    run_poller()
@@ -0,0 +1,71 @@
+"""Typed plant readings decoded straight from the plant API's response bytes.
+
+Only the fields the pipeline uses are decoded: msgspec skips the nested
+botanist, origin_location and images objects without building them, and
+each reading is a slotted struct rather than a dict. A run's readings are
+collected into a ReadingBatch, one list per column, which becomes the
+DataFrame the transform step cleans."""
+import msgspec
+import pandas as pd
+
+
+class PlantReading(msgspec.Struct, gc=False):
+    """The fields of one plant API response used by the pipeline.
+    Sensor faults can put strings such as "N/A" in the numeric fields,
+    which transform.clean_dataframe drops, so strings are allowed too."""
+    plant_id: int | str | None = None
+    temperature: float | str | None = None
+    soil_moisture: float | str | None = None
+    recording_taken: str | None = None
+    last_watered: str | None = None
+    error: str | None = None
+
+    def get(self, field: str, default=None):
+        """Returns a field like dict.get, so the extract loops can collect
+        readings and raw responses alike."""
+        return getattr(self, field, default)
+
+
+READING_FIELDS = PlantReading.__struct_fields__
+READING_DECODER = msgspec.json.Decoder(PlantReading)
+
+
+def decode_reading(content: bytes) -> PlantReading:
+    """Decodes one API response. A response with a field of an unexpected
+    type (e.g. a nested object) is decoded untyped and kept as it is,
+    as the untyped DataFrame path used to."""
+    try:
+        return READING_DECODER.decode(content)
+    except msgspec.ValidationError:
+        data = msgspec.json.decode(content)
+        if not isinstance(data, dict):
+            raise
+        return PlantReading(**{field: data.get(field) for field in READING_FIELDS})
+
+
+class ReadingBatch:
+    """A run's readings, stored column by column."""
+    __slots__ = ("columns",)
+
+    def __init__(self):
+        self.columns = {field: [] for field in READING_FIELDS}
+
+    @classmethod
+    def from_readings(cls, readings: list[PlantReading]) -> "ReadingBatch":
+        """Returns a batch of the given readings."""
+        batch = cls()
+        for reading in readings:
+            batch.append(reading)
+        return batch
+
+    def append(self, reading: PlantReading) -> None:
+        """Adds one reading to the end of each column."""
+        for field, column in self.columns.items():
+            column.append(getattr(reading, field))
+
+    def __len__(self) -> int:
+        return len(self.columns["plant_id"])
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Returns the batch as a DataFrame with one column per field."""
+        return pd.DataFrame(self.columns)
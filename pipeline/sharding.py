@@ -0,0 +1,75 @@
+"""Sharded runs of the ETL pipeline, so sweep time stays flat as plants are added.
+
+The known plant IDs are split into shards of about PLANTS_PER_SHARD, plus
+one open-ended tail shard which sweeps upwards from the highest known ID
+with the usual not-found rule to pick up new plants. Each shard is
+extracted, transformed and loaded independently, either by local worker
+processes (run_sharded_pipeline) or by one Lambda per shard in a Step
+Functions Map (see lambda_handlers.py), and their error_data is merged."""
+import math
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import sqlalchemy
+
+from etl_controller import run_pipeline, run_in_process_alerts
+from storage import ReadingStore, get_store
+from utils import get_logger
+
+PLANTS_PER_SHARD = 15
+
+
+def known_plant_ids(store: ReadingStore = None) -> list[int]:
+    """Returns the plant IDs in DIM_plant."""
+    store = store or get_store()
+    with store.engine.connect() as conn:
+        return [row[0] for row in conn.execute(
+            sqlalchemy.text("SELECT plant_id FROM DIM_plant ORDER BY plant_id"))]
+
+
+def plan_shards(plant_ids: list[int], shard_count: int = None) -> list[dict]:
+    """Splits the known plant IDs into shard_count shards (by default enough
+    for about PLANTS_PER_SHARD each) and adds the open-ended tail shard.
+    IDs are dealt out in turn so each shard gets a similar spread of plants."""
+    plant_ids = sorted({int(plant_id) for plant_id in plant_ids})
+    if shard_count is None:
+        shard_count = max(1, math.ceil(len(plant_ids) / PLANTS_PER_SHARD))
+    shards = [{"shard": index, "plant_ids": plant_ids[index::shard_count]}
+              for index in range(shard_count) if plant_ids[index::shard_count]]
+    shards.append({"shard": len(shards),
+                   "start_id": (plant_ids[-1] if plant_ids else 0) + 1})
+    return shards
+
+
+def merge_error_data(results: list[pd.DataFrame]) -> pd.DataFrame:
+    """Combines the error_data of every shard into one frame ordered by plant."""
+    frames = [result for result in results if result is not None and not result.empty]
+    if not frames:
+        return pd.DataFrame(columns=["plant_id", "error"])
+    return (pd.concat(frames, ignore_index=True)
+            .drop_duplicates()
+            .sort_values("plant_id", kind="stable")
+            .reset_index(drop=True))
+
+
+def run_shard(shard: dict) -> pd.DataFrame:
+    """Runs the pipeline for one shard and returns its error_data."""
+    return run_pipeline(shard=shard)
+
+
+def run_sharded_pipeline(shard_count: int = None, plant_ids: list[int] = None,
+                         max_workers: int = None, alert_in_process: bool = False,
+                         executor_class=ProcessPoolExecutor) -> pd.DataFrame:
+    """Runs every shard on a pool of local workers and returns the merged
+    error_data. Alerts are sent once, for the merged errors, if asked."""
+    logger = get_logger()
+    shards = plan_shards(known_plant_ids() if plant_ids is None else plant_ids, shard_count)
+    logger.info("Running %s shards.", len(shards))
+    with executor_class(max_workers=max_workers or len(shards)) as executor:
+        error_data = merge_error_data(list(executor.map(run_shard, shards)))
+    if alert_in_process:
+        run_in_process_alerts(error_data)
+    return error_data
+
+
+if __name__ == "__main__":
+    run_sharded_pipeline()
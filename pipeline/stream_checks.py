@@ -0,0 +1,265 @@
+"""Stateful checks of each plant's readings against its own recent readings,
+which clean_dataframe can't make as it judges each reading in isolation.
+
+A compact per-plant ring buffer of the last WINDOW readings is kept between
+runs next to the archive (see storage.archive_client), in STATE_PARTITIONS
+.npz objects keyed by plant_id % STATE_PARTITIONS, so a run makes at most
+that many reads and writes however many plants it covers. The state is
+keyed by plant inside each object, so a plant keeps its history whichever
+shard or poll picks it up. Writes are conditional on the object's ETag: a
+shard which loses a race with another re-reads the object and merges its
+plants back in rather than overwriting the other shard's.
+Each batch is checked against it with array operations across all plants,
+so the cost per reading is constant however much history there is:
+- stale reading error: recording_taken hasn't advanced since the last reading.
+- stuck sensor error: the temperature or soil moisture has repeated exactly
+  for the last WINDOW readings.
+- temperature spike error / soil moisture spike error: the value jumped by
+  more than the limit since the plant's last reading within SPIKE_MAX_GAP.
+Readings which already have an error_msg keep it.
+
+Enable with STREAM_CHECKS=true; the state is kept in S3_BUCKET (or ARCHIVE_DIR)."""
+import io
+from os import environ as ENV
+import numpy as np
+import pandas as pd
+from botocore.exceptions import BotoCoreError, ClientError
+
+from instrumentation import count_aws_response
+from storage import archive_client
+from utils import get_logger
+
+WINDOW = 5
+SPIKE_LIMITS = {"temperature": 8.0, "soil_moisture": 25.0}
+SPIKE_MAX_GAP = np.timedelta64(5, "m")
+STATE_KEY_FORMAT = "stream_checks/partition_{partition}.npz"
+STATE_PARTITIONS = 4
+STATE_SAVE_ATTEMPTS = 3
+
+STALE_ERROR = "stale reading error"
+STUCK_ERROR = "stuck sensor error"
+SPIKE_ERRORS = {"temperature": "temperature spike error",
+                "soil_moisture": "soil moisture spike error"}
+
+
+class StreamState:
+    """The last WINDOW readings of each plant, as arrays with one row per
+    plant sorted by plant_id. Values are written at position % WINDOW."""
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+
+    def __init__(self, plant_ids: np.ndarray, temperature: np.ndarray,
+                 soil_moisture: np.ndarray, recording_taken: np.ndarray,
+                 position: np.ndarray):
+        self.plant_ids = plant_ids
+        self.values = {"temperature": temperature, "soil_moisture": soil_moisture}
+        self.recording_taken = recording_taken
+        self.position = position
+
+    @classmethod
+    def empty(cls) -> "StreamState":
+        """Returns a state with no plants."""
+        return cls(np.empty(0, dtype=np.int64), np.empty((0, WINDOW)), np.empty((0, WINDOW)),
+                   np.empty(0, dtype="datetime64[ms]"), np.empty(0, dtype=np.int64))
+
+    @classmethod
+    def from_bytes(cls, content: bytes) -> "StreamState":
+        """Returns the state saved by to_bytes."""
+        with np.load(io.BytesIO(content)) as arrays:
+            return cls(arrays["plant_ids"], arrays["temperature"], arrays["soil_moisture"],
+                       arrays["recording_taken"], arrays["position"])
+
+    def to_bytes(self) -> bytes:
+        """Returns the state as a compressed .npz file."""
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, plant_ids=self.plant_ids,
+                            recording_taken=self.recording_taken,
+                            position=self.position, **self.values)
+        return buffer.getvalue()
+
+    @classmethod
+    def concat(cls, states: list["StreamState"]) -> "StreamState":
+        """Returns one state holding the plants of every given state."""
+        states = [state for state in states if len(state)]
+        if not states:
+            return cls.empty()
+        plant_ids = np.concatenate([state.plant_ids for state in states])
+        order = np.argsort(plant_ids, kind="stable")
+        return cls(plant_ids[order],
+                   *(np.concatenate([state.values[name] for state in states])[order]
+                     for name in ("temperature", "soil_moisture")),
+                   np.concatenate([state.recording_taken for state in states])[order],
+                   np.concatenate([state.position for state in states])[order])
+
+    def select(self, rows: np.ndarray) -> "StreamState":
+        """Returns the state of the plants in the given rows (a boolean mask)."""
+        return StreamState(self.plant_ids[rows], self.values["temperature"][rows],
+                           self.values["soil_moisture"][rows], self.recording_taken[rows],
+                           self.position[rows])
+
+    def merge(self, updated: "StreamState") -> "StreamState":
+        """Returns this state with the updated state's plants replaced."""
+        return StreamState.concat([self.select(~np.isin(self.plant_ids, updated.plant_ids)),
+                                   updated])
+
+    def __len__(self) -> int:
+        return len(self.plant_ids)
+
+    def rows_for(self, plant_ids: np.ndarray) -> np.ndarray:
+        """Returns the row of each plant, adding empty rows for new plants."""
+        new_ids = np.setdiff1d(plant_ids, self.plant_ids)
+        if len(new_ids):
+            all_ids = np.union1d(self.plant_ids, new_ids)
+            old_rows = np.searchsorted(all_ids, self.plant_ids)
+            for name, values in self.values.items():
+                grown = np.full((len(all_ids), WINDOW), np.nan)
+                grown[old_rows] = values
+                self.values[name] = grown
+            recording_taken = np.full(len(all_ids), np.datetime64("NaT"), dtype="datetime64[ms]")
+            recording_taken[old_rows] = self.recording_taken
+            position = np.zeros(len(all_ids), dtype=np.int64)
+            position[old_rows] = self.position
+            self.plant_ids, self.recording_taken, self.position = \
+                all_ids, recording_taken, position
+        return np.searchsorted(self.plant_ids, plant_ids)
+
+    def check(self, rows: np.ndarray, recording_taken: np.ndarray,
+              values: dict) -> np.ndarray:
+        """Checks one reading for each of the given (distinct) plant rows,
+        then adds the readings which aren't stale. Returns an error per
+        reading, or None."""
+        errors = np.full(len(rows), None, dtype=object)
+        last_taken = self.recording_taken[rows]
+        has_history = self.position[rows] > 0
+        gap = recording_taken - last_taken
+        recent = has_history & (gap <= SPIKE_MAX_GAP)
+
+        for name in SPIKE_LIMITS:
+            last = self.values[name][rows, (self.position[rows] - 1) % WINDOW]
+            spike = recent & (np.abs(values[name] - last) > SPIKE_LIMITS[name])
+            errors[spike] = SPIKE_ERRORS[name]
+        full = self.position[rows] >= WINDOW
+        for name in SPIKE_LIMITS:
+            window = self.values[name][rows]
+            stuck = full & (window == values[name][:, None]).all(axis=1)
+            errors[stuck] = STUCK_ERROR
+        stale = has_history & (gap <= np.timedelta64(0, "ms"))
+        errors[stale] = STALE_ERROR
+
+        fresh = rows[~stale]
+        slots = self.position[fresh] % WINDOW
+        for name in SPIKE_LIMITS:
+            self.values[name][fresh, slots] = values[name][~stale]
+        self.recording_taken[fresh] = recording_taken[~stale]
+        self.position[fresh] += 1
+        return errors
+
+
+def check_readings(readings: pd.DataFrame, state: StreamState) -> pd.DataFrame:
+    """Checks a batch of cleaned readings against each plant's recent
+    readings and sets error_msg where a check fails and there was no error.
+    A plant's readings in the batch are checked in recording order, one
+    round per reading, with every plant checked at once in each round."""
+    readings = readings.copy()
+    taken = pd.to_datetime(readings["recording_taken"], utc=True)
+    checked = readings["plant_id"].notna() & taken.notna()
+    if not checked.any():
+        return readings
+
+    batch = pd.DataFrame({
+        "plant_id": readings.loc[checked, "plant_id"].astype(np.int64),
+        "recording_taken": taken[checked].dt.tz_localize(None).astype("datetime64[ms]"),
+        **{name: pd.to_numeric(readings.loc[checked, name], errors="coerce").astype(float)
+           for name in SPIKE_LIMITS}}).sort_values("recording_taken", kind="stable")
+    batch["row"] = state.rows_for(batch["plant_id"].to_numpy())
+    batch["round"] = batch.groupby("plant_id").cumcount()
+
+    errors = pd.Series(None, index=batch.index, dtype=object)
+    for _, reading_round in batch.groupby("round", sort=True):
+        errors.loc[reading_round.index] = state.check(
+            reading_round["row"].to_numpy(), reading_round["recording_taken"].to_numpy(),
+            {name: reading_round[name].to_numpy() for name in SPIKE_LIMITS})
+
+    new_errors = errors.notna() & readings.loc[errors.index, "error_msg"].isna()
+    readings.loc[new_errors[new_errors].index, "error_msg"] = errors[new_errors]
+    return readings
+
+
+def partition_of(plant_ids: np.ndarray) -> np.ndarray:
+    """Returns the state object partition of each plant."""
+    return plant_ids % STATE_PARTITIONS
+
+
+def get_state_object(s3_client, bucket: str, partition: int) -> tuple[StreamState, str | None]:
+    """Returns a partition's saved state and ETag, or an empty state and
+    None if it has none yet."""
+    try:
+        response = s3_client.get_object(
+            Bucket=bucket, Key=STATE_KEY_FORMAT.format(partition=partition))
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return StreamState.empty(), None
+        raise
+    count_aws_response(response)
+    return StreamState.from_bytes(response["Body"].read()), response["ETag"]
+
+
+def load_stream_state(s3_client, bucket: str,
+                      plant_ids: list[int]) -> dict[int, tuple[StreamState, str | None]]:
+    """Returns the saved state and ETag of each partition holding the given plants."""
+    partitions = sorted(set(partition_of(np.asarray(plant_ids, dtype=np.int64)).tolist()))
+    return {partition: get_state_object(s3_client, bucket, partition)
+            for partition in partitions}
+
+
+def save_partition(s3_client, bucket: str, partition: int, saved: tuple[StreamState, str | None],
+                   updated: StreamState) -> None:
+    """Writes the updated plants into a partition, keeping its other plants.
+    If another run has written the partition since it was read, it is
+    read again and merged, up to STATE_SAVE_ATTEMPTS times."""
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    state, etag = saved
+    for attempt in range(STATE_SAVE_ATTEMPTS):
+        condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+        try:
+            count_aws_response(s3_client.put_object(
+                Bucket=bucket, Key=STATE_KEY_FORMAT.format(partition=partition),
+                Body=state.merge(updated).to_bytes(), **condition))
+            return
+        except ClientError as exc:
+            code = exc.response.get("Error", {}).get("Code")
+            if code not in ("PreconditionFailed", "ConditionalRequestConflict") \
+                    or attempt == STATE_SAVE_ATTEMPTS - 1:
+                raise
+        state, etag = get_state_object(s3_client, bucket, partition)
+
+
+def save_stream_state(s3_client, bucket: str, state: StreamState,
+                      saved: dict[int, tuple[StreamState, str | None]]) -> None:
+    """Saves the updated state of a run's plants into their partitions."""
+    partitions = partition_of(state.plant_ids)
+    for partition, partition_state in saved.items():
+        save_partition(s3_client, bucket, partition, partition_state,
+                       state.select(partitions == partition))
+
+
+def run_stream_checks(readings: pd.DataFrame) -> pd.DataFrame:
+    """Checks a batch against the saved state of its plants and saves their
+    updated state. If the state can't be read or saved the batch is loaded
+    unchecked rather than lost."""
+    logger = get_logger()
+    bucket = ENV.get("S3_BUCKET")
+    plant_ids = sorted({int(plant_id) for plant_id in readings["plant_id"].dropna()})
+    try:
+        s3_client = archive_client()
+        saved = load_stream_state(s3_client, bucket, plant_ids)
+        state = StreamState.concat([saved_state.select(np.isin(saved_state.plant_ids, plant_ids))
+                                    for saved_state, _ in saved.values()])
+        checked = check_readings(readings, state)
+        save_stream_state(s3_client, bucket, state, saved)
+    except (BotoCoreError, ClientError, OSError, ValueError) as exc:
+        logger.error("Stream checks skipped: %s", exc)
+        return readings
+    logger.info("Stream checks found %s new errors across %s plants.",
+                int(checked["error_msg"].notna().sum() - readings["error_msg"].notna().sum()),
+                len(state))
+    return checked
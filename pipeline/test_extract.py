@@ -148,6 +148,26 @@ def test_get_all_plants_terminates_after_5_loops(fake_get_request, plant_not_fou
     assert fake_get_request.call_count == 5
 
 
+
+@patch('extract.PlantAPIClient.get_request')
+def test_get_shard_of_known_plants_skips_not_found(fake_get_request, plant_not_found):
+    """A shard of known IDs requests only those plants."""
+    client = PlantAPIClient("http://testapi.com/")
+    fake_get_request.side_effect = [{"plant_id": 1}, plant_not_found, {"plant_id": 5}]
+    assert client.get_shard({"shard": 0, "plant_ids": [1, 3, 5]}) == [
+        {"plant_id": 1}, {"plant_id": 5}]
+    assert fake_get_request.call_args_list[-1].args == ("http://testapi.com/5",)
+
+
+@patch('extract.PlantAPIClient.get_request')
+def test_get_shard_tail_sweeps_until_not_found(fake_get_request, plant_not_found):
+    """The open-ended tail shard stops after not_found_limit misses in a row."""
+    client = PlantAPIClient("http://testapi.com/", not_found_limit=2)
+    fake_get_request.side_effect = [{"plant_id": 61}, plant_not_found, plant_not_found]
+    assert client.get_shard({"shard": 4, "start_id": 61}) == [{"plant_id": 61}]
+    assert fake_get_request.call_count == 3
+
+
 """
 
 save_to_csv - takes a list of dictionaries and saves to a csv file
@@ -174,3 +194,16 @@ def test_save_to_csv_invalid_format_filename_or_empty():
     with pytest.raises(ValueError) as exc:
         save_to_csv([{"example": "yep"}], "cool")
     assert str(exc.value) == "Please end your filename in .csv."
+
+
+def test_get_batch_decodes_typed_readings(requests_mock, plant_33, plant_not_found):
+    """get_batch fetches a shard as typed readings in a columnar batch."""
+    client = PlantAPIClient("http://testapi.com/")
+    requests_mock.get("http://testapi.com/33", json=plant_33)
+    requests_mock.get("http://testapi.com/34", json=plant_not_found)
+
+    batch = client.get_batch({"shard": 0, "plant_ids": [33, 34]})
+
+    assert len(batch) == 1
+    assert batch.columns["plant_id"] == [33]
+    assert batch.columns["recording_taken"] == ["2025-06-03T14:30:31.531Z"]
@@ -1,12 +1,19 @@
 """A script to test the plant monitoring system lambda handlers."""
+import json
+import sys
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
-from lambda_handlers import etl_lambda_handler
+import etl_controller
+from etl_controller import run_in_process_alerts, run_pipeline_and_alert
+from instrumentation import start_run
+from readings import PlantReading, ReadingBatch
+from lambda_handlers import etl_lambda_handler, merge_shards_lambda_handler, shard_lambda_handler
 import pandas as pd
 
 
-@patch("lambda_handlers.run_pipeline")
+@patch("lambda_handlers.run_pipeline_and_alert")
 def test_lambda_handler_success(mock_run_pipeline):
-    mock_run_pipeline.return_value = pd.DataFrame()
+    mock_run_pipeline.return_value = (pd.DataFrame(), False)
 
     event = {}
     context = MagicMock()
@@ -17,3 +24,113 @@ def test_lambda_handler_success(mock_run_pipeline):
     assert response["statusCode"] == 200
     assert response["body"] == "ETL pipeline executed successfully."
     assert response["error_data"] == []
+
+
+@patch("lambda_handlers.run_pipeline_and_alert")
+def test_lambda_handler_hands_off_local_pointer(mock_run_pipeline, tmp_path, monkeypatch):
+    monkeypatch.delenv("ALERT_PAYLOAD_BUCKET", raising=False)
+    monkeypatch.setenv("ALERT_PAYLOAD_DIR", str(tmp_path))
+    mock_run_pipeline.return_value = (pd.DataFrame(
+        [{"plant_id": 1, "error": "low soil moisture error"}]), False)
+
+    response = etl_lambda_handler({}, MagicMock())
+
+    assert "error_data" not in response
+    with open(response["error_data_ref"]["path"], encoding="utf-8") as payload:
+        assert json.load(payload) == [
+            {"plant_id": 1, "error": "low soil moisture error"}]
+
+
+@patch("lambda_handlers.run_pipeline_and_alert")
+def test_lambda_handler_alert_in_process(mock_run_pipeline):
+    mock_run_pipeline.return_value = (pd.DataFrame(
+        [{"plant_id": 1, "error": "low soil moisture error"}]), True)
+
+    response = etl_lambda_handler({"alert_in_process": True}, MagicMock())
+
+    mock_run_pipeline.assert_called_once_with(alert_in_process=True)
+    assert response["error_data"] == []
+    assert response["alerts_sent_in_process"]
+
+
+@patch("lambda_handlers.run_pipeline_and_alert")
+def test_lambda_handler_hands_off_when_in_process_alerts_fail(mock_run_pipeline, monkeypatch):
+    """The alerter lambda still gets the errors if they couldn't all be sent in-process."""
+    monkeypatch.delenv("ALERT_PAYLOAD_BUCKET", raising=False)
+    monkeypatch.delenv("ALERT_PAYLOAD_DIR", raising=False)
+    mock_run_pipeline.return_value = (pd.DataFrame(
+        [{"plant_id": 1, "error": "low soil moisture error"}]), False)
+
+    response = etl_lambda_handler({"alert_in_process": True}, MagicMock())
+
+    assert response["alerts_sent_in_process"] is False
+    assert response["error_data"] == [{"plant_id": 1, "error": "low soil moisture error"}]
+
+
+def test_run_in_process_alerts_reports_failure(monkeypatch):
+    """An alerter failure, such as its modules missing from the image, is reported."""
+    monkeypatch.setitem(sys.modules, "send_alerts", None)
+
+    assert run_in_process_alerts(pd.DataFrame([{"plant_id": 1, "error": "x"}])) is False
+
+
+def test_run_in_process_alerts_partial_failure_is_not_sent(monkeypatch):
+    """A failed digest means the errors still go to the alerter lambda."""
+    monkeypatch.setitem(sys.modules, "send_alerts", SimpleNamespace(
+        alert_on_errors=lambda errors: {"alert_sent": True, "alert_count": 1,
+                                        "failed_digest_count": 1}))
+
+    assert run_in_process_alerts(pd.DataFrame([{"plant_id": 1, "error": "x"},
+                                               {"plant_id": 2, "error": "y"}])) is False
+
+
+@patch("etl_controller.insert_transformed_data")
+@patch("etl_controller.clean_dataframe", side_effect=lambda df: df)
+def test_in_process_alerts_are_a_span_of_the_run(fake_clean, fake_insert, monkeypatch):
+    """The alert stage is emitted with the pipeline run's other stages."""
+    records = []
+    monkeypatch.setattr(etl_controller, "start_run",
+                        lambda service: start_run(service, sink=records.append))
+    monkeypatch.setitem(sys.modules, "send_alerts", SimpleNamespace(
+        alert_on_errors=lambda errors: {"alert_sent": True, "alert_count": len(errors),
+                                        "failed_digest_count": 0}))
+    fake_insert.return_value = pd.DataFrame([{"plant_id": 1, "error": "x"}])
+    client = MagicMock()
+    client.get_batch.return_value = ReadingBatch.from_readings([PlantReading(plant_id=1)])
+
+    error_data, alerts_sent = run_pipeline_and_alert(alert_in_process=True, client=client)
+
+    assert alerts_sent
+    assert len(error_data) == 1
+    assert [record["Stage"] for record in records] == [
+        "extract", "transform", "load", "alert", "run"]
+
+
+@patch("lambda_handlers.run_pipeline")
+def test_shard_lambda_handler_runs_its_shard(mock_run_pipeline, monkeypatch):
+    monkeypatch.delenv("ALERT_PAYLOAD_BUCKET", raising=False)
+    monkeypatch.delenv("ALERT_PAYLOAD_DIR", raising=False)
+    mock_run_pipeline.return_value = pd.DataFrame([{"plant_id": 3, "error": "x"}])
+
+    response = shard_lambda_handler({"shard": {"shard": 1, "plant_ids": [3]}}, MagicMock())
+
+    mock_run_pipeline.assert_called_once_with(shard={"shard": 1, "plant_ids": [3]})
+    assert response["shard"] == 1
+    assert response["error_data"] == [{"plant_id": 3, "error": "x"}]
+
+
+def test_merge_shards_lambda_handler(tmp_path, monkeypatch):
+    """Inline and pointer shard results are merged into one alerter hand-off."""
+    monkeypatch.delenv("ALERT_PAYLOAD_BUCKET", raising=False)
+    monkeypatch.delenv("ALERT_PAYLOAD_DIR", raising=False)
+    payload_path = tmp_path / "shard_1.json"
+    payload_path.write_text(json.dumps([{"plant_id": 2, "error": "low soil moisture error"}]))
+
+    response = merge_shards_lambda_handler({"shard_results": [
+        {"statusCode": 200, "shard": 0, "error_data": [{"plant_id": 9, "error": "x"}]},
+        {"statusCode": 200, "shard": 1, "error_data_ref": {"path": str(payload_path)}},
+        {"statusCode": 500, "shard": 2, "error_data": []}]}, MagicMock())
+
+    assert response["error_data"] == [{"plant_id": 2, "error": "low soil moisture error"},
+                                      {"plant_id": 9, "error": "x"}]
+    assert response["failed_shards"] == [2]
@@ -6,8 +6,11 @@ import pytest
 from pytest import mark
 from unittest.mock import patch, mock_open
 from transform import clean_dataframe, save_dataframe_to_csv, summarise_day_from_csv
+from load import insert_transformed_data, summarise_batch, summarise_current_state
+from storage import SQLiteStore
 from utils import load_csv_to_df
 import pandas as pd
+import datetime
 
 """
 How to test?
@@ -31,3 +34,74 @@ def test_transform_load_data_type_not_csv():
 
 def test_load_example_test():
     assert True
+
+
+def test_summarise_batch_per_plant_and_minute():
+    """Batch aggregates skip missing values and bucket readings by minute."""
+    batch = pd.DataFrame({
+        'temperature': [10.0, 20.0, None, 30.0],
+        'soil_moisture': [50.0, 60.0, 70.0, None],
+        'recording_taken': pd.to_datetime(['2025-06-05 14:30:05+00:00', '2025-06-05 14:30:45+00:00',
+                                           '2025-06-05 14:31:10+00:00', '2025-06-05 14:31:20+00:00']),
+        'last_watered': pd.to_datetime(['2025-06-05 09:00:00+00:00'] * 4),
+        'error_msg': [None, None, None, 'high temperature error'],
+        'plant_id': [1, 1, 2, 2]
+    })
+
+    plant_rows, bucket_rows = summarise_batch(batch)
+
+    assert plant_rows == [
+        {'plant_id': 1, 'reading_count': 2, 'temperature_count': 2, 'temperature_sum': 30.0,
+         'soil_moisture_count': 2, 'soil_moisture_sum': 110.0},
+        {'plant_id': 2, 'reading_count': 2, 'temperature_count': 1, 'temperature_sum': 30.0,
+         'soil_moisture_count': 1, 'soil_moisture_sum': 70.0}]
+    assert [row['bucket_start'] for row in bucket_rows] == [
+        datetime.datetime(2025, 6, 5, 14, 30), datetime.datetime(2025, 6, 5, 14, 31)]
+    assert [row['reading_count'] for row in bucket_rows] == [2, 2]
+
+
+def test_insert_transformed_data_into_local_store():
+    """A cleaned batch loads into SQLite, updates the summaries and returns the errors."""
+    batch = clean_dataframe(pd.DataFrame([
+        {"temperature": 16.5, "soil_moisture": 45.0, "recording_taken": "2025-06-05T14:30:31.531Z",
+         "last_watered": "2025-06-05T09:00:00.000Z", "error": None, "plant_id": 1},
+        {"temperature": 35.0, "soil_moisture": 45.0, "recording_taken": "2025-06-05T14:30:40.000Z",
+         "last_watered": "2025-06-05T09:00:00.000Z", "error": None, "plant_id": 2}]))
+    store = SQLiteStore.from_path(":memory:")
+
+    error_data = insert_transformed_data(batch, store=store)
+
+    assert error_data.to_dict("records") == [{"plant_id": 2, "error": "high temperature error"}]
+    assert len(store.read_readings()) == 2
+    summary = pd.read_sql("SELECT plant_name, avg_temp FROM VIEW_plant_summary "
+                          "ORDER BY plant_name", store.engine)
+    assert summary.to_dict("records") == [{"plant_name": "Corpse flower", "avg_temp": 35.0},
+                                          {"plant_name": "Venus flytrap", "avg_temp": 16.5}]
+    plant_state = pd.read_sql("SELECT plant_name, error_msg FROM VIEW_plant_state "
+                              "ORDER BY plant_name", store.engine)
+    assert plant_state["error_msg"].isna().tolist() == [False, True]
+
+
+def test_summarise_current_state_takes_latest_reading():
+    """Each plant gets its newest reading, its error state and the batch totals."""
+    batch = pd.DataFrame({
+        'temperature': [10.0, 20.0, None],
+        'soil_moisture': [50.0, 60.0, None],
+        'recording_taken': pd.to_datetime(['2025-06-05 14:30:45+00:00', '2025-06-05 14:30:05+00:00',
+                                           None]),
+        'last_watered': pd.to_datetime(['2025-06-05 09:00:00+00:00', '2025-06-05 09:00:00+00:00',
+                                        None]),
+        'error_msg': [None, 'high temperature error', 'plant sensor fault'],
+        'plant_id': [1, 1, 2]
+    })
+
+    plant_rows, _ = summarise_batch(batch)
+    state_rows = summarise_current_state(batch, plant_rows)
+
+    assert state_rows[0] == {**plant_rows[0],
+                             'recording_taken': datetime.datetime(2025, 6, 5, 14, 30, 45),
+                             'temperature': 10.0, 'soil_moisture': 50.0,
+                             'last_watered': datetime.datetime(2025, 6, 5, 9, 0),
+                             'error_msg': None}
+    assert state_rows[1]['recording_taken'] is None
+    assert state_rows[1]['error_msg'] == 'plant sensor fault'
@@ -0,0 +1,114 @@
+# pylint: skip-file
+
+"""Tests the scheduling of the polling worker."""
+
+from unittest.mock import MagicMock, patch
+import pandas as pd
+import pytest
+from poller import PlantPoller, next_deadline
+
+
+def test_next_deadline_stays_on_the_grid():
+    """A run which finishes in time waits for the next tick, not tick seconds from now."""
+    assert next_deadline(100.0, now=101.5, tick=5.0) == (105.0, 0)
+
+
+def test_overrun_skips_missed_ticks():
+    """With skip, the next tick is the first grid point still in the future."""
+    assert next_deadline(100.0, now=112.0, tick=5.0, overrun="skip") == (115.0, 2)
+
+
+def test_overrun_coalesces_missed_ticks():
+    """With coalesce, one run straight away stands in for the missed ticks."""
+    assert next_deadline(100.0, now=112.0, tick=5.0, overrun="coalesce") == (110.0, 1)
+    assert next_deadline(100.0, now=106.0, tick=5.0, overrun="coalesce") == (105.0, 0)
+
+
+def test_unknown_overrun_policy():
+    with pytest.raises(ValueError):
+        PlantPoller(MagicMock(), MagicMock(), [1], overrun="queue")
+
+
+@patch("poller.loaded_plant_ids", return_value=[])
+@patch("poller.run_pipeline")
+def test_plants_in_error_are_polled_more_often(fake_run_pipeline, fake_loaded):
+    """Plants in error come due after the error interval, healthy ones after the healthy one."""
+    def run(alert_in_process, shard, client, store, raise_errors):
+        if shard["shard"] == "discovery":
+            return pd.DataFrame()
+        return pd.DataFrame([{"plant_id": 2, "error": "low soil moisture error"}])
+    fake_run_pipeline.side_effect = run
+    poller = PlantPoller(MagicMock(), MagicMock(), [1, 2, 3],
+                         error_interval=10, healthy_interval=300)
+
+    poller.poll(0.0)
+    shards = [call.kwargs["shard"] for call in fake_run_pipeline.call_args_list]
+    assert shards == [{"shard": "due", "plant_ids": [1, 2, 3]},
+                      {"shard": "discovery", "start_id": 4}]
+
+    assert poller.due_plants(9.0) == []
+    assert poller.due_plants(10.0) == [2]
+    fake_run_pipeline.reset_mock()
+    poller.poll(10.0)
+    assert [call.kwargs["shard"] for call in fake_run_pipeline.call_args_list] == [
+        {"shard": "due", "plant_ids": [2]}]
+    assert poller.due_plants(299.0) == [2]
+    assert poller.due_plants(300.0) == [1, 2, 3]
+
+
+@patch("poller.loaded_plant_ids", return_value=[])
+@patch("poller.run_pipeline")
+def test_failed_run_keeps_the_schedule(fake_run_pipeline, fake_loaded):
+    """A failed run doesn't move plants in error to the healthy interval."""
+    fake_run_pipeline.return_value = pd.DataFrame(
+        [{"plant_id": 2, "error": "low soil moisture error"}])
+    poller = PlantPoller(MagicMock(), MagicMock(), [1, 2],
+                         error_interval=10, healthy_interval=300)
+    poller.poll(0.0)
+
+    fake_run_pipeline.side_effect = ConnectionError("database unavailable")
+    assert poller.poll(10.0).empty
+    assert poller.due_plants(10.0) == [2]
+
+
+@patch("poller.loaded_plant_ids")
+@patch("poller.run_pipeline")
+def test_discovered_plants_join_the_schedule(fake_run_pipeline, fake_loaded):
+    """The tail moves past new plants, so they are only fetched by their own schedule."""
+    def run(alert_in_process, shard, client, store, raise_errors):
+        if shard["shard"] == "discovery" and shard["start_id"] == 3:
+            return pd.DataFrame([{"plant_id": 4, "error": "low soil moisture error"}])
+        return pd.DataFrame()
+    fake_run_pipeline.side_effect = run
+    fake_loaded.return_value = [3, 4]
+    poller = PlantPoller(MagicMock(), MagicMock(), [1, 2],
+                         error_interval=10, healthy_interval=300)
+
+    poller.poll(0.0)
+    assert poller.due_plants(10.0) == [4]
+    assert poller.due_plants(300.0) == [1, 2, 3, 4]
+
+    fake_run_pipeline.reset_mock()
+    fake_loaded.return_value = []
+    poller.poll(300.0)
+    assert [call.kwargs["shard"] for call in fake_run_pipeline.call_args_list] == [
+        {"shard": "due", "plant_ids": [1, 2, 3, 4]},
+        {"shard": "discovery", "start_id": 5}]
+
+
+@patch("poller.run_pipeline")
+def test_run_reuses_client_and_store_until_stopped(fake_run_pipeline):
+    """Every tick runs with the same warm client and store."""
+    client, store = MagicMock(), MagicMock()
+    poller = PlantPoller(client, store, [1], tick=0.01, healthy_interval=0)
+
+    def run(**kwargs):
+        if fake_run_pipeline.call_count >= 3:
+            poller.stop()
+        return pd.DataFrame()
+    fake_run_pipeline.side_effect = run
+
+    poller.run()
+    assert all(call.kwargs["client"] is client and call.kwargs["store"] is store
+               for call in fake_run_pipeline.call_args_list)
+    assert poller.metrics()["ticks"] >= 2
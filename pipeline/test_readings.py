@@ -0,0 +1,58 @@
+# pylint: skip-file
+
+"""Tests the typed plant readings decoded from API responses."""
+
+import json
+import pandas as pd
+import msgspec
+import pytest
+from readings import PlantReading, ReadingBatch, decode_reading
+from transform import clean_dataframe
+
+
+RESPONSE = json.dumps({
+    "plant_id": 33,
+    "name": "Schefflera Arboricola",
+    "temperature": 16.909027178208355,
+    "origin_location": {"latitude": -58.3733, "longitude": 6.5244,
+                        "city": "Cutler Bay", "country": "Mexico"},
+    "botanist": {"name": "Marty Lang", "email": "marty.lang@lnhm.co.uk"},
+    "last_watered": "2025-06-03T13:15:17.000Z",
+    "soil_moisture": 95.62121144519884,
+    "recording_taken": "2025-06-03T14:30:31.531Z",
+    "scientific_name": ["Schefflera arboricola"]
+}).encode("utf-8")
+
+
+def test_decode_reading_keeps_only_pipeline_fields():
+    """Nested fields are skipped and missing ones default to None."""
+    reading = decode_reading(RESPONSE)
+
+    assert reading == PlantReading(plant_id=33, temperature=16.909027178208355,
+                                   soil_moisture=95.62121144519884,
+                                   recording_taken="2025-06-03T14:30:31.531Z",
+                                   last_watered="2025-06-03T13:15:17.000Z")
+    assert reading.get("error") is None
+    assert not hasattr(reading, "__dict__")
+
+
+def test_decode_reading_tolerates_sensor_faults():
+    """Strings in numeric fields are kept for transform to drop, odd types fall back untyped."""
+    assert decode_reading(b'{"plant_id": 4, "temperature": "N/A"}').temperature == "N/A"
+    assert decode_reading(b'{"plant_id": 4, "temperature": {"c": 12}}').temperature == {"c": 12}
+    with pytest.raises(msgspec.ValidationError):
+        decode_reading(b'[1, 2]')
+
+
+def test_batch_builds_the_frame_transform_cleans():
+    """A columnar batch gives the same cleaned frame as the API's dicts."""
+    error = b'{"plant_id": 7, "error": "plant sensor fault"}'
+    batch = ReadingBatch.from_readings([decode_reading(RESPONSE), decode_reading(error)])
+
+    assert len(batch) == 2
+    assert batch.columns["plant_id"] == [33, 7]
+    cleaned = clean_dataframe(batch.to_dataframe())
+    expected = clean_dataframe(pd.DataFrame.from_dict([json.loads(RESPONSE), json.loads(error)]))
+    assert cleaned["plant_id"].tolist() == expected["plant_id"].tolist() == [33, 7]
+    assert cleaned["error_msg"].tolist()[1] == "plant sensor fault"
+    assert cleaned["temperature"].iloc[0] == expected["temperature"].iloc[0]
@@ -0,0 +1,57 @@
+# pylint: skip-file
+
+"""Tests splitting the plant ID space into shards and merging their results."""
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import pandas as pd
+from sharding import known_plant_ids, merge_error_data, plan_shards, run_sharded_pipeline
+from storage import SQLiteStore
+
+
+def test_plan_shards_deals_out_known_ids_and_adds_tail():
+    """Every known ID is in exactly one shard and the tail starts after the last one."""
+    shards = plan_shards([5, 1, 2, 3, 4, 3], shard_count=2)
+    assert shards == [{"shard": 0, "plant_ids": [1, 3, 5]},
+                      {"shard": 1, "plant_ids": [2, 4]},
+                      {"shard": 2, "start_id": 6}]
+
+
+def test_shard_count_grows_with_the_fleet():
+    """By default shards stay the same size as plants are added."""
+    assert len(plan_shards(range(1, 31))) == 3
+    assert len(plan_shards(range(1, 61))) == 5
+    assert plan_shards([]) == [{"shard": 0, "start_id": 1}]
+
+
+def test_known_plant_ids_from_store():
+    """The known IDs are the plants in DIM_plant."""
+    assert known_plant_ids(SQLiteStore.from_path(":memory:")) == list(range(1, 61))
+
+
+def test_merge_error_data():
+    """Shard errors are combined in plant order, skipping empty shards."""
+    merged = merge_error_data([
+        pd.DataFrame([{"plant_id": 7, "error": "low soil moisture error"}]),
+        pd.DataFrame(),
+        pd.DataFrame([{"plant_id": 2, "error": "high temperature error"}])])
+    assert merged.to_dict("records") == [{"plant_id": 2, "error": "high temperature error"},
+                                         {"plant_id": 7, "error": "low soil moisture error"}]
+    assert list(merge_error_data([pd.DataFrame()]).columns) == ["plant_id", "error"]
+
+
+@patch("sharding.run_in_process_alerts")
+@patch("sharding.run_pipeline")
+def test_run_sharded_pipeline_runs_every_shard(fake_run_pipeline, fake_alerts):
+    """Each shard runs once and alerts are sent once for the merged errors."""
+    fake_run_pipeline.side_effect = lambda shard: pd.DataFrame(
+        [{"plant_id": shard.get("start_id", shard.get("plant_ids", [0])[0]), "error": "x"}])
+
+    error_data = run_sharded_pipeline(shard_count=2, plant_ids=[1, 2, 3],
+                                      alert_in_process=True,
+                                      executor_class=ThreadPoolExecutor)
+
+    shards = sorted((call.kwargs["shard"]["shard"] for call in fake_run_pipeline.call_args_list))
+    assert shards == [0, 1, 2]
+    assert error_data["plant_id"].tolist() == [1, 2, 4]
+    fake_alerts.assert_called_once()
@@ -0,0 +1,122 @@
+# pylint: skip-file
+
+"""Tests the stateful per-plant stream checks."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from storage import LocalObjectStore
+from stream_checks import (STALE_ERROR, STATE_PARTITIONS, STUCK_ERROR, WINDOW, StreamState,
+                           check_readings, load_stream_state, run_stream_checks,
+                           save_stream_state)
+
+
+def batch(minutes, temperatures, moistures, plant_ids, errors=None):
+    return pd.DataFrame({
+        "temperature": temperatures,
+        "soil_moisture": moistures,
+        "recording_taken": pd.to_datetime([f"2025-06-05T14:{minute:02d}:00Z" for minute in minutes]),
+        "last_watered": pd.to_datetime(["2025-06-05T09:00:00Z"] * len(plant_ids)),
+        "error_msg": errors or [None] * len(plant_ids),
+        "plant_id": plant_ids})
+
+
+def test_repeated_values_are_a_stuck_sensor():
+    """A value repeated for the whole window is flagged, a drifting one isn't."""
+    state = StreamState.empty()
+    for minute in range(WINDOW):
+        assert check_readings(batch([minute] * 2, [20.0, 15 + minute / 10], [50 + minute] * 2,
+                                    [1, 2]), state)["error_msg"].isna().all()
+
+    checked = check_readings(batch([WINDOW] * 2, [20.0, 16.0], [60.0] * 2, [1, 2]), state)
+    assert checked["error_msg"].tolist() == [STUCK_ERROR, None]
+
+
+def test_jumps_and_repeated_timestamps():
+    """Jumps within a few minutes are spikes and a timestamp that hasn't advanced is stale,
+    also between readings of the same plant in one batch."""
+    state = StreamState.empty()
+    check_readings(batch([0, 0], [20.0, 20.0], [50.0, 50.0], [1, 2]), state)
+
+    checked = check_readings(batch([1, 1, 1, 30], [30.0, 20.0, 21.0, 40.0],
+                                   [50.0, 10.0, 50.0, 50.0], [1, 2, 3, 3]), state)
+    assert checked["error_msg"].tolist() == ["temperature spike error",
+                                             "soil moisture spike error", None, None]
+
+    checked = check_readings(batch([1, 2, 2], [30.0, 20.0, 20.0], [50.0, 10.0, 10.0], [1, 2, 2]),
+                             state)
+    assert checked["error_msg"].tolist() == [STALE_ERROR, None, STALE_ERROR]
+
+
+def test_existing_errors_and_error_rows_are_kept():
+    """Bound errors aren't replaced and API error rows without readings are skipped."""
+    state = StreamState.empty()
+    check_readings(batch([0], [20.0], [50.0], [1]), state)
+    readings = pd.concat([batch([1], [40.0], [50.0], [1], ["high temperature error"]),
+                          pd.DataFrame({"plant_id": [2], "error_msg": ["plant sensor fault"],
+                                        "recording_taken": [pd.NaT]})], ignore_index=True)
+
+    checked = check_readings(readings, state)
+    assert checked["error_msg"].tolist() == ["high temperature error", "plant sensor fault"]
+    assert state.plant_ids.tolist() == [1]
+
+
+def test_state_is_saved_between_runs(monkeypatch, tmp_path):
+    """The ring buffers round-trip through the archive in a few partition
+    objects keyed by plant inside, so a plant keeps its history whichever
+    shard picks it up and a run leaves the other plants' history alone."""
+    monkeypatch.setenv("ARCHIVE_DIR", str(tmp_path))
+    for minute in range(2):
+        run_stream_checks(batch([minute] * 3, [20.0] * 3, [50.0] * 3,
+                                [1, 1 + STATE_PARTITIONS, 2]))
+
+    checked = run_stream_checks(batch([1], [20.0], [50.0], [1]))
+    assert checked["error_msg"].tolist() == [STALE_ERROR]
+    assert sorted(path.name for path in (tmp_path / "stream_checks").iterdir()) == [
+        "partition_1.npz", "partition_2.npz"]
+    state = StreamState.from_bytes((tmp_path / "stream_checks" / "partition_1.npz").read_bytes())
+    assert state.plant_ids.tolist() == [1, 1 + STATE_PARTITIONS]
+    assert state.position.tolist() == [2, 2]
+
+
+def test_concurrent_save_is_merged_not_overwritten(tmp_path):
+    """A run whose partition was rewritten since it read it merges its plants
+    into the newer object instead of losing the other run's plants."""
+    objects = LocalObjectStore(str(tmp_path))
+    first = load_stream_state(objects, "bucket", [1])
+    second = load_stream_state(objects, "bucket", [1 + STATE_PARTITIONS])
+    for saved, plant_id in ((second, 1 + STATE_PARTITIONS), (first, 1)):
+        state = StreamState.empty()
+        check_readings(batch([0], [20.0], [50.0], [plant_id]), state)
+        save_stream_state(objects, "bucket", state, saved)
+
+    state, _ = load_stream_state(objects, "bucket", [1])[1]
+    assert state.plant_ids.tolist() == [1, 1 + STATE_PARTITIONS]
+
+
+def test_state_concat_select_and_merge():
+    """Partition states combine into one sorted state, split back out and
+    take updated plants in place of their old rows."""
+    state = StreamState.empty()
+    check_readings(batch([0, 0], [20.0, 25.0], [50.0, 55.0], [3, 1]), state)
+
+    combined = StreamState.concat([state.select(state.plant_ids == 3), StreamState.empty(),
+                                   state.select(state.plant_ids == 1)])
+    assert combined.plant_ids.tolist() == [1, 3]
+    assert combined.values["temperature"][:, 0].tolist() == [25.0, 20.0]
+
+    updated = StreamState.empty()
+    check_readings(batch([0, 0], [30.0, 10.0], [50.0, 50.0], [3, 4]), updated)
+    merged = combined.merge(updated)
+    assert merged.plant_ids.tolist() == [1, 3, 4]
+    assert merged.values["temperature"][:, 0].tolist() == [25.0, 30.0, 10.0]
+
+
+def test_unreadable_state_loads_the_batch_unchecked(monkeypatch, tmp_path):
+    """A broken state object doesn't stop the readings being loaded."""
+    monkeypatch.setenv("ARCHIVE_DIR", str(tmp_path))
+    (tmp_path / "stream_checks").mkdir()
+    (tmp_path / "stream_checks" / "partition_1.npz").write_bytes(b"not an npz")
+    readings = batch([0], [20.0], [50.0], [1])
+
+    assert run_stream_checks(readings) is readings
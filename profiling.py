@@ -0,0 +1,174 @@
+"""An opt-in profiling mode for the LNHM lambda handlers.
+
+Set LNHM_PROFILE=true and each decorated handler records a sampling CPU
+profile and tracemalloc peak and top allocations for every instrumentation
+span (extract, transform, load...). Artifacts are written to
+LNHM_PROFILE_DIR (default /tmp/lnhm_profiles) and uploaded to
+LNHM_PROFILE_BUCKET if it is set. When the flag is off the decorator only
+reads one environment variable per invocation."""
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+from functools import wraps
+
+from instrumentation import (add_span_listener, emf_record, remove_span_listener,
+                             write_stdout)
+
+PROFILE_FLAG = "LNHM_PROFILE"
+DEFAULT_PROFILE_DIR = "/tmp/lnhm_profiles"
+SAMPLE_INTERVAL = 0.005
+TOP_ALLOCATIONS = 10
+OUTSIDE_SPANS = "(no span)"
+
+
+def profiling_enabled() -> bool:
+    """Returns True if the profiling flag is set."""
+    return os.environ.get(PROFILE_FLAG, "").lower() in ("1", "true", "yes")
+
+
+def frame_label(frame) -> str:
+    """Returns a short label for one stack frame."""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    """Samples one thread's stack every interval seconds on a background
+    thread, counting folded stacks per stage."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lnhm-profiler", daemon=True)
+        self.stage = OUTSIDE_SPANS
+        self.samples = Counter()
+
+    def _run(self) -> None:
+        """Takes samples until stopped."""
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)  # pylint: disable=protected-access
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join([self.stage, *reversed(stack)])] += 1
+
+    def start(self) -> None:
+        """Starts sampling."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops sampling and waits for the sampler thread."""
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        """Returns the samples in folded stack format, as used by flame graph tools."""
+        return "".join(f"{stack} {samples}\n" for stack, samples in self.samples.most_common())
+
+
+class StageMemoryTracker:
+    """Records tracemalloc peak memory and top allocations for each span."""
+
+    def __init__(self, profiler: SamplingProfiler):
+        self._profiler = profiler
+        self._snapshots = {}
+        self._open_stages = []
+        self.stages = []
+
+    def __call__(self, event: str, span) -> None:
+        """Span listener which starts or finishes a stage measurement."""
+        if event == "start":
+            tracemalloc.reset_peak()
+            self._snapshots[id(span)] = tracemalloc.take_snapshot()
+            self._open_stages.append(span.name)
+            self._profiler.stage = span.name
+            return
+
+        _, peak = tracemalloc.get_traced_memory()
+        started = self._snapshots.pop(id(span), None)
+        top = []
+        if started is not None:
+            for stat in tracemalloc.take_snapshot().compare_to(started, "lineno")[:TOP_ALLOCATIONS]:
+                top.append({"location": str(stat.traceback),
+                            "size_diff_kb": round(stat.size_diff / 1024, 1),
+                            "count_diff": stat.count_diff})
+        self.stages.append({"stage": span.name, "wall_ms": round(span.wall_ms, 3),
+                            "peak_mb": round(peak / 2 ** 20, 3), "top_allocations": top})
+        if span.name in self._open_stages:
+            self._open_stages.remove(span.name)
+        self._profiler.stage = self._open_stages[-1] if self._open_stages else OUTSIDE_SPANS
+
+
+def write_artifacts(service: str, folded: str, memory: dict) -> dict:
+    """Writes the profile artifacts locally, and to S3 if LNHM_PROFILE_BUCKET
+    is set. Returns where they were written."""
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    run_dir = os.path.join(os.environ.get("LNHM_PROFILE_DIR", DEFAULT_PROFILE_DIR),
+                           service, run_id)
+    os.makedirs(run_dir, exist_ok=True)
+    artifacts = {"cpu_folded.txt": folded, "memory.json": json.dumps(memory, indent=2)}
+    for name, content in artifacts.items():
+        with open(os.path.join(run_dir, name), "w", encoding="utf-8") as artifact:
+            artifact.write(content)
+    locations = {"dir": run_dir}
+
+    bucket = os.environ.get("LNHM_PROFILE_BUCKET")
+    if bucket:
+        from boto3 import client  # pylint: disable=import-outside-toplevel
+        s3_client = client("s3", region_name=os.environ.get("AWS_REGION", "eu-west-2"))
+        prefix = f"profiles/{service}/{run_id}/"
+        for name, content in artifacts.items():
+            s3_client.put_object(Bucket=bucket, Key=prefix + name, Body=content)
+        locations["s3"] = f"s3://{bucket}/{prefix}"
+    return locations
+
+
+def profile_handler(service: str):
+    """Decorates a lambda handler to profile it when LNHM_PROFILE is set."""
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(*args, **kwargs):
+            if not profiling_enabled():
+                return handler(*args, **kwargs)
+            return run_profiled(service, handler, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def run_profiled(service: str, handler, *args, **kwargs):
+    """Runs handler under the CPU sampler and tracemalloc, then writes the
+    artifacts and an EMF record pointing at them."""
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    profiler = SamplingProfiler(threading.get_ident())
+    tracker = StageMemoryTracker(profiler)
+    add_span_listener(tracker)
+    profiler.start()
+    started = time.perf_counter()
+    try:
+        return handler(*args, **kwargs)
+    finally:
+        wall_ms = (time.perf_counter() - started) * 1000
+        profiler.stop()
+        remove_span_listener(tracker)
+        _, peak = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+        # Stage starts reset the tracemalloc peak, so take the largest seen.
+        peak_mb = max([peak / 2 ** 20, *(stage["peak_mb"] for stage in tracker.stages)])
+        memory = {"service": service, "wall_ms": round(wall_ms, 3),
+                  "peak_mb": round(peak_mb, 3), "stages": tracker.stages}
+        locations = write_artifacts(service, profiler.folded(), memory)
+        write_stdout(emf_record(service, "profile",
+                                {"WallTime": memory["wall_ms"], "PeakMemory": memory["peak_mb"]},
+                                {"ProfileArtifacts": locations,
+                                 "CpuSamples": sum(profiler.samples.values())}))
@@ -1,3 +1,11 @@
+DROP VIEW IF EXISTS VIEW_plant_summary;
+DROP VIEW IF EXISTS VIEW_city_summary;
+DROP VIEW IF EXISTS VIEW_botanist_summary;
+DROP VIEW IF EXISTS VIEW_temperature_trend;
+DROP VIEW IF EXISTS VIEW_plant_state;
+DROP TABLE IF EXISTS SUMMARY_plant;
+DROP TABLE IF EXISTS SUMMARY_time_bucket;
+DROP TABLE IF EXISTS CURRENT_plant_state;
 DROP TABLE IF EXISTS FACT_plant_reading;
 DROP TABLE IF EXISTS DIM_plant;
 DROP TABLE IF EXISTS DIM_botanist;
@@ -47,6 +55,45 @@ CREATE TABLE FACT_plant_reading (
     FOREIGN KEY (plant_id) REFERENCES DIM_plant(plant_id)
 );
 
+-- Running aggregates of FACT_plant_reading, kept up to date by the load step
+-- and cleared by the archiver, so dashboard charts read a few hundred rows.
+CREATE TABLE SUMMARY_plant (
+    plant_id SMALLINT PRIMARY KEY,
+    reading_count INT NOT NULL,
+    temperature_count INT NOT NULL,
+    temperature_sum FLOAT NOT NULL,
+    soil_moisture_count INT NOT NULL,
+    soil_moisture_sum FLOAT NOT NULL,
+    FOREIGN KEY (plant_id) REFERENCES DIM_plant(plant_id)
+);
+
+CREATE TABLE SUMMARY_time_bucket (
+    bucket_start DATETIME2 PRIMARY KEY,
+    reading_count INT NOT NULL,
+    temperature_count INT NOT NULL,
+    temperature_sum FLOAT NOT NULL,
+    soil_moisture_count INT NOT NULL,
+    soil_moisture_sum FLOAT NOT NULL
+);
+
+-- One row per plant with its latest reading, error state and running
+-- averages, upserted by the load step, so current status reads O(plants) rows.
+-- The archiver resets the running averages and keeps the latest reading.
+CREATE TABLE CURRENT_plant_state (
+    plant_id SMALLINT PRIMARY KEY,
+    recording_taken DATETIME2,
+    temperature FLOAT,
+    soil_moisture FLOAT,
+    last_watered DATETIME2,
+    error_msg VARCHAR(255),
+    reading_count INT NOT NULL,
+    temperature_count INT NOT NULL,
+    temperature_sum FLOAT NOT NULL,
+    soil_moisture_count INT NOT NULL,
+    soil_moisture_sum FLOAT NOT NULL,
+    FOREIGN KEY (plant_id) REFERENCES DIM_plant(plant_id)
+);
+
 INSERT INTO DIM_country (country_name) VALUES
 ('Albania'),
 ('American Samoa'),
@@ -253,4 +300,64 @@ INSERT INTO DIM_plant (plant_id, plant_name, scientific_name, regular_url, botan
 (57, NULL, NULL, NULL, NULL, NULL),
 (58, NULL, NULL, NULL, NULL, NULL),
 (59, NULL, NULL, NULL, NULL, NULL),
-(60, NULL, NULL, NULL, NULL, NULL)
+(60, NULL, NULL, NULL, NULL, NULL);
+
+GO
+
+CREATE VIEW VIEW_plant_summary AS
+SELECT plant_name,
+    SUM(temperature_sum) / NULLIF(SUM(temperature_count), 0) AS avg_temp,
+    SUM(soil_moisture_sum) / NULLIF(SUM(soil_moisture_count), 0) AS avg_moisture,
+    SUM(reading_count) AS reading_count
+FROM SUMMARY_plant
+LEFT JOIN DIM_plant
+ON SUMMARY_plant.plant_id = DIM_plant.plant_id
+GROUP BY plant_name;
+
+GO
+
+CREATE VIEW VIEW_city_summary AS
+SELECT city, country_name,
+    SUM(temperature_sum) / NULLIF(SUM(temperature_count), 0) AS avg_temp,
+    SUM(reading_count) AS reading_count
+FROM SUMMARY_plant
+LEFT JOIN DIM_plant
+ON SUMMARY_plant.plant_id = DIM_plant.plant_id
+LEFT JOIN DIM_origin_location
+ON DIM_plant.location_id = DIM_origin_location.location_id
+LEFT JOIN DIM_country
+ON DIM_country.country_id = DIM_origin_location.country_id
+GROUP BY city, country_name;
+
+GO
+
+CREATE VIEW VIEW_botanist_summary AS
+SELECT botanist_name,
+    SUM(soil_moisture_sum) / NULLIF(SUM(soil_moisture_count), 0) AS avg_moisture,
+    SUM(reading_count) AS reading_count
+FROM SUMMARY_plant
+LEFT JOIN DIM_plant
+ON SUMMARY_plant.plant_id = DIM_plant.plant_id
+LEFT JOIN DIM_botanist
+ON DIM_plant.botanist_id = DIM_botanist.botanist_id
+GROUP BY botanist_name;
+
+GO
+
+CREATE VIEW VIEW_temperature_trend AS
+SELECT bucket_start AS recording_taken,
+    temperature_sum / NULLIF(temperature_count, 0) AS temperature
+FROM SUMMARY_time_bucket;
+
+GO
+
+CREATE VIEW VIEW_plant_state AS
+SELECT plant_name, recording_taken, temperature, soil_moisture, last_watered, error_msg,
+    temperature_sum / NULLIF(temperature_count, 0) AS avg_temp,
+    soil_moisture_sum / NULLIF(soil_moisture_count, 0) AS avg_moisture,
+    reading_count
+FROM CURRENT_plant_state
+LEFT JOIN DIM_plant
+ON CURRENT_plant_state.plant_id = DIM_plant.plant_id;
+
+GO
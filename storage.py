@@ -0,0 +1,505 @@
+"""Storage backends for the LNHM readings database and archive.
+
+STORAGE_BACKEND picks where the readings live: "mssql" (the default) is
+the production SQL Server, and "sqlite" is an embedded database file at
+STORAGE_PATH with the same tables, views and seed data, so the load step,
+the archiver and the dashboard queries can run on a laptop and in tests.
+Setting ARCHIVE_DIR keeps the archived daily summaries on local disk
+instead of S3, and HistoricalStore runs analytical queries over them with
+DuckDB. boto3, botocore and duckdb are only imported when used."""
+import io
+import os
+import re
+from datetime import datetime, timezone
+from os import environ as ENV
+
+import sqlalchemy
+from sqlalchemy.pool import StaticPool
+
+from utils import get_logger, read_sql_columnar
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sql")
+DEFAULT_SQLITE_PATH = "data/lnhm.db"
+
+# HOLDLOCK keeps the matched key range locked until the insert, so two
+# concurrent loads (shards, the poller) can't both insert the same key.
+MSSQL_MERGE = """
+    MERGE {table} WITH (HOLDLOCK) AS target
+    USING (SELECT :{key} AS {key}, :reading_count AS reading_count,
+                  :temperature_count AS temperature_count, :temperature_sum AS temperature_sum,
+                  :soil_moisture_count AS soil_moisture_count,
+                  :soil_moisture_sum AS soil_moisture_sum) AS source
+    ON target.{key} = source.{key}
+    WHEN MATCHED THEN UPDATE SET
+        reading_count = target.reading_count + source.reading_count,
+        temperature_count = target.temperature_count + source.temperature_count,
+        temperature_sum = target.temperature_sum + source.temperature_sum,
+        soil_moisture_count = target.soil_moisture_count + source.soil_moisture_count,
+        soil_moisture_sum = target.soil_moisture_sum + source.soil_moisture_sum
+    WHEN NOT MATCHED THEN INSERT ({key}, reading_count, temperature_count, temperature_sum,
+                                  soil_moisture_count, soil_moisture_sum)
+        VALUES (source.{key}, source.reading_count, source.temperature_count,
+                source.temperature_sum, source.soil_moisture_count, source.soil_moisture_sum);
+"""
+
+SQLITE_UPSERT = """
+    INSERT INTO {table} ({key}, reading_count, temperature_count, temperature_sum,
+                         soil_moisture_count, soil_moisture_sum)
+    VALUES (:{key}, :reading_count, :temperature_count, :temperature_sum,
+            :soil_moisture_count, :soil_moisture_sum)
+    ON CONFLICT ({key}) DO UPDATE SET
+        reading_count = reading_count + excluded.reading_count,
+        temperature_count = temperature_count + excluded.temperature_count,
+        temperature_sum = temperature_sum + excluded.temperature_sum,
+        soil_moisture_count = soil_moisture_count + excluded.soil_moisture_count,
+        soil_moisture_sum = soil_moisture_sum + excluded.soil_moisture_sum;
+"""
+
+# Columns of a CURRENT_plant_state row, in the order of the VALUES rows below.
+STATE_COLUMNS = ("plant_id", "recording_taken", "temperature", "soil_moisture", "last_watered",
+                 "error_msg", "reading_count", "temperature_count", "temperature_sum",
+                 "soil_moisture_count", "soil_moisture_sum")
+# SQL Server takes at most 2100 parameters per statement.
+STATE_ROWS_PER_STATEMENT = 150
+
+# The latest reading only replaces the stored one if it is newer, last_watered
+# only moves forwards and the error state is always that of the latest batch.
+# HOLDLOCK, as in MSSQL_MERGE, stops concurrent loads inserting the same plant.
+MSSQL_STATE_MERGE = """
+    MERGE CURRENT_plant_state WITH (HOLDLOCK) AS target
+    USING (VALUES {values}) AS source (plant_id, recording_taken, temperature, soil_moisture,
+        last_watered, error_msg, reading_count, temperature_count, temperature_sum,
+        soil_moisture_count, soil_moisture_sum)
+    ON target.plant_id = source.plant_id
+    WHEN MATCHED THEN UPDATE SET
+        recording_taken = CASE WHEN target.recording_taken IS NULL
+            OR source.recording_taken >= target.recording_taken
+            THEN source.recording_taken ELSE target.recording_taken END,
+        temperature = CASE WHEN target.recording_taken IS NULL
+            OR source.recording_taken >= target.recording_taken
+            THEN source.temperature ELSE target.temperature END,
+        soil_moisture = CASE WHEN target.recording_taken IS NULL
+            OR source.recording_taken >= target.recording_taken
+            THEN source.soil_moisture ELSE target.soil_moisture END,
+        last_watered = CASE WHEN target.last_watered IS NULL
+            OR source.last_watered > target.last_watered
+            THEN source.last_watered ELSE target.last_watered END,
+        error_msg = source.error_msg,
+        reading_count = target.reading_count + source.reading_count,
+        temperature_count = target.temperature_count + source.temperature_count,
+        temperature_sum = target.temperature_sum + source.temperature_sum,
+        soil_moisture_count = target.soil_moisture_count + source.soil_moisture_count,
+        soil_moisture_sum = target.soil_moisture_sum + source.soil_moisture_sum
+    WHEN NOT MATCHED THEN INSERT (plant_id, recording_taken, temperature, soil_moisture,
+        last_watered, error_msg, reading_count, temperature_count, temperature_sum,
+        soil_moisture_count, soil_moisture_sum)
+        VALUES (source.plant_id, source.recording_taken, source.temperature,
+                source.soil_moisture, source.last_watered, source.error_msg,
+                source.reading_count, source.temperature_count, source.temperature_sum,
+                source.soil_moisture_count, source.soil_moisture_sum);
+"""
+
+SQLITE_STATE_UPSERT = """
+    INSERT INTO CURRENT_plant_state (plant_id, recording_taken, temperature, soil_moisture,
+        last_watered, error_msg, reading_count, temperature_count, temperature_sum,
+        soil_moisture_count, soil_moisture_sum)
+    VALUES {values}
+    ON CONFLICT (plant_id) DO UPDATE SET
+        recording_taken = CASE WHEN recording_taken IS NULL
+            OR excluded.recording_taken >= recording_taken
+            THEN excluded.recording_taken ELSE recording_taken END,
+        temperature = CASE WHEN recording_taken IS NULL
+            OR excluded.recording_taken >= recording_taken
+            THEN excluded.temperature ELSE temperature END,
+        soil_moisture = CASE WHEN recording_taken IS NULL
+            OR excluded.recording_taken >= recording_taken
+            THEN excluded.soil_moisture ELSE soil_moisture END,
+        last_watered = CASE WHEN last_watered IS NULL
+            OR excluded.last_watered > last_watered
+            THEN excluded.last_watered ELSE last_watered END,
+        error_msg = excluded.error_msg,
+        reading_count = reading_count + excluded.reading_count,
+        temperature_count = temperature_count + excluded.temperature_count,
+        temperature_sum = temperature_sum + excluded.temperature_sum,
+        soil_moisture_count = soil_moisture_count + excluded.soil_moisture_count,
+        soil_moisture_sum = soil_moisture_sum + excluded.soil_moisture_sum;
+"""
+
+# The SQL Server DDL in schema.sql uses IDENTITY and VARCHAR(MAX), so the
+# SQLite tables are declared here. Its seed data and views are portable
+# and are read from schema.sql.
+SQLITE_TABLES = """
+CREATE TABLE IF NOT EXISTS DIM_country (
+    country_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    country_name VARCHAR(255) NOT NULL
+);
+CREATE TABLE IF NOT EXISTS DIM_origin_location (
+    location_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    longitude FLOAT,
+    latitude FLOAT,
+    city VARCHAR(55),
+    country_id SMALLINT REFERENCES DIM_country(country_id)
+);
+CREATE TABLE IF NOT EXISTS DIM_botanist (
+    botanist_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    botanist_name VARCHAR(55),
+    email VARCHAR(255),
+    phone VARCHAR(30)
+);
+CREATE TABLE IF NOT EXISTS DIM_plant (
+    plant_id SMALLINT PRIMARY KEY,
+    plant_name VARCHAR(255),
+    scientific_name VARCHAR(255),
+    regular_url TEXT,
+    botanist_id SMALLINT,
+    location_id SMALLINT
+);
+CREATE TABLE IF NOT EXISTS FACT_plant_reading (
+    plant_health_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    temperature FLOAT,
+    soil_moisture FLOAT,
+    recording_taken DATETIME,
+    last_watered DATETIME,
+    error_msg VARCHAR(255),
+    plant_id SMALLINT REFERENCES DIM_plant(plant_id)
+);
+CREATE TABLE IF NOT EXISTS SUMMARY_plant (
+    plant_id SMALLINT PRIMARY KEY,
+    reading_count INT NOT NULL,
+    temperature_count INT NOT NULL,
+    temperature_sum FLOAT NOT NULL,
+    soil_moisture_count INT NOT NULL,
+    soil_moisture_sum FLOAT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS SUMMARY_time_bucket (
+    bucket_start DATETIME PRIMARY KEY,
+    reading_count INT NOT NULL,
+    temperature_count INT NOT NULL,
+    temperature_sum FLOAT NOT NULL,
+    soil_moisture_count INT NOT NULL,
+    soil_moisture_sum FLOAT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS CURRENT_plant_state (
+    plant_id SMALLINT PRIMARY KEY,
+    recording_taken DATETIME,
+    temperature FLOAT,
+    soil_moisture FLOAT,
+    last_watered DATETIME,
+    error_msg VARCHAR(255),
+    reading_count INT NOT NULL,
+    temperature_count INT NOT NULL,
+    temperature_sum FLOAT NOT NULL,
+    soil_moisture_count INT NOT NULL,
+    soil_moisture_sum FLOAT NOT NULL
+);
+"""
+
+
+def storage_backend() -> str:
+    """Returns the configured backend name."""
+    return ENV.get("STORAGE_BACKEND", "mssql").lower()
+
+
+def portable_statements(schema_sql: str) -> list[str]:
+    """Returns the seed INSERTs and CREATE VIEWs of schema.sql,
+    which run unchanged on SQLite."""
+    statements = re.split(r";\s*\n", re.sub(r"^GO\s*$", "", schema_sql, flags=re.MULTILINE))
+    return [statement.strip() for statement in statements
+            if statement.strip().startswith(("INSERT INTO", "CREATE VIEW"))]
+
+
+class ReadingStore:
+    """The readings database used by the load step, the archiver and the
+    dashboard. Subclasses supply the dialect specific summary upserts."""
+
+    plant_summary_sql = None
+    time_bucket_summary_sql = None
+    current_state_sql = None
+
+    def __init__(self, engine: sqlalchemy.Engine):
+        self.engine = engine
+
+    def connect(self):
+        """Returns a DBAPI connection, e.g. for the dashboard loaders."""
+        return self.engine.raw_connection()
+
+    def append_readings(self, conn: sqlalchemy.Connection, readings) -> None:
+        """Appends a batch of cleaned readings to FACT_plant_reading."""
+        readings.to_sql("FACT_plant_reading", conn, index=False, if_exists="append")
+
+    def update_summaries(self, conn: sqlalchemy.Connection, plant_rows: list[dict],
+                         bucket_rows: list[dict]) -> None:
+        """Adds per-plant and per-minute aggregates to the summary tables."""
+        if plant_rows:
+            conn.execute(self.plant_summary_sql, plant_rows)
+        if bucket_rows:
+            conn.execute(self.time_bucket_summary_sql, bucket_rows)
+
+    def update_current_state(self, conn: sqlalchemy.Connection, state_rows: list[dict]) -> None:
+        """Upserts each plant's latest reading, error state and running totals
+        into CURRENT_plant_state, as one set-based statement per chunk of plants."""
+        for start in range(0, len(state_rows), STATE_ROWS_PER_STATEMENT):
+            chunk = state_rows[start:start + STATE_ROWS_PER_STATEMENT]
+            values = ", ".join(
+                "(" + ", ".join(f":{column}_{index}" for column in STATE_COLUMNS) + ")"
+                for index in range(len(chunk)))
+            conn.execute(sqlalchemy.text(self.current_state_sql.format(values=values)),
+                         {f"{column}_{index}": row[column]
+                          for index, row in enumerate(chunk) for column in STATE_COLUMNS})
+
+    def read_readings(self):
+        """Returns every reading in FACT_plant_reading."""
+        return read_sql_columnar(self.engine, "SELECT * FROM FACT_plant_reading")
+
+    def clear_readings(self) -> None:
+        """Deletes the readings and the summaries built from them, and resets
+        the running averages of the current plant state."""
+        with self.engine.begin() as conn:
+            for table in ("FACT_plant_reading", "SUMMARY_plant", "SUMMARY_time_bucket"):
+                conn.execute(sqlalchemy.text(f"DELETE FROM {table}"))
+            conn.execute(sqlalchemy.text(
+                "UPDATE CURRENT_plant_state SET reading_count = 0, temperature_count = 0, "
+                "temperature_sum = 0, soil_moisture_count = 0, soil_moisture_sum = 0"))
+
+
+class SQLServerStore(ReadingStore):
+    """The production SQL Server database."""
+
+    plant_summary_sql = sqlalchemy.text(
+        MSSQL_MERGE.format(table="SUMMARY_plant", key="plant_id"))
+    time_bucket_summary_sql = sqlalchemy.text(
+        MSSQL_MERGE.format(table="SUMMARY_time_bucket", key="bucket_start"))
+    current_state_sql = MSSQL_STATE_MERGE
+
+    @classmethod
+    def from_env(cls) -> "SQLServerStore":
+        """Connects with the DB_* environment variables."""
+        return cls(sqlalchemy.create_engine(
+            (f"mssql+pyodbc://{ENV['DB_USER']}:{ENV['DB_PASSWORD']}"
+             f"@{ENV['DB_HOST']}/{ENV['DB_NAME']}?driver={ENV['DB_DRIVER']}"),
+            connect_args={'connect_timeout': 10,
+                          'TrustServerCertificate': 'yes'},
+            echo=False))
+
+
+class SQLiteStore(ReadingStore):
+    """An embedded SQLite database with the production tables, views and
+    seed data, created on first use."""
+
+    plant_summary_sql = sqlalchemy.text(
+        SQLITE_UPSERT.format(table="SUMMARY_plant", key="plant_id"))
+    time_bucket_summary_sql = sqlalchemy.text(
+        SQLITE_UPSERT.format(table="SUMMARY_time_bucket", key="bucket_start"))
+    current_state_sql = SQLITE_STATE_UPSERT
+
+    def __init__(self, engine: sqlalchemy.Engine):
+        super().__init__(engine)
+        self.create_schema()
+
+    @classmethod
+    def from_path(cls, path: str) -> "SQLiteStore":
+        """Opens (or creates) the database file at path, or ":memory:"."""
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            return cls(sqlalchemy.create_engine(f"sqlite:///{path}"))
+        return cls(sqlalchemy.create_engine(
+            "sqlite://", poolclass=StaticPool,
+            connect_args={"check_same_thread": False}))
+
+    @classmethod
+    def from_env(cls) -> "SQLiteStore":
+        """Opens the database file at STORAGE_PATH."""
+        return cls.from_path(ENV.get("STORAGE_PATH", DEFAULT_SQLITE_PATH))
+
+    def create_schema(self) -> None:
+        """Creates any missing tables and views, and seeds the dimension
+        tables from schema.sql if they are empty."""
+        with open(SCHEMA_PATH, encoding="utf-8") as schema_file:
+            statements = portable_statements(schema_file.read())
+        with self.engine.begin() as conn:
+            for table in SQLITE_TABLES.split(";"):
+                if table.strip():
+                    conn.exec_driver_sql(table)
+            for view in statements:
+                if view.startswith("CREATE VIEW"):
+                    conn.exec_driver_sql(view.replace("CREATE VIEW", "CREATE VIEW IF NOT EXISTS", 1))
+            if conn.exec_driver_sql("SELECT COUNT(*) FROM DIM_plant").scalar():
+                return
+            get_logger().info("Creating the local SQLite schema.")
+            for statement in statements:
+                if statement.startswith("INSERT INTO"):
+                    conn.exec_driver_sql(statement)
+
+
+STORES = {"mssql": SQLServerStore, "sqlite": SQLiteStore}
+
+
+def get_store(backend: str = None) -> ReadingStore:
+    """Returns the store for backend, or STORAGE_BACKEND if not given."""
+    backend = backend or storage_backend()
+    if backend not in STORES:
+        raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}, use one of {list(STORES)}.")
+    return STORES[backend].from_env()
+
+
+class LocalObjectStore:
+    """A directory with the parts of the S3 client API the archiver,
+    dashboard and stream checks use (conditional put_object and
+    get_object), so the archive can live on local disk. Keys are paths
+    under root; buckets are ignored."""
+    # pylint: disable=invalid-name, unused-argument
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        """Returns the file for a key."""
+        return os.path.join(self.root, *key.split("/"))
+
+    @staticmethod
+    def _error(code: str, operation: str = "GetObject"):
+        """Returns the ClientError S3 would raise."""
+        from botocore.exceptions import ClientError  # pylint: disable=import-outside-toplevel
+        return ClientError({"Error": {"Code": code}}, operation)
+
+    def put_object(self, Bucket: str, Key: str, Body,
+                   IfMatch: str = None, IfNoneMatch: str = None) -> dict:
+        """Writes an object atomically and returns its ETag, raising
+        ClientError PreconditionFailed if IfMatch isn't its current ETag or
+        IfNoneMatch is "*" and it already exists."""
+        path = self._path(Key)
+        etag = self._etag(path) if os.path.exists(path) else None
+        if (IfMatch is not None and IfMatch != etag) or (IfNoneMatch == "*" and etag):
+            raise self._error("PreconditionFailed", "PutObject")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as object_file:
+            object_file.write(Body.encode("utf-8") if isinstance(Body, str) else Body)
+        os.replace(path + ".tmp", path)
+        return {"ETag": self._etag(path)}
+
+    @staticmethod
+    def _etag(path: str) -> str:
+        """Returns an ETag which changes whenever the file is rewritten."""
+        stat = os.stat(path)
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    def get_object(self, Bucket: str, Key: str,
+                   IfNoneMatch: str = None) -> dict:
+        """Returns an object's body and ETag, raising ClientError 404 if it
+        is missing and 304 if its ETag matches IfNoneMatch."""
+        path = self._path(Key)
+        if not os.path.exists(path):
+            raise self._error("NoSuchKey")
+        etag = self._etag(path)
+        if IfNoneMatch == etag:
+            raise self._error("304")
+        with open(path, "rb") as object_file:
+            body = object_file.read()
+        return {"Body": io.BytesIO(body), "ETag": etag,
+                "LastModified": datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)}
+
+
+def archive_client():
+    """Returns a LocalObjectStore if ARCHIVE_DIR is set, otherwise an S3 client."""
+    if ENV.get("ARCHIVE_DIR"):
+        return LocalObjectStore(ENV["ARCHIVE_DIR"])
+    from boto3 import client  # pylint: disable=import-outside-toplevel
+    return client("s3", region_name=ENV.get("AWS_REGION", "eu-west-2"))
+
+
+def archive_pattern() -> str:
+    """Returns the glob of the archived daily summaries: under ARCHIVE_DIR if
+    it is set, as in archive_client, otherwise the archiver's objects in S3_BUCKET."""
+    if ENV.get("ARCHIVE_DIR") or not ENV.get("S3_BUCKET"):
+        return os.path.join(ENV.get("ARCHIVE_DIR", "data/archive"), "daily_summaries", "*.csv")
+    return f"s3://{ENV['S3_BUCKET']}/daily_summaries/plant_readings_*.csv"
+
+
+class HistoricalStore:
+    """Analytical queries over the archived daily summaries with DuckDB,
+    which scans the CSV (or Parquet) files directly and in parallel.
+    The files are exposed to SQL as the daily_summaries view. An s3://
+    pattern is read with DuckDB's httpfs extension, using the same AWS
+    credential chain as boto3."""
+
+    def __init__(self, pattern: str = None):
+        import duckdb  # pylint: disable=import-outside-toplevel
+        self.pattern = pattern or archive_pattern()
+        reader = "read_parquet" if self.pattern.endswith(".parquet") else "read_csv_auto"
+        self._conn = duckdb.connect()
+        if self.pattern.startswith("s3://"):
+            self._conn.execute("INSTALL httpfs; LOAD httpfs; INSTALL aws; LOAD aws;")
+            self._conn.execute(
+                "CREATE SECRET archive (TYPE S3, PROVIDER CREDENTIAL_CHAIN, "
+                f"REGION '{ENV.get('AWS_REGION', 'eu-west-2')}')")
+        self._conn.execute(
+            f"CREATE VIEW daily_summaries AS SELECT * FROM "
+            f"{reader}('{self.pattern}', union_by_name = true)")
+
+    def query(self, sql: str, params: list = None):
+        """Runs a query and returns the result as a DataFrame."""
+        return self._conn.execute(sql, params or []).df()
+
+    def daily_summaries(self, start, end):
+        """Returns the archived daily summaries from start to end inclusive."""
+        return self.query("SELECT * FROM daily_summaries "
+                          "WHERE CAST(date AS DATE) BETWEEN ? AND ? "
+                          "ORDER BY date, plant_id", [start, end])
+
+    def plant_statistics(self, start, end):
+        """Returns each plant's mean, spread and range of daily averages."""
+        return self.query("""
+            SELECT plant_id,
+                COUNT(*) AS days,
+                AVG(avg_temperature) AS mean_temperature,
+                STDDEV_SAMP(avg_temperature) AS std_temperature,
+                MIN(avg_temperature) AS min_temperature,
+                MAX(avg_temperature) AS max_temperature,
+                AVG(avg_soil_moisture) AS mean_soil_moisture,
+                STDDEV_SAMP(avg_soil_moisture) AS std_soil_moisture,
+                SUM(recording_count) AS recording_count
+            FROM daily_summaries
+            WHERE CAST(date AS DATE) BETWEEN ? AND ?
+            GROUP BY plant_id
+            ORDER BY plant_id
+        """, [start, end])
+
+    def plant_timeseries(self, plant_id: int, start, end):
+        """Returns one plant's daily summaries from start to end inclusive."""
+        return self.query("SELECT * FROM daily_summaries "
+                          "WHERE plant_id = ? AND CAST(date AS DATE) BETWEEN ? AND ? "
+                          "ORDER BY date", [plant_id, start, end])
+
+    def fleet_daily(self, start, end):
+        """Returns the whole fleet's averages and reading counts per day."""
+        return self.query("""
+            SELECT CAST(date AS DATE) AS date,
+                COUNT(DISTINCT plant_id) AS plants,
+                AVG(avg_temperature) AS avg_temperature,
+                AVG(avg_soil_moisture) AS avg_soil_moisture,
+                SUM(recording_count) AS recording_count
+            FROM daily_summaries
+            WHERE CAST(date AS DATE) BETWEEN ? AND ?
+            GROUP BY CAST(date AS DATE)
+            ORDER BY date
+        """, [start, end])
+
+    def outliers(self, start, end, threshold: float = 3.0):
+        """Returns the plant days whose average temperature or soil moisture
+        is more than threshold standard deviations from the plant's own
+        mean over the range."""
+        return self.query("""
+            WITH scored AS (
+                SELECT plant_id, CAST(date AS DATE) AS date, avg_temperature, avg_soil_moisture,
+                    (avg_temperature - AVG(avg_temperature) OVER plant)
+                        / NULLIF(STDDEV_SAMP(avg_temperature) OVER plant, 0) AS temp_zscore,
+                    (avg_soil_moisture - AVG(avg_soil_moisture) OVER plant)
+                        / NULLIF(STDDEV_SAMP(avg_soil_moisture) OVER plant, 0) AS moisture_zscore
+                FROM daily_summaries
+                WHERE CAST(date AS DATE) BETWEEN ? AND ?
+                WINDOW plant AS (PARTITION BY plant_id)
+            )
+            SELECT * FROM scored
+            WHERE ABS(temp_zscore) > ? OR ABS(moisture_zscore) > ?
+            ORDER BY date, plant_id
+        """, [start, end, threshold, threshold])
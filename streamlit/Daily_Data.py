@@ -1,8 +1,4 @@
 """Streamlit Dashboard."""
-from os import environ as ENV
-import pandas as pd
-from dotenv import load_dotenv
-import pyodbc
 import streamlit as st
 
 from visualisations.visualisations import (get_average_moisture_level_per_plant_bar_chart,
@@ -13,9 +9,9 @@ from visualisations.visualisations import (get_average_moisture_level_per_plant_
                                            get_average_temperature_per_city_bar_chart,
                                            get_moisture_level_per_botanist_bar_chart,
                                            get_avg_temp_area_chart)
+from loaders.dashboard_data import get_data_service, show_refresh_metrics
 
-# pylint: disable=no-member, invalid-name, too-many-arguments, c-extension-no-member
-load_dotenv()
+# pylint: disable=no-member, invalid-name
 
 st.set_page_config(
     page_title="Plant Analytics",
@@ -41,80 +37,49 @@ st.set_page_config(
 #     """, unsafe_allow_html=True)
 
 
-@st.cache_resource
-def get_connection(driver, host, port, database, username, password):
-    """Create and cache a SQL Server connection using pyodbc."""
-    conn_str = (
-        f"DRIVER={driver};"
-        f"SERVER={host},{port};"
-        f"DATABASE={database};"
-        f"UID={username};"
-        f"PWD={password};"
-        "TrustServerCertificate=yes;"
-    )
-    return pyodbc.connect(conn_str)
-
-
-@st.cache_data
-def load_data(_connection):
-    """Loads data from DB."""
-    query = """
-    SELECT plant_name, botanist_name, temperature, soil_moisture, recording_taken, city, country_name
-    FROM FACT_plant_reading
-    LEFT JOIN DIM_plant 
-    ON FACT_plant_reading.plant_id = DIM_plant.plant_id
-    LEFT JOIN DIM_botanist 
-    ON DIM_plant.botanist_id = DIM_botanist.botanist_id
-    LEFT JOIN DIM_origin_location 
-    ON DIM_plant.location_id = DIM_origin_location.location_id
-    LEFT JOIN DIM_country
-    ON DIM_country.country_id = DIM_origin_location.country_id;
-
-
-    """
-    return pd.read_sql(query, _connection)
-
-
 if __name__ == "__main__":
 
-    conn = get_connection(ENV['DB_DRIVER'],
-                          ENV['DB_HOST'],
-                          ENV['DB_PORT'],
-                          ENV['DB_NAME'],
-                          ENV['DB_USER'],
-                          ENV['DB_PASSWORD'])
-
-    df = load_data(conn)
+    service = get_data_service()
+    snapshot = service.snapshot()
+    df, version = snapshot.live, snapshot.live_version
+    show_refresh_metrics(service)
+    if df.empty or "plant_state" not in snapshot.summaries:
+        st.warning("No live readings have loaded yet. This page refreshes when they arrive.")
+        st.stop()
 
     st.title("🌿 Plant Sensor Insights 🌿")
 
     st.subheader("🔍 Filters")
     plant_name = st.selectbox("Plant name", df["plant_name"].unique())
-    df["recording_taken"] = pd.to_datetime(
-        df["recording_taken"], format='ISO8601')
-    show_plant_info(df, plant_name)
+    show_plant_info(snapshot.summaries["plant_state"], plant_name)
 
     st.subheader("🌡️ Plant Temperature Recordings")
-    line_graph = get_temperature_line_graph(df, plant_name)
+    line_graph = get_temperature_line_graph(df, plant_name, version)
     st.altair_chart(line_graph, use_container_width=True)
 
-    bar_chart_2 = get_average_temperature_per_plant_bar_chart(df)
+    plant_summary = snapshot.summaries["plant"]
+    bar_chart_2 = get_average_temperature_per_plant_bar_chart(
+        plant_summary, version)
     st.altair_chart(bar_chart_2, use_container_width=True)
 
-    table = get_avg_temp_area_chart(df)
+    table = get_avg_temp_area_chart(
+        snapshot.summaries["temperature_trend"], version)
     st.altair_chart(table, use_container_width=True)
 
     st.subheader("🪴 Moisture Levels Over Recordings")
-    line_graph_2 = get_moisture_levels_line_graph(df, plant_name)
+    line_graph_2 = get_moisture_levels_line_graph(df, plant_name, version)
     st.altair_chart(line_graph_2, use_container_width=True)
 
-    bar_chart = get_average_moisture_level_per_plant_bar_chart(df)
+    bar_chart = get_average_moisture_level_per_plant_bar_chart(
+        plant_summary, version)
     st.altair_chart(bar_chart, use_container_width=True)
 
     st.subheader("🌍 City-Wise Overview")
-    temp_by_city = get_average_temperature_per_city_bar_chart(df)
+    temp_by_city = get_average_temperature_per_city_bar_chart(
+        snapshot.summaries["city"], version)
     st.altair_chart(temp_by_city, use_container_width=True)
 
     st.subheader("🧑‍🔬 Botanist Performance")
-    per_botanist = get_moisture_level_per_botanist_bar_chart(df)
+    per_botanist = get_moisture_level_per_botanist_bar_chart(
+        snapshot.summaries["botanist"], version)
     st.altair_chart(per_botanist, use_container_width=True)
@@ -0,0 +1,47 @@
+"""A bounded, health-checked SQL Server connection pool for the dashboard,
+safe to share between Streamlit's script threads."""
+import sqlalchemy
+from sqlalchemy import event
+from sqlalchemy.engine import URL, Engine
+from sqlalchemy.pool import QueuePool
+
+POOL_SIZE = 5
+MAX_OVERFLOW = 5
+POOL_TIMEOUT = 10
+POOL_RECYCLE = 1800
+QUERY_TIMEOUT = 30
+
+
+def build_mssql_url(driver: str, host: str, port: str, database: str,
+                    username: str, password: str) -> URL:
+    """Returns the SQLAlchemy URL for the LNHM SQL Server database."""
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    return URL.create("mssql+pyodbc", username=username, password=password,
+                      host=host, port=int(port), database=database,
+                      query={"driver": driver, "TrustServerCertificate": "yes"})
+
+
+def set_query_timeout(dbapi_connection, query_timeout: int) -> None:
+    """Sets the per-query timeout on a new pyodbc connection.
+    Drivers without a timeout attribute (e.g. sqlite3) are left unchanged."""
+    if hasattr(dbapi_connection, "timeout"):
+        dbapi_connection.timeout = query_timeout
+
+
+def create_pooled_engine(url, pool_size: int = POOL_SIZE, max_overflow: int = MAX_OVERFLOW,
+                         pool_timeout: int = POOL_TIMEOUT, pool_recycle: int = POOL_RECYCLE,
+                         query_timeout: int = QUERY_TIMEOUT) -> Engine:
+    """Returns an engine holding at most pool_size + max_overflow connections.
+    Connections are pinged before use, so dropped ones are replaced, and
+    recycled after pool_recycle seconds. Waiting longer than pool_timeout
+    for a free connection raises sqlalchemy.exc.TimeoutError."""
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    engine = sqlalchemy.create_engine(url, poolclass=QueuePool, pool_size=pool_size,
+                                      max_overflow=max_overflow, pool_timeout=pool_timeout,
+                                      pool_recycle=pool_recycle, pool_pre_ping=True)
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, _connection_record):
+        set_query_timeout(dbapi_connection, query_timeout)
+
+    return engine
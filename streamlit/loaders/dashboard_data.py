@@ -0,0 +1,94 @@
+"""Wires the shared data service to the LNHM database and S3 archive.
+Pages call get_data_service() and read its snapshots."""
+# pylint: disable=import-error
+import os
+import tempfile
+from datetime import date, timedelta
+from os import environ as ENV
+from boto3 import client
+from dotenv import load_dotenv
+import streamlit as st
+
+from loaders.connection import (MAX_OVERFLOW, POOL_SIZE, QUERY_TIMEOUT,
+                                build_mssql_url, create_pooled_engine)
+from loaders.data_service import DataService
+from loaders.historical_data import (SCORES_KEY_FORMAT, HistoricalDataLoader,
+                                     attach_anomaly_scores)
+from loaders.live_data import SUMMARY_QUERIES, IncrementalReadingLoader, load_summary
+from storage import archive_client, get_store, storage_backend
+
+HISTORICAL_DAYS = 30
+
+
+@st.cache_resource
+def get_engine():
+    """Create the pooled engine shared by every session in this process.
+    With STORAGE_BACKEND=sqlite the local database's engine is used."""
+    if storage_backend() != "mssql":
+        return get_store().engine
+    return create_pooled_engine(
+        build_mssql_url(ENV['DB_DRIVER'], ENV['DB_HOST'], ENV['DB_PORT'],
+                        ENV['DB_NAME'], ENV['DB_USER'], ENV['DB_PASSWORD']),
+        pool_size=int(ENV.get('DB_POOL_SIZE', POOL_SIZE)),
+        max_overflow=int(ENV.get('DB_MAX_OVERFLOW', MAX_OVERFLOW)),
+        query_timeout=int(ENV.get('DB_QUERY_TIMEOUT', QUERY_TIMEOUT)))
+
+
+def connect():
+    """Checks a DBAPI connection out of the pool. Closing it returns it to the pool."""
+    return get_engine().raw_connection()
+
+
+def load_summaries(connection) -> dict:
+    """Loads every pre-aggregated summary used by the live dashboard."""
+    return {summary: load_summary(connection, summary) for summary in SUMMARY_QUERIES}
+
+
+@st.cache_resource
+def get_historical_loader() -> HistoricalDataLoader:
+    """Create the disk-cached loader of the archiver's daily summaries,
+    read from ARCHIVE_DIR instead of S3 if it is set."""
+    if ENV.get("ARCHIVE_DIR"):
+        s3_client = archive_client()
+    else:
+        s3_client = client("s3", region_name=ENV.get("AWS_REGION", "eu-west-2"),
+                           aws_access_key_id=ENV.get("AWS_ACCESS_KEY_ID"),
+                           aws_secret_access_key=ENV.get("AWS_SECRET_ACCESS_KEY"))
+    cache_dir = ENV.get("HISTORICAL_CACHE_DIR",
+                        os.path.join(tempfile.gettempdir(), "lnhm_historical"))
+    return HistoricalDataLoader(s3_client, ENV.get("S3_BUCKET"), cache_dir)
+
+
+def load_historical_data():
+    """Loads the last HISTORICAL_DAYS of daily summaries with the archiver's
+    per-plant anomaly scores. Unchanged days are revalidated by ETag rather
+    than downloaded again."""
+    end = date.today()
+    start = end - timedelta(days=int(ENV.get("HISTORICAL_DAYS", HISTORICAL_DAYS)) - 1)
+    loader = get_historical_loader()
+    summaries, summaries_version = loader.load(start, end)
+    scores, scores_version = loader.load(start, end, SCORES_KEY_FORMAT)
+    return attach_anomaly_scores(summaries, scores), hash((summaries_version,
+                                                           scores_version))
+
+
+@st.cache_resource
+def get_data_service() -> DataService:
+    """Starts the data service shared by every session in this process."""
+    load_dotenv()
+    return DataService(connect, IncrementalReadingLoader(), load_summaries,
+                       load_historical_data).start()
+
+
+def show_refresh_metrics(service: DataService) -> None:
+    """Shows how fresh the shared snapshot is in the sidebar."""
+    metrics = service.metrics()
+    if metrics["snapshot_age_seconds"] is not None:
+        st.sidebar.caption(
+            f"Data refreshed {metrics['snapshot_age_seconds']:.0f}s ago "
+            f"in {metrics['last_refresh_seconds']:.2f}s.")
+    if metrics["last_error"]:
+        st.sidebar.warning(f"Latest data refresh failed: {metrics['last_error']}")
+    if metrics["last_historical_error"]:
+        st.sidebar.warning("Latest archive refresh failed, showing the last archive loaded: "
+                           f"{metrics['last_historical_error']}")
@@ -0,0 +1,136 @@
+"""A process-wide data service which refreshes the dashboard datasets on a
+background thread and publishes them as immutable snapshots, so browser
+sessions never query the database or S3 themselves."""
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import Callable, Mapping
+import pandas as pd
+from utils import PeriodicTask, get_logger
+
+LIVE_REFRESH_INTERVAL = 10.0
+HISTORICAL_REFRESH_INTERVAL = 300.0
+HISTORICAL_RETRY_INTERVAL = 60.0
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """One published version of the dashboard datasets. Frames are shared
+    between sessions and must be treated as read-only."""
+    live: pd.DataFrame = field(default_factory=pd.DataFrame)
+    live_version: tuple = (0, 0, 0)
+    summaries: Mapping[str, pd.DataFrame] = field(
+        default_factory=lambda: MappingProxyType({}))
+    historical: pd.DataFrame = field(default_factory=pd.DataFrame)
+    historical_version: int = 0
+    published_at: float = 0.0
+
+
+class DataService:  # pylint: disable=too-many-instance-attributes
+    """Refreshes the live readings, their summaries and the historical
+    archive on one background thread, shared by every dashboard session.
+    connect returns a database connection, closed after each refresh, reading_loader is an
+    IncrementalReadingLoader, load_summaries(connection) returns the summary
+    frames by name and load_historical() returns (frame, version).
+    The historical archive is refreshed separately from the live data, so
+    an S3 failure keeps the last good archive without holding up the live
+    readings, and is retried after HISTORICAL_RETRY_INTERVAL."""
+
+    def __init__(self, connect: Callable, reading_loader, load_summaries: Callable,
+                 load_historical: Callable,
+                 live_interval: float = LIVE_REFRESH_INTERVAL,
+                 historical_interval: float = HISTORICAL_REFRESH_INTERVAL):
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
+        self._connect = connect
+        self._loader = reading_loader
+        self._load_summaries = load_summaries
+        self._load_historical = load_historical
+        self._historical_interval = historical_interval
+        self._snapshot = Snapshot()
+        self._historical_due_at = None
+        self._ready = threading.Event()
+        self._refresher = PeriodicTask(self.refresh, live_interval, "lnhm-data-service")
+        self._metrics = {"refresh_count": 0, "refresh_errors": 0,
+                         "last_refresh_seconds": None, "last_error": None,
+                         "historical_errors": 0, "last_historical_error": None}
+
+    def start(self) -> "DataService":
+        """Starts the background refresh thread if it isn't already running."""
+        self._refresher.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stops the background refresh thread."""
+        self._refresher.stop(timeout)
+
+    def refresh(self) -> Snapshot:
+        """Loads anything new and publishes a new snapshot. On failure the
+        previous snapshot stays published and the error is counted."""
+        started = time.monotonic()
+        try:
+            snapshot = self._build_snapshot()
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            get_logger().error("Dashboard data refresh failed: %s", exc)
+            self._metrics["refresh_errors"] += 1
+            self._metrics["last_error"] = str(exc)
+            return self._snapshot
+
+        self._snapshot = snapshot
+        self._ready.set()
+        self._metrics["refresh_count"] += 1
+        self._metrics["last_refresh_seconds"] = time.monotonic() - started
+        self._metrics["last_error"] = None
+        return snapshot
+
+    def _build_snapshot(self) -> Snapshot:
+        """Returns the next snapshot, reusing the previous frames for
+        anything which hasn't changed."""
+        previous = self._snapshot
+        with closing(self._connect()) as connection:
+            live = self._loader.refresh(connection)
+            live_version = self._loader.version
+
+            summaries = previous.summaries
+            if live_version != previous.live_version or not summaries:
+                summaries = MappingProxyType(self._load_summaries(connection))
+
+        historical, historical_version = self._refresh_historical(previous)
+        return replace(previous, live=live, live_version=live_version,
+                       summaries=summaries, historical=historical,
+                       historical_version=historical_version,
+                       published_at=time.time())
+
+    def _refresh_historical(self, previous: Snapshot) -> tuple[pd.DataFrame, int]:
+        """Returns the historical frame and version, reloaded when due.
+        On failure the previous frame is kept and the load is retried
+        after HISTORICAL_RETRY_INTERVAL rather than on every refresh."""
+        now = time.monotonic()
+        if self._historical_due_at is not None and now < self._historical_due_at:
+            return previous.historical, previous.historical_version
+        try:
+            historical, historical_version = self._load_historical()
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            get_logger().error("Historical data refresh failed: %s", exc)
+            self._metrics["historical_errors"] += 1
+            self._metrics["last_historical_error"] = str(exc)
+            self._historical_due_at = now + min(HISTORICAL_RETRY_INTERVAL,
+                                                self._historical_interval)
+            return previous.historical, previous.historical_version
+        self._historical_due_at = now + self._historical_interval
+        self._metrics["last_historical_error"] = None
+        return historical, historical_version
+
+    def snapshot(self, timeout: float = 30.0) -> Snapshot:
+        """Returns the latest snapshot, waiting for the first refresh if needed.
+        If no refresh has succeeded within timeout this is an empty Snapshot,
+        so callers check for empty frames before using them."""
+        self._ready.wait(timeout)
+        return self._snapshot
+
+    def metrics(self) -> dict:
+        """Returns the snapshot age and refresh timings."""
+        published_at = self._snapshot.published_at
+        return {**self._metrics,
+                "snapshot_age_seconds": time.time() - published_at if published_at else None}
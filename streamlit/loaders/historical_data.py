@@ -0,0 +1,104 @@
+"""Loading of the archiver's daily summaries and anomaly scores from S3
+for a date range, cached on local disk and revalidated by ETag."""
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import pandas as pd
+from botocore.exceptions import ClientError
+
+SUMMARY_KEY_FORMAT = "daily_summaries/plant_readings_{day:%Y-%m-%d}.csv"
+SCORES_KEY_FORMAT = "anomaly_scores/plant_scores_{day:%Y-%m-%d}.csv"
+NOT_MODIFIED_CODES = {"304", "NotModified"}
+MISSING_CODES = {"404", "NoSuchKey"}
+
+
+def summary_keys(start: date, end: date, key_format: str = SUMMARY_KEY_FORMAT) -> list[str]:
+    """Returns the S3 keys of the daily objects from start to end inclusive."""
+    return [key_format.format(day=start + timedelta(days=offset))
+            for offset in range((end - start).days + 1)]
+
+
+class HistoricalDataLoader:
+    """Fetches daily summary CSVs into cache_dir and only downloads an
+    object again when its ETag has changed, using conditional GETs."""
+
+    def __init__(self, s3_client, bucket: str, cache_dir: str, max_workers: int = 8):
+        self._s3_client = s3_client
+        self._bucket = bucket
+        self._cache_dir = cache_dir
+        self._max_workers = max_workers
+        self._frames = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _cache_path(self, key: str) -> str:
+        """Returns where the object for key is cached on disk."""
+        return os.path.join(self._cache_dir, key.replace("/", "__"))
+
+    def fetch(self, key: str) -> tuple[str, str] | None:
+        """Returns the cached path and ETag for key, downloading the object
+        only if it is new or changed. Returns None if it doesn't exist."""
+        path = self._cache_path(key)
+        etag_path = path + ".etag"
+        cached_etag = None
+        if os.path.exists(path) and os.path.exists(etag_path):
+            with open(etag_path, encoding="utf-8") as etag_file:
+                cached_etag = etag_file.read()
+
+        request = {"Bucket": self._bucket, "Key": key}
+        if cached_etag:
+            request["IfNoneMatch"] = cached_etag
+        try:
+            response = self._s3_client.get_object(**request)
+        except ClientError as exc:
+            code = exc.response.get("Error", {}).get("Code")
+            if code in NOT_MODIFIED_CODES and cached_etag:
+                return path, cached_etag
+            if code in MISSING_CODES:
+                for stale in (path, etag_path):
+                    if os.path.exists(stale):
+                        os.remove(stale)
+                return None
+            raise
+
+        # Write to a temporary file first so readers never see a partial CSV.
+        with open(path + ".tmp", "wb") as cache_file:
+            cache_file.write(response["Body"].read())
+        os.replace(path + ".tmp", path)
+        with open(etag_path, "w", encoding="utf-8") as etag_file:
+            etag_file.write(response["ETag"])
+        return path, response["ETag"]
+
+    def load(self, start: date, end: date,
+             key_format: str = SUMMARY_KEY_FORMAT) -> tuple[pd.DataFrame, int]:
+        """Returns the daily objects from start to end and a version token
+        which only changes when one of the underlying objects does."""
+        keys = summary_keys(start, end, key_format)
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            fetched = [result for result in executor.map(self.fetch, keys) if result]
+        if not fetched:
+            return pd.DataFrame(), 0
+
+        version = zlib.crc32("".join(f"{path}{etag}" for path, etag in fetched)
+                             .encode("utf-8"))
+        return pd.concat([self._read(path, etag) for path, etag in fetched],
+                         ignore_index=True), version
+
+    def _read(self, path: str, etag: str) -> pd.DataFrame:
+        """Returns the parsed CSV, only parsing it again when its ETag changes."""
+        cached = self._frames.get(path)
+        if cached is None or cached[0] != etag:
+            cached = self._frames[path] = (etag, pd.read_csv(path))
+        return cached[1]
+
+
+def attach_anomaly_scores(summaries: pd.DataFrame, scores: pd.DataFrame) -> pd.DataFrame:
+    """Adds each plant-day's precomputed temp_zscore and moisture_zscore
+    to the daily summaries. Days without scores are left blank."""
+    score_columns = ["temp_zscore", "moisture_zscore"]
+    if summaries.empty:
+        return summaries
+    if scores.empty:
+        return summaries.assign(**{column: float("nan") for column in score_columns})
+    return summaries.merge(scores[["plant_id", "date", *score_columns]],
+                           on=["plant_id", "date"], how="left")
@@ -0,0 +1,108 @@
+"""Incremental loading of the live plant readings shown on the dashboard."""
+import threading
+import pandas as pd
+from utils import read_sql_columnar
+
+LIVE_READINGS_QUERY = """
+    SELECT plant_health_id, plant_name, botanist_name, temperature, soil_moisture,
+    recording_taken, city, country_name
+    FROM FACT_plant_reading
+    LEFT JOIN DIM_plant
+    ON FACT_plant_reading.plant_id = DIM_plant.plant_id
+    LEFT JOIN DIM_botanist
+    ON DIM_plant.botanist_id = DIM_botanist.botanist_id
+    LEFT JOIN DIM_origin_location
+    ON DIM_plant.location_id = DIM_origin_location.location_id
+    LEFT JOIN DIM_country
+    ON DIM_country.country_id = DIM_origin_location.country_id
+    WHERE plant_health_id > ?
+    ORDER BY plant_health_id;
+    """
+
+MIN_LIVE_ID_QUERY = "SELECT MIN(plant_health_id) FROM FACT_plant_reading;"
+
+# IDENTITY values are handed out at insert, not at commit, so with concurrent
+# loads (shards, the poller) a smaller id can commit after a larger one has
+# been read. Each refresh re-reads this many ids below the newest one seen.
+LATE_COMMIT_WINDOW = 500
+
+
+class IncrementalReadingLoader:
+    """Keeps the live readings in memory and only fetches rows newer than
+    the last plant_health_id seen, less LATE_COMMIT_WINDOW to pick up rows
+    which committed late. One instance is shared by every session."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = pd.DataFrame()
+        self._last_id = 0
+
+    @property
+    def last_id(self) -> int:
+        """Returns the newest plant_health_id loaded so far."""
+        return self._last_id
+
+    @property
+    def version(self) -> tuple:
+        """Returns a cheap token identifying the loaded readings, for use
+        as a cache key instead of hashing the frame itself."""
+        frame = self._frame
+        first_id = int(frame["plant_health_id"].iloc[0]) if not frame.empty else 0
+        return (first_id, self._last_id, len(frame))
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """Returns the readings loaded so far. Treat it as read-only,
+        refresh() publishes a new frame rather than changing this one."""
+        return self._frame
+
+    def refresh(self, connection) -> pd.DataFrame:
+        """Appends readings newer than the last one seen, and any in the
+        window below it which weren't loaded yet, and drops readings the
+        archiver has since deleted. Returns the updated frame."""
+        with self._lock:
+            since = max(0, self._last_id - LATE_COMMIT_WINDOW)
+            delta = read_sql_columnar(connection, LIVE_READINGS_QUERY, params=[since])
+            min_live_id = connection.cursor().execute(
+                MIN_LIVE_ID_QUERY).fetchone()[0]
+
+            frame = self._frame
+            if min_live_id is None:
+                frame = frame.iloc[0:0]
+            elif not frame.empty and frame["plant_health_id"].iloc[0] < min_live_id:
+                frame = frame[frame["plant_health_id"] >= min_live_id]
+
+            if not delta.empty and not frame.empty:
+                loaded_ids = frame["plant_health_id"]
+                recent_ids = loaded_ids.iloc[loaded_ids.searchsorted(since, side="right"):]
+                delta = delta[~delta["plant_health_id"].isin(recent_ids)]
+
+            if not delta.empty:
+                delta["recording_taken"] = pd.to_datetime(
+                    delta["recording_taken"], format="ISO8601")
+                late = not frame.empty and \
+                    delta["plant_health_id"].iloc[0] < frame["plant_health_id"].iloc[-1]
+                frame = pd.concat([frame, delta], ignore_index=True) \
+                    if not frame.empty else delta
+                if late:
+                    frame = frame.sort_values("plant_health_id", kind="stable")
+                self._last_id = max(self._last_id, int(delta["plant_health_id"].iloc[-1]))
+
+            self._frame = frame.reset_index(drop=True)
+            return self._frame
+
+
+SUMMARY_QUERIES = {
+    "plant": "SELECT plant_name, avg_temp, avg_moisture FROM VIEW_plant_summary;",
+    "city": "SELECT city, country_name, avg_temp FROM VIEW_city_summary;",
+    "botanist": "SELECT botanist_name, avg_moisture FROM VIEW_botanist_summary;",
+    "temperature_trend": ("SELECT recording_taken, temperature FROM VIEW_temperature_trend "
+                          "ORDER BY recording_taken;"),
+    "plant_state": ("SELECT plant_name, recording_taken, temperature, soil_moisture, "
+                    "last_watered, error_msg, avg_temp, avg_moisture FROM VIEW_plant_state;")
+}
+
+
+def load_summary(connection, summary: str) -> pd.DataFrame:
+    """Loads one of the pre-aggregated summaries maintained by the load step."""
+    return pd.read_sql(SUMMARY_QUERIES[summary], connection)
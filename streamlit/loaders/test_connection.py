@@ -0,0 +1,58 @@
+# pylint: skip-file
+
+"""Tests the dashboard connection pool against a local SQLite database."""
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import pytest
+import sqlalchemy
+from connection import build_mssql_url, create_pooled_engine, set_query_timeout
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_pooled_engine(f"sqlite:///{tmp_path / 'lnhm.db'}",
+                                  pool_size=2, max_overflow=1, pool_timeout=0.1)
+    yield engine
+    engine.dispose()
+
+
+def test_build_mssql_url_escapes_credentials():
+    """Passwords with URL characters survive, and the driver options are kept."""
+    url = build_mssql_url("ODBC Driver 18 for SQL Server", "lnhm.example.com", "1433",
+                          "plants", "beta", "p@ss:word/1")
+    assert url.password == "p@ss:word/1"
+    assert url.port == 1433
+    assert url.query["driver"] == "ODBC Driver 18 for SQL Server"
+
+
+def test_set_query_timeout():
+    """Only connections which support a timeout get one."""
+    pyodbc_like = SimpleNamespace(timeout=0)
+    set_query_timeout(pyodbc_like, 30)
+    assert pyodbc_like.timeout == 30
+    set_query_timeout(object(), 30)
+
+
+def test_pool_is_bounded(engine):
+    """No more than pool_size + max_overflow connections are handed out."""
+    held = [engine.raw_connection() for _ in range(3)]
+    with pytest.raises(sqlalchemy.exc.TimeoutError):
+        engine.raw_connection()
+    for conn in held:
+        conn.close()
+    engine.raw_connection().close()
+
+
+def test_concurrent_reads(engine):
+    """Several threads can query at once, each on its own pooled connection."""
+    def read(_):
+        conn = engine.raw_connection()
+        try:
+            return conn.cursor().execute("SELECT 1").fetchone()[0]
+        finally:
+            conn.close()
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        assert list(executor.map(read, range(9))) == [1] * 9
+    assert engine.pool.checkedout() == 0
@@ -0,0 +1,110 @@
+# pylint: skip-file
+
+"""Tests the shared dashboard data service with stand-in data sources."""
+
+from dataclasses import FrozenInstanceError
+from unittest.mock import MagicMock
+import pandas as pd
+import pytest
+from data_service import DataService
+
+
+@pytest.fixture
+def reading_loader():
+    loader = MagicMock()
+    loader.refresh.return_value = pd.DataFrame({"plant_health_id": [1, 2]})
+    loader.version = (1, 2, 2)
+    return loader
+
+
+def make_service(reading_loader, load_summaries=None, load_historical=None):
+    return DataService(
+        connect=MagicMock(),
+        reading_loader=reading_loader,
+        load_summaries=load_summaries or MagicMock(
+            return_value={"plant": pd.DataFrame({"plant_name": ["Rose"]})}),
+        load_historical=load_historical or MagicMock(
+            return_value=(pd.DataFrame({"plant_id": [1]}), 42)),
+        historical_interval=300.0)
+
+
+def test_refresh_publishes_snapshot(reading_loader):
+    """A refresh publishes the live readings, summaries and historical data together."""
+    service = make_service(reading_loader)
+    snapshot = service.refresh()
+
+    assert service.snapshot(timeout=0) is snapshot
+    assert snapshot.live_version == (1, 2, 2)
+    assert list(snapshot.summaries) == ["plant"]
+    assert snapshot.historical_version == 42
+    with pytest.raises(FrozenInstanceError):
+        snapshot.live = pd.DataFrame()
+    with pytest.raises(TypeError):
+        snapshot.summaries["city"] = pd.DataFrame()
+
+
+def test_unchanged_data_is_not_reloaded(reading_loader):
+    """Summaries are only reloaded for new readings, the archive only on its own interval."""
+    load_summaries = MagicMock(return_value={"plant": pd.DataFrame()})
+    load_historical = MagicMock(return_value=(pd.DataFrame(), 1))
+    service = make_service(reading_loader, load_summaries, load_historical)
+
+    first = service.refresh()
+    second = service.refresh()
+    assert load_summaries.call_count == 1
+    assert load_historical.call_count == 1
+    assert second.summaries is first.summaries
+
+    reading_loader.version = (1, 3, 3)
+    service.refresh()
+    assert load_summaries.call_count == 2
+
+
+def test_failed_refresh_keeps_previous_snapshot(reading_loader):
+    """A failing source leaves the last good snapshot published and is counted."""
+    service = make_service(reading_loader)
+    good = service.refresh()
+
+    reading_loader.refresh.side_effect = ConnectionError("database unavailable")
+    assert service.refresh() is good
+
+    metrics = service.metrics()
+    assert metrics["refresh_count"] == 1
+    assert metrics["refresh_errors"] == 1
+    assert metrics["last_error"] == "database unavailable"
+    assert metrics["snapshot_age_seconds"] >= 0
+
+
+def test_historical_failure_keeps_live_data(reading_loader):
+    """A failing archive load still publishes the live data and keeps the last
+    good archive, and isn't retried on every refresh."""
+    load_historical = MagicMock(side_effect=OSError("S3 unavailable"))
+    service = make_service(reading_loader, load_historical=load_historical)
+
+    snapshot = service.refresh()
+    assert snapshot.live_version == (1, 2, 2)
+    assert snapshot.historical.empty
+    service.refresh()
+    assert load_historical.call_count == 1
+    assert service.metrics()["historical_errors"] == 1
+
+    service._historical_due_at = 0.0
+    load_historical.side_effect = None
+    load_historical.return_value = (pd.DataFrame({"plant_id": [1]}), 7)
+    assert service.refresh().historical_version == 7
+
+    service._historical_due_at = 0.0
+    load_historical.side_effect = OSError("S3 unavailable")
+    kept = service.refresh()
+    assert kept.historical_version == 7
+    assert list(kept.historical["plant_id"]) == [1]
+
+
+def test_background_thread_refreshes(reading_loader):
+    """Starting the service publishes a snapshot without any session asking for it."""
+    service = make_service(reading_loader).start()
+    try:
+        assert service.snapshot(timeout=5).live_version == (1, 2, 2)
+    finally:
+        service.stop()
+    assert service.metrics()["last_refresh_seconds"] is not None
@@ -0,0 +1,101 @@
+# pylint: skip-file
+
+"""Tests the date-range historical loader against a mocked S3 client."""
+
+import io
+from datetime import date
+from unittest.mock import MagicMock
+import pytest
+from botocore.exceptions import ClientError
+import pandas as pd
+from historical_data import HistoricalDataLoader, attach_anomaly_scores, summary_keys
+
+SUMMARIES = {
+    "daily_summaries/plant_readings_2025-06-04.csv":
+        ("plant_id,avg_temperature,date\n1,15.5,2025-06-04\n", '"etag-4"'),
+    "daily_summaries/plant_readings_2025-06-05.csv":
+        ("plant_id,avg_temperature,date\n1,16.5,2025-06-05\n", '"etag-5"'),
+}
+
+
+def fake_get_object(Bucket, Key, IfNoneMatch=None):
+    if Key not in SUMMARIES:
+        raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+    body, etag = SUMMARIES[Key]
+    if IfNoneMatch == etag:
+        raise ClientError({"Error": {"Code": "304"}}, "GetObject")
+    return {"Body": io.BytesIO(body.encode("utf-8")), "ETag": etag}
+
+
+@pytest.fixture
+def s3_client():
+    client = MagicMock()
+    client.get_object.side_effect = fake_get_object
+    return client
+
+
+def test_summary_keys():
+    """One key per day, inclusive of both ends."""
+    assert summary_keys(date(2025, 6, 4), date(2025, 6, 5)) == list(SUMMARIES)
+
+
+def test_load_only_fetches_the_date_range(s3_client, tmp_path):
+    """Only the days in the range are requested and missing days are skipped."""
+    loader = HistoricalDataLoader(s3_client, "lnhm-bucket", str(tmp_path))
+    df, version = loader.load(date(2025, 6, 5), date(2025, 6, 6))
+
+    assert df["avg_temperature"].tolist() == [16.5]
+    assert version != 0
+    requested = sorted(call.kwargs["Key"] for call in s3_client.get_object.call_args_list)
+    assert requested == ["daily_summaries/plant_readings_2025-06-05.csv",
+                         "daily_summaries/plant_readings_2025-06-06.csv"]
+
+
+def test_unchanged_objects_are_revalidated_not_downloaded(s3_client, tmp_path):
+    """A second load sends the cached ETag and reuses the file on disk."""
+    HistoricalDataLoader(s3_client, "lnhm-bucket", str(tmp_path)).load(
+        date(2025, 6, 4), date(2025, 6, 5))
+    s3_client.get_object.reset_mock()
+
+    loader = HistoricalDataLoader(s3_client, "lnhm-bucket", str(tmp_path))
+    df, version = loader.load(date(2025, 6, 4), date(2025, 6, 5))
+
+    assert df["avg_temperature"].tolist() == [15.5, 16.5]
+    assert sorted(call.kwargs["IfNoneMatch"]
+                  for call in s3_client.get_object.call_args_list) == ['"etag-4"', '"etag-5"']
+    assert loader.load(date(2025, 6, 4), date(2025, 6, 5))[1] == version
+
+
+def test_changed_object_is_downloaded_again(s3_client, tmp_path, monkeypatch):
+    """A new ETag replaces the cached file and changes the version."""
+    loader = HistoricalDataLoader(s3_client, "lnhm-bucket", str(tmp_path))
+    _, version = loader.load(date(2025, 6, 5), date(2025, 6, 5))
+
+    monkeypatch.setitem(SUMMARIES, "daily_summaries/plant_readings_2025-06-05.csv",
+                        ("plant_id,avg_temperature,date\n1,20.0,2025-06-05\n", '"etag-6"'))
+    df, new_version = loader.load(date(2025, 6, 5), date(2025, 6, 5))
+
+    assert df["avg_temperature"].tolist() == [20.0]
+    assert new_version != version
+
+
+def test_other_errors_are_raised(s3_client, tmp_path):
+    """Access errors are not mistaken for missing days."""
+    s3_client.get_object.side_effect = ClientError(
+        {"Error": {"Code": "AccessDenied"}}, "GetObject")
+    loader = HistoricalDataLoader(s3_client, "lnhm-bucket", str(tmp_path))
+    with pytest.raises(ClientError):
+        loader.load(date(2025, 6, 5), date(2025, 6, 5))
+
+
+def test_attach_anomaly_scores():
+    """Scores are matched on plant and day, unscored days stay blank."""
+    summaries = pd.DataFrame({"plant_id": [1, 1, 2], "avg_temperature": [15.0, 16.0, 30.0],
+                              "date": ["2025-06-04", "2025-06-05", "2025-06-05"]})
+    scores = pd.DataFrame({"plant_id": [1], "date": ["2025-06-05"], "avg_temperature": [16.0],
+                           "temp_zscore": [2.5], "moisture_zscore": [0.1]})
+
+    df = attach_anomaly_scores(summaries, scores)
+    assert df["temp_zscore"].tolist()[1] == 2.5
+    assert df[["temp_zscore", "moisture_zscore"]].iloc[[0, 2]].isna().all().all()
+    assert attach_anomaly_scores(summaries, pd.DataFrame())["temp_zscore"].isna().all()
@@ -0,0 +1,108 @@
+# pylint: skip-file
+
+"""Tests the incremental live reading loader against a local SQLite database."""
+
+import sqlite3
+import pytest
+from live_data import IncrementalReadingLoader
+
+
+@pytest.fixture
+def connection():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript("""
+    CREATE TABLE DIM_country (country_id INTEGER PRIMARY KEY, country_name TEXT);
+    CREATE TABLE DIM_origin_location (location_id INTEGER PRIMARY KEY, city TEXT,
+                                      country_id INTEGER);
+    CREATE TABLE DIM_botanist (botanist_id INTEGER PRIMARY KEY, botanist_name TEXT);
+    CREATE TABLE DIM_plant (plant_id INTEGER PRIMARY KEY, plant_name TEXT,
+                            botanist_id INTEGER, location_id INTEGER);
+    CREATE TABLE FACT_plant_reading (plant_health_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                     temperature REAL, soil_moisture REAL,
+                                     recording_taken TEXT, plant_id INTEGER);
+    INSERT INTO DIM_country VALUES (1, 'Mexico');
+    INSERT INTO DIM_origin_location VALUES (1, 'Cutler Bay', 1);
+    INSERT INTO DIM_botanist VALUES (1, 'Marty Lang');
+    INSERT INTO DIM_plant VALUES (33, 'Schefflera Arboricola', 1, 1);
+    """)
+    return conn
+
+
+def insert_readings(conn, count, minute=0):
+    conn.executemany(
+        "INSERT INTO FACT_plant_reading (temperature, soil_moisture, recording_taken, plant_id) "
+        "VALUES (?, ?, ?, 33)",
+        [(15.0 + i, 90.0, f"2025-06-05T14:{minute + i:02d}:00") for i in range(count)])
+    conn.commit()
+
+
+def test_refresh_only_fetches_new_rows(connection):
+    """A second refresh appends only readings newer than the last id seen."""
+    loader = IncrementalReadingLoader()
+    insert_readings(connection, 3)
+    assert len(loader.refresh(connection)) == 3
+    assert loader.last_id == 3
+
+    insert_readings(connection, 2, minute=3)
+    df = loader.refresh(connection)
+    assert df["plant_health_id"].tolist() == [1, 2, 3, 4, 5]
+    assert df["plant_name"].unique().tolist() == ["Schefflera Arboricola"]
+    assert str(df["recording_taken"].dtype).startswith("datetime64")
+
+
+def test_refresh_picks_up_late_commits(connection):
+    """A reading whose smaller id commits after a larger one was read is still loaded."""
+    loader = IncrementalReadingLoader()
+    insert_readings(connection, 2)
+    connection.execute("DELETE FROM FACT_plant_reading WHERE plant_health_id = 1")
+    connection.commit()
+    assert loader.refresh(connection)["plant_health_id"].tolist() == [2]
+
+    connection.execute("INSERT INTO FACT_plant_reading VALUES "
+                       "(1, 15.0, 90.0, '2025-06-05T14:00:00', 33)")
+    connection.commit()
+    insert_readings(connection, 1, minute=2)
+    df = loader.refresh(connection)
+    assert df["plant_health_id"].tolist() == [1, 2, 3]
+    assert loader.refresh(connection)["plant_health_id"].tolist() == [1, 2, 3]
+
+
+def test_refresh_without_new_rows_keeps_frame(connection):
+    """Refreshing with nothing new leaves the loaded readings in place."""
+    loader = IncrementalReadingLoader()
+    insert_readings(connection, 2)
+    loader.refresh(connection)
+    assert len(loader.refresh(connection)) == 2
+
+
+def test_refresh_drops_archived_rows(connection):
+    """Readings deleted by the archiver are dropped from the frame."""
+    loader = IncrementalReadingLoader()
+    insert_readings(connection, 3)
+    loader.refresh(connection)
+
+    connection.execute("DELETE FROM FACT_plant_reading")
+    connection.commit()
+    assert loader.refresh(connection).empty
+
+    insert_readings(connection, 1, minute=10)
+    assert loader.refresh(connection)["plant_health_id"].tolist() == [4]
+
+
+def test_version_changes_only_when_readings_change(connection):
+    """The version token is stable across empty refreshes and moves with new or archived rows."""
+    loader = IncrementalReadingLoader()
+    insert_readings(connection, 2)
+    loader.refresh(connection)
+    version = loader.version
+    loader.refresh(connection)
+    assert loader.version == version
+
+    insert_readings(connection, 1, minute=2)
+    loader.refresh(connection)
+    assert loader.version == (1, 3, 3)
+
+    connection.execute("DELETE FROM FACT_plant_reading WHERE plant_health_id = 1")
+    connection.commit()
+    loader.refresh(connection)
+    assert loader.version == (2, 3, 2)
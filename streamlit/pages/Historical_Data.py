@@ -1,8 +1,6 @@
-"""Streamlit page for historical data."""
-# pylint: disable=redefined-outer-name, import-error, no-member
-import sys
-import os
-from dotenv import load_dotenv
+"""Streamlit page for historical data.
+Each section is a fragment, so changing a widget only reruns its own section."""
+# pylint: disable=redefined-outer-name, import-error, no-member, unused-argument
 import pandas as pd
 import streamlit as st
 
@@ -11,53 +9,46 @@ from visualisations.visualisations_archived_data import (get_moisture_boxplot,
                                                          get_temperature_line_chart,
                                                          identify_outliers
                                                          )
+from visualisations.data_table import (PAGE_SIZES, filter_order, get_page,
+                                       page_count, sort_order)
+from loaders.dashboard_data import get_data_service, show_refresh_metrics
 
 
 st.set_page_config(page_title="Historical Data", page_icon="🗂️", layout="wide")
 
 
-@st.cache_data(ttl=10)
-def load_historical_data():
-    """Loads historical data from S3."""
+@st.cache_resource
+def load_plant_names():
+    """Loads the plant id to name lookup once per process."""
+    return pd.read_csv("streamlit/data/plant_ids_names.csv", na_values=["NULL"])
 
-    latest_csv = "historical_data_dummy.csv"
 
-    load_dotenv()
-    s3_path = os.getenv("S3_PATH") + latest_csv
+@st.cache_resource(max_entries=2)
+def get_merged_data(_historical, version):
+    """Merges the plant names into the historical summaries once per archive
+    version. The result is shared between sessions and must not be modified."""
+    return pd.merge(load_plant_names(), _historical, on="plant_id", how="left")
 
-    if not s3_path:
-        st.error("S3_PATH not set in .env file.")
-        return pd.DataFrame()
 
-    try:
-        df = pd.read_csv(s3_path, storage_options={
-            "key": os.getenv("AWS_ACCESS_KEY_ID"),
-            "secret": os.getenv("AWS_SECRET_ACCESS_KEY")
-        })
-        # st.write("✅ Successfully connected to S3 and loaded data.")
-        return df
-    except Exception as e:
-        st.error(f"Error loading data from S3: {e}")
-        return pd.DataFrame()
+@st.cache_resource(max_entries=16)
+def get_sort_order(_df, version, sort_column, ascending):
+    """Row order for one sort key, computed once per archive version."""
+    return sort_order(_df, sort_column, ascending)
 
 
-if __name__ == "__main__":
-    local_df = pd.read_csv(
-        "streamlit/data/plant_ids_names.csv", na_values=["NULL"])
-
-    s3_df = load_historical_data()
-
-    print(local_df[['plant_id', 'plant_name']])
-
-    print("local_df columns:", local_df.columns.tolist())
-    print("s3_df columns:", s3_df.columns.tolist())
-
-    df = pd.merge(local_df, s3_df, on="plant_id", how="left")
-
-    print(df)
+@st.cache_resource(max_entries=16)
+def get_row_order(_df, version, sort_column, ascending, plant_names):
+    """Sorted and filtered row order, computed once per version, sort key
+    and filter, so turning pages only slices it."""
+    order = get_sort_order(_df, version, sort_column, ascending)
+    if not plant_names:
+        return order
+    return filter_order(_df, order, "plant_name", list(plant_names))
 
-    st.title("📈 Historical Data Analysis")
 
+@st.fragment
+def show_outliers(df):
+    """Outlier table, rerun on its own when a threshold slider moves."""
     st.subheader("🚨 Plants Needing Attention")
 
     temp_thresh = st.slider(
@@ -67,7 +58,8 @@ if __name__ == "__main__":
     outlier_df = identify_outliers(df, temp_thresh, moisture_thresh)
 
     st.markdown(
-        "These are plants whose average temperature or moisture are statistical outliers.")
+        "These are days on which a plant's average temperature or moisture was an "
+        "outlier compared with that plant's own recent history.")
     st.dataframe(outlier_df.style.format({
         "avg_temperature": "{:.2f}",
         "avg_soil_moisture": "{:.2f}",
@@ -75,28 +67,36 @@ if __name__ == "__main__":
         "moisture_zscore": "{:.2f}",
     }))
 
+
+@st.fragment
+def show_temperature_chart(df, version):
+    """Daily temperature line chart for the selected plants."""
     st.subheader("🌡️ Daily Average Temperature by Plant (Line Chart)")
     plant_names = df["plant_name"].unique()
-    select_all = st.checkbox("Select All Plants", value=True)
 
     selected = st.multiselect(
         "Select specific plant(s)", plant_names, default=plant_names)
 
-    filtered_df = df[df["plant_name"].isin(selected)]
-
     if selected:
-        line_chart = get_temperature_line_chart(df, selected)
+        line_chart = get_temperature_line_chart(df, version, selected)
         st.altair_chart(line_chart, use_container_width=True)
     else:
         st.warning("No plants selected.")
 
+
+@st.fragment
+def show_moisture_chart(df, version):
+    """Daily moisture line graph for one plant."""
     st.subheader("💦 Daily Average Moisture by Plant (Line Graph)")
-    plant_names = df["plant_name"].unique()
-    selected_plant = st.selectbox("Select Plant Name", plant_names)
+    selected_plant = st.selectbox("Select Plant Name", df["plant_name"].unique())
     moisture_line_graph = get_moisture_levels_line_graph_archived(
-        df, selected_plant)
+        df, selected_plant, version)
     st.altair_chart(moisture_line_graph, use_container_width=True)
 
+
+@st.fragment
+def show_moisture_boxplot(df, version):
+    """Moisture distribution box plot for the selected plants."""
     st.subheader("Daily Moisture Distribution by Plant")
     plant_names = df["plant_name"].unique()
     select_all = st.checkbox("Select all plants", value=True)
@@ -107,13 +107,53 @@ if __name__ == "__main__":
         selected_plants = st.multiselect(
             "Select Plant(s)", plant_names, default=[])
 
-    filtered_df = df[df["plant_name"].isin(selected_plants)]
     # Only show the plot if there's data selected
-    if not filtered_df.empty:
-        moisture_boxplot = get_moisture_boxplot(filtered_df)
+    if len(selected_plants):
+        moisture_boxplot = get_moisture_boxplot(
+            df, version, list(selected_plants))
         st.altair_chart(moisture_boxplot, use_container_width=True)
     else:
         st.warning("No plants selected.")
 
+
+@st.fragment
+def show_data_overview(df, version):
+    """Sortable, filterable table which only sends the current page of rows."""
     st.subheader("🗓️ Data Overview")
-    st.dataframe(df)
+    sort_col, direction_col, filter_col, size_col = st.columns([2, 1, 3, 1])
+    sort_column = sort_col.selectbox("Sort by", [None, *df.columns],
+                                     format_func=lambda column: column or "—")
+    ascending = direction_col.radio("Order", ["Ascending", "Descending"]) == "Ascending"
+    plant_names = filter_col.multiselect("Filter plants", sorted(
+        df["plant_name"].dropna().unique()))
+    page_size = size_col.selectbox("Rows per page", PAGE_SIZES)
+
+    order = get_row_order(df, version, sort_column, ascending, tuple(plant_names))
+    pages = page_count(len(order), page_size)
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1)
+
+    st.dataframe(get_page(df, order, page, page_size), use_container_width=True)
+    first_row = min((page - 1) * page_size + 1, len(order))
+    st.caption(f"Rows {first_row}–{min(page * page_size, len(order))} "
+               f"of {len(order)} (page {page} of {pages})")
+
+
+if __name__ == "__main__":
+    service = get_data_service()
+    snapshot = service.snapshot()
+    show_refresh_metrics(service)
+    if snapshot.historical.empty:
+        st.warning("No archived daily summaries found for the selected period.")
+        st.stop()
+
+    version = snapshot.historical_version
+    df = get_merged_data(snapshot.historical, version)
+
+    st.title("📈 Historical Data Analysis")
+
+    show_outliers(df)
+    show_temperature_chart(df, version)
+    show_moisture_chart(df, version)
+    show_moisture_boxplot(df, version)
+
+    show_data_overview(df, version)
@@ -0,0 +1,39 @@
+"""Server-side sorting, filtering and slicing for paginated tables, so the
+browser is only ever sent one page of rows."""
+
+import numpy as np
+import pandas as pd
+
+PAGE_SIZES = (25, 50, 100)
+
+
+def sort_order(df: pd.DataFrame, column: str | None = None,
+               ascending: bool = True) -> np.ndarray:
+    """Returns the row positions of df sorted by column, keeping missing
+    values last. Without a column the rows keep their original order."""
+    if column is None:
+        return np.arange(len(df))
+    values = pd.Series(df[column].to_numpy())
+    return values.sort_values(ascending=ascending, kind="stable",
+                              na_position="last").index.to_numpy()
+
+
+def filter_order(df: pd.DataFrame, order: np.ndarray, column: str | None = None,
+                 values=None) -> np.ndarray:
+    """Returns the positions in order whose column value is one of values."""
+    if column is None or values is None:
+        return order
+    mask = df[column].isin(values).to_numpy()
+    return order[mask[order]]
+
+
+def page_count(n_rows: int, page_size: int) -> int:
+    """Returns the number of pages needed for n_rows, at least one."""
+    return max(1, -(-n_rows // page_size))
+
+
+def get_page(df: pd.DataFrame, order: np.ndarray, page: int,
+             page_size: int) -> pd.DataFrame:
+    """Returns the rows on a 1-indexed page, in the given order."""
+    start = (page - 1) * page_size
+    return df.iloc[order[start:start + page_size]]
@@ -0,0 +1,75 @@
+"""Downsampling of time series before they are embedded in Altair charts,
+so the browser only receives about one point per pixel of chart width."""
+
+import numpy as np
+import pandas as pd
+
+# The charts are drawn with use_container_width, so their width in pixels
+# isn't known when the points are chosen. Sampling for a full HD wide layout
+# keeps one point per pixel on any common screen.
+MAX_CHART_WIDTH = 1920
+
+
+def min_max_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Returns the indices of the minimum and maximum point of each of
+    n_out // 2 equal sized buckets, plus the first and last point.
+    Spikes always survive, so threshold breaches stay visible."""
+    n_points = len(y)
+    if n_out >= n_points or n_out < 4:
+        return np.arange(n_points)
+
+    n_buckets = (n_out - 2) // 2
+    edges = np.linspace(1, n_points - 1, n_buckets + 1).astype(int)
+    indices = [0]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        bucket = y[start:end]
+        indices.extend((start + int(np.argmin(bucket)),
+                        start + int(np.argmax(bucket))))
+    indices.append(n_points - 1)
+    return np.unique(indices)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Returns the indices of the points kept by Largest-Triangle-Three-Buckets,
+    which picks the point in each bucket that best preserves the line's shape."""
+    n_points = len(y)
+    if n_out >= n_points or n_out < 3:
+        return np.arange(n_points)
+
+    edges = np.linspace(1, n_points - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n_points - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n_points
+        next_x = x[next_start:max(next_end, next_start + 1)].mean()
+        next_y = y[next_start:max(next_end, next_start + 1)].mean()
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        indices[i + 1] = previous
+    return indices
+
+
+def downsample(df: pd.DataFrame, x_col: str, y_col: str, width: int = MAX_CHART_WIDTH,
+               method: str = "minmax") -> pd.DataFrame:
+    """Returns the rows of df needed to draw y_col against x_col at one
+    point per pixel of the given chart width, using min/max bucket
+    decimation or LTTB."""
+    max_points = int(width)
+    series = df.dropna(subset=[x_col, y_col]).sort_values(x_col)
+    if len(series) <= max_points:
+        return series
+
+    y = series[y_col].to_numpy(dtype=float)
+    if method == "lttb":
+        x = pd.to_numeric(series[x_col]).to_numpy(dtype=float)
+        indices = lttb_indices(x, y, max_points)
+    elif method == "minmax":
+        indices = min_max_indices(y, max_points)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    return series.iloc[indices]
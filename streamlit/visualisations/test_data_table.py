@@ -0,0 +1,38 @@
+# pylint: skip-file
+
+"""Tests the server-side pagination helpers."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from data_table import filter_order, get_page, page_count, sort_order
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({"plant_name": ["Rose", "Fern", "Cactus", "Fern", "Rose"],
+                         "avg_temperature": [15.0, np.nan, 30.0, 12.0, 18.0]},
+                        index=[10, 11, 12, 13, 14])
+
+
+def test_sort_order_keeps_missing_values_last(df):
+    """Sorting works on positions, with missing values last in either direction."""
+    assert sort_order(df, "avg_temperature").tolist() == [3, 0, 4, 2, 1]
+    assert sort_order(df, "avg_temperature", ascending=False).tolist() == [2, 4, 0, 3, 1]
+    assert sort_order(df).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_filter_order_keeps_sort(df):
+    """Filtering keeps the rows in their sorted order."""
+    order = sort_order(df, "avg_temperature")
+    assert filter_order(df, order, "plant_name", ["Rose", "Fern"]).tolist() == [3, 0, 4, 1]
+    assert filter_order(df, order).tolist() == order.tolist()
+
+
+def test_get_page_only_returns_one_page(df):
+    """Pages are sliced from the ordered positions, the last page may be short."""
+    order = sort_order(df, "avg_temperature")
+    assert page_count(len(order), 2) == 3
+    assert page_count(0, 25) == 1
+    assert get_page(df, order, 1, 2)["avg_temperature"].tolist() == [12.0, 15.0]
+    assert get_page(df, order, 3, 2).index.tolist() == [11]
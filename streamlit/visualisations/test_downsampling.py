@@ -0,0 +1,69 @@
+# pylint: skip-file
+
+"""Tests the chart downsampling functions."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from downsampling import MAX_CHART_WIDTH, downsample, lttb_indices, min_max_indices
+
+
+@pytest.fixture
+def readings():
+    """A day of minute readings with one short temperature spike."""
+    times = pd.date_range("2025-06-05", periods=1440, freq="min", tz="UTC")
+    temperature = 15 + np.sin(np.linspace(0, 6, 1440))
+    temperature[777] = 35.0
+    return pd.DataFrame({"recording_taken": times, "temperature": temperature})
+
+
+def test_downsample_caps_points_to_width(readings):
+    assert len(downsample(readings, "recording_taken", "temperature", width=200)) <= 200
+    assert len(downsample(readings, "recording_taken", "temperature",
+                          width=200, method="lttb")) == 200
+
+
+def test_downsample_defaults_to_wide_charts():
+    """Charts stretched to the container keep a point per pixel of a wide layout."""
+    times = pd.date_range("2025-06-01", periods=10_000, freq="min", tz="UTC")
+    week = pd.DataFrame({"recording_taken": times, "temperature": np.arange(10_000.0)})
+    assert 1000 < len(downsample(week, "recording_taken", "temperature")) <= MAX_CHART_WIDTH
+
+
+@pytest.mark.parametrize("method", ["minmax", "lttb"])
+def test_downsample_keeps_spike_and_endpoints(readings, method):
+    result = downsample(readings, "recording_taken", "temperature",
+                        width=100, method=method)
+    assert result["temperature"].max() == 35.0
+    assert result["recording_taken"].iloc[0] == readings["recording_taken"].iloc[0]
+    assert result["recording_taken"].iloc[-1] == readings["recording_taken"].iloc[-1]
+    assert result["recording_taken"].is_monotonic_increasing
+
+
+def test_downsample_small_series_unchanged(readings):
+    small = readings.head(50)
+    assert downsample(small, "recording_taken", "temperature").equals(small)
+
+
+def test_downsample_drops_missing_values(readings):
+    readings.loc[10, "temperature"] = np.nan
+    assert downsample(readings, "recording_taken", "temperature",
+                      width=2000)["temperature"].notna().all()
+
+
+def test_downsample_unknown_method(readings):
+    with pytest.raises(ValueError):
+        downsample(readings, "recording_taken", "temperature", width=10, method="mean")
+
+
+def test_min_max_indices_sorted_and_unique():
+    indices = min_max_indices(np.random.default_rng(0).random(1000), 50)
+    assert len(indices) <= 50
+    assert (np.diff(indices) > 0).all()
+
+
+def test_lttb_indices_strictly_increasing():
+    x = np.arange(1000, dtype=float)
+    indices = lttb_indices(x, np.random.default_rng(1).random(1000), 64)
+    assert len(indices) == 64
+    assert (np.diff(indices) > 0).all()
@@ -5,34 +5,59 @@ import altair as alt
 import pandas as pd
 import streamlit as st
 
-# pylint: disable=no-member, line-too-long
+from visualisations.downsampling import downsample
 
+# pylint: disable=no-member, line-too-long, unused-argument
 
-def show_plant_info(df, plant_name):
-    """Shows the plant information."""
-    plant_df = df[df["plant_name"] == plant_name]
+# Chart builders are cached on their parameters plus a dataset version token
+# (e.g. the newest plant_health_id loaded). Frame arguments start with an
+# underscore so Streamlit doesn't hash them on every rerun.
+CHART_CACHE_ENTRIES = 64
 
-    if plant_df.empty:
+
+def format_since(timestamp, now) -> str:
+    """Returns how long ago a timestamp was, e.g. "3h 5m"."""
+    minutes = int((now - timestamp).total_seconds() // 60)
+    return f"{minutes // 60}h {minutes % 60}m" if minutes >= 60 else f"{minutes}m"
+
+
+def format_reading(value, unit: str) -> str:
+    """Returns a reading to two decimal places, or "unknown" if missing."""
+    return f"{value:.2f}{unit}" if pd.notna(value) else "unknown"
+
+
+def show_plant_info(plant_state, plant_name):
+    """Shows the plant information from its row of the current plant state."""
+    plant_row = plant_state[plant_state["plant_name"] == plant_name]
+
+    if plant_row.empty:
         st.warning("No data available for this plant...")
         return
 
-    avg_temp = plant_df["temperature"].mean()
-    avg_moisture = plant_df["soil_moisture"].mean()
-    last_updated = plant_df["recording_taken"].max()
+    plant = plant_row.iloc[0]
+    last_updated = pd.to_datetime(plant["recording_taken"])
+    last_watered = pd.to_datetime(plant["last_watered"])
+    now = pd.Timestamp.now(tz="UTC").tz_localize(None)
 
     st.markdown(f"""
     ### 🌱 Plant Information
     - **Plant Name:** `{plant_name}`
-    - **Average Temperature:** `{avg_temp:.2f} °C`
-    - **Average Soil Moisture:** `{avg_moisture:.2f}%`
-    - **Last Updated:** `{last_updated.strftime('%Y-%m-%d %H:%M:%S')}`
+    - **Latest Temperature:** `{format_reading(plant['temperature'], ' °C')}`
+    - **Average Temperature:** `{format_reading(plant['avg_temp'], ' °C')}`
+    - **Latest Soil Moisture:** `{format_reading(plant['soil_moisture'], '%')}`
+    - **Average Soil Moisture:** `{format_reading(plant['avg_moisture'], '%')}`
+    - **Last Watered:** `{format_since(last_watered, now) + ' ago' if pd.notna(last_watered) else 'unknown'}`
+    - **Status:** `{plant['error_msg'] if pd.notna(plant['error_msg']) else 'healthy'}`
+    - **Last Updated:** `{last_updated.strftime('%Y-%m-%d %H:%M:%S') if pd.notna(last_updated) else 'unknown'}`
     """)
 
 
-@st.cache_data(ttl=3)
-def get_temperature_line_graph(df, plant_name):
-    """Line graph that shows the temperature of a specific plant."""
-    plant_df = df[df["plant_name"] == plant_name]
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES)
+def get_temperature_line_graph(_df, plant_name, version):
+    """Line graph that shows the temperature of a specific plant,
+    downsampled to the chart width."""
+    plant_df = downsample(_df[_df["plant_name"] == plant_name],
+                          "recording_taken", "temperature")
     chart = alt.Chart(plant_df).mark_line().encode(
         x=alt.X("recording_taken:T", title="Recording Taken"),
         y=alt.Y("temperature:Q", title="Temperature (°C)"),
@@ -42,14 +67,12 @@ def get_temperature_line_graph(df, plant_name):
     return chart
 
 
-@st.cache_data(ttl=3)
-def get_average_temperature_per_plant_bar_chart(df, top_n=5):
-    """Bar chart that shows the top N plants by average temp."""
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES)
+def get_average_temperature_per_plant_bar_chart(_plant_summary, version, top_n=5):
+    """Bar chart that shows the top N plants by average temp,
+    from the pre-aggregated plant summary."""
     avg_temperatures = (
-        df.groupby("plant_name")["temperature"]
-        .mean()
-        .reset_index()
-        .rename(columns={'temperature': 'avg_temp'})
+        _plant_summary[["plant_name", "avg_temp"]]
         .sort_values(by="avg_temp", ascending=False)
         .head(top_n)
     )
@@ -64,10 +87,12 @@ def get_average_temperature_per_plant_bar_chart(df, top_n=5):
     return chart
 
 
-@st.cache_data(ttl=3)
-def get_moisture_levels_line_graph(df, plant_name):
-    """Line graph that shows the moisture level of a specific plant."""
-    plant_df = df[df["plant_name"] == plant_name]
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES)
+def get_moisture_levels_line_graph(_df, plant_name, version):
+    """Line graph that shows the moisture level of a specific plant,
+    downsampled to the chart width."""
+    plant_df = downsample(_df[_df["plant_name"] == plant_name],
+                          "recording_taken", "soil_moisture")
     chart = alt.Chart(plant_df).mark_line().encode(
         x=alt.X("recording_taken:T", title="Recording Taken"),
         y=alt.Y("soil_moisture:Q", title="Soil Moisture (%)"),
@@ -77,14 +102,12 @@ def get_moisture_levels_line_graph(df, plant_name):
     return chart
 
 
-@st.cache_data(ttl=3)
-def get_average_moisture_level_per_plant_bar_chart(df, top_n=5):
-    """Bar chart that shows the top N plants by average moisture."""
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES)
+def get_average_moisture_level_per_plant_bar_chart(_plant_summary, version, top_n=5):
+    """Bar chart that shows the top N plants by average moisture,
+    from the pre-aggregated plant summary."""
     avg_moistures = (
-        df.groupby("plant_name")["soil_moisture"]
-        .mean()
-        .reset_index()
-        .rename(columns={'soil_moisture': 'avg_moisture'})
+        _plant_summary[["plant_name", "avg_moisture"]]
         .sort_values(by="avg_moisture", ascending=False)
         .head(top_n)
     )
@@ -99,13 +122,12 @@ def get_average_moisture_level_per_plant_bar_chart(df, top_n=5):
     return chart
 
 
-def get_average_temperature_per_city_bar_chart(df, top_n=5):
-    """Bar chart showing average temperature by city, colored by country."""
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES)
+def get_average_temperature_per_city_bar_chart(_city_summary, version, top_n=5):
+    """Bar chart showing average temperature by city, colored by country,
+    from the pre-aggregated city summary."""
     avg_temp_city = (
-        df.groupby(["city", "country_name"])["temperature"]
-        .mean()
-        .reset_index()
-        .rename(columns={"temperature": "avg_temp"})
+        _city_summary
         .sort_values(by="avg_temp", ascending=False)
         .head(top_n)
     )
@@ -121,14 +143,12 @@ def get_average_temperature_per_city_bar_chart(df, top_n=5):
     return chart
 
 
-@st.cache_data(ttl=3)
-def get_moisture_level_per_botanist_bar_chart(df, top_n=10):
-    """Bar chart showing average soil moisture per botanist."""
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES)
+def get_moisture_level_per_botanist_bar_chart(_botanist_summary, version, top_n=10):
+    """Bar chart showing average soil moisture per botanist,
+    from the pre-aggregated botanist summary."""
     avg_moisture_botanist = (
-        df.groupby("botanist_name")["soil_moisture"]
-        .mean()
-        .reset_index()
-        .rename(columns={"soil_moisture": "avg_moisture"})
+        _botanist_summary
         .sort_values(by="avg_moisture", ascending=False)
         .head(top_n)
     )
@@ -143,12 +163,11 @@ def get_moisture_level_per_botanist_bar_chart(df, top_n=10):
     return chart
 
 
-def get_avg_temp_area_chart(df):
-    """Area chart showing average temperature trend over time."""
-    df_time = df.copy()
-    df_time["recording_taken"] = pd.to_datetime(df_time["recording_taken"])
-    trend = df_time.groupby("recording_taken")[
-        "temperature"].mean().reset_index()
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES)
+def get_avg_temp_area_chart(_temperature_trend, version):
+    """Area chart showing average temperature trend over time,
+    from the per-minute temperature summary, downsampled to the chart width."""
+    trend = downsample(_temperature_trend, "recording_taken", "temperature")
 
     chart = alt.Chart(trend).mark_area(opacity=0.5).encode(
         x=alt.X("recording_taken:T", title="Time"),
@@ -4,15 +4,19 @@ import altair as alt
 import pandas as pd
 import streamlit as st
 
+# pylint: disable=unused-argument
 
-@st.cache_data(ttl=3)
-def get_temperature_line_chart(df, selected_plants=None):
-    """Line chart of daily average temperature per plant."""
+# Chart builders are cached on their parameters plus the archive version
+# token, with unhashed (underscore) frame arguments.
+CHART_CACHE_ENTRIES = 64
 
-    df["date"] = pd.to_datetime(df["date"]).dt.date
 
-    if selected_plants:
-        df = df[df["plant_name"].isin(selected_plants)]
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES)
+def get_temperature_line_chart(_df, version, selected_plants=None):
+    """Line chart of daily average temperature per plant.
+    The shared frame is never modified, the dates are parsed on a copy."""
+    df = _df[_df["plant_name"].isin(selected_plants)] if selected_plants else _df
+    df = df.assign(date=pd.to_datetime(df["date"]).dt.date)
 
     grouped = (
         df.groupby(["plant_name", "date"])["avg_temperature"]
@@ -35,12 +39,17 @@ def get_temperature_line_chart(df, selected_plants=None):
 
 
 def identify_outliers(df, temp_threshold=2.0, moisture_threshold=2.0):
-    """Finds all the outliers depending on the z-score."""
-    df_copy = df.copy()
-    df_copy["temp_zscore"] = (df_copy["avg_temperature"] -
-                              df_copy["avg_temperature"].mean()) / df_copy["avg_temperature"].std()
-    df_copy["moisture_zscore"] = (df_copy["avg_soil_moisture"] -
-                                  df_copy["avg_soil_moisture"].mean()) / df_copy["avg_soil_moisture"].std()
+    """Finds the plant-days whose z-score is past the thresholds. Uses the
+    per-plant EWMA scores precomputed by the archiver when the frame has them,
+    otherwise z-scores against the whole fleet."""
+    if {"temp_zscore", "moisture_zscore"}.issubset(df.columns):
+        df_copy = df
+    else:
+        df_copy = df.copy()
+        df_copy["temp_zscore"] = (df_copy["avg_temperature"] -
+                                  df_copy["avg_temperature"].mean()) / df_copy["avg_temperature"].std()
+        df_copy["moisture_zscore"] = (df_copy["avg_soil_moisture"] -
+                                      df_copy["avg_soil_moisture"].mean()) / df_copy["avg_soil_moisture"].std()
 
     outliers = df_copy[(df_copy["temp_zscore"].abs() > temp_threshold) |
                        (df_copy["moisture_zscore"].abs() > moisture_threshold)]
@@ -48,10 +57,10 @@ def identify_outliers(df, temp_threshold=2.0, moisture_threshold=2.0):
                      "temp_zscore", "moisture_zscore"]]
 
 
-@st.cache_data(ttl=3)
-def get_moisture_levels_line_graph_archived(df, plant_name):
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES)
+def get_moisture_levels_line_graph_archived(_df, plant_name, version):
     """Line graph that shows the moisture level of a specific plant."""
-    plant_df = df[df["plant_name"] == plant_name]
+    plant_df = _df[_df["plant_name"] == plant_name]
     chart = alt.Chart(plant_df).mark_line().encode(
         x=alt.X("date:T", title="Date"),
         y=alt.Y("avg_soil_moisture:Q", title="Average Soil Moisture ( % )"),
@@ -61,10 +70,11 @@ def get_moisture_levels_line_graph_archived(df, plant_name):
     return chart
 
 
-@st.cache_data(ttl=3)
-def get_moisture_boxplot(df):
-    """Creates a box plot of average soil moisture per plant."""
-    moisture_boxplot = alt.Chart(df).mark_boxplot(extent='min-max').encode(
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES)
+def get_moisture_boxplot(_df, version, selected_plants):
+    """Creates a box plot of average soil moisture per selected plant."""
+    plant_df = _df[_df["plant_name"].isin(selected_plants)]
+    moisture_boxplot = alt.Chart(plant_df).mark_boxplot(extent='min-max').encode(
         x=alt.X("plant_name:N", title="Plant Name"),
         y=alt.Y("avg_soil_moisture:Q", title="Avg Soil Moisture (%)"),
         tooltip=["plant_name:N", "avg_soil_moisture:Q"]
@@ -0,0 +1,89 @@
+# pylint: skip-file
+
+"""Tests the per-stage instrumentation and its EMF records."""
+
+import io
+import json
+from contextlib import redirect_stdout
+import pytest
+import sqlalchemy
+from instrumentation import (count, count_aws_response, emf_record, span, start_run,
+                             track_db_round_trips)
+
+
+def test_spans_and_summary_are_emitted():
+    """Each span emits its own record and the run ends with a summary."""
+    records = []
+    with start_run("pipeline", sink=records.append):
+        with span("extract") as extract_span:
+            count("requests", 3)
+            count_aws_response({"ResponseMetadata": {"RetryAttempts": 2}})
+            extract_span.rows_out = 40
+        with span("load", rows_in=40):
+            count("db_round_trips")
+
+    assert [record["Stage"] for record in records] == ["extract", "load", "run"]
+    extract, load, summary = records
+    assert extract["Requests"] == 4
+    assert extract["Retries"] == 2
+    assert extract["RowsOut"] == 40
+    assert "RowsIn" not in extract
+    assert load["DbRoundTrips"] == 1
+    assert summary["Requests"] == 4
+    assert set(summary["Spans"]) == {"extract", "load"}
+    assert summary["FailedSpans"] == []
+
+
+def test_emf_record_format():
+    """Records follow the CloudWatch embedded metric format."""
+    record = emf_record("alerter", "alert", {"WallTime": 12.5, "RowsIn": None}, timestamp=1.0)
+    directive = record["_aws"]["CloudWatchMetrics"][0]
+    assert record["_aws"]["Timestamp"] == 1000
+    assert directive["Namespace"] == "LNHM"
+    assert directive["Dimensions"] == [["Service", "Stage"]]
+    assert directive["Metrics"] == [{"Name": "WallTime", "Unit": "Milliseconds"}]
+    assert record["WallTime"] == 12.5
+
+
+def test_failed_span_is_recorded():
+    """A span that raises is still emitted with the error, and the error propagates."""
+    records = []
+    with pytest.raises(ValueError):
+        with start_run("archiver", sink=records.append):
+            with span("archive"):
+                raise ValueError("S3 unavailable")
+
+    assert records[0]["Error"] == "ValueError"
+    assert records[-1]["FailedSpans"] == ["archive"]
+
+
+def test_default_sink_writes_json_lines():
+    """By default records are JSON lines on stdout, where Lambda picks them up."""
+    output = io.StringIO()
+    with redirect_stdout(output):
+        with start_run("alerter"):
+            with span("alert"):
+                pass
+    lines = output.getvalue().splitlines()
+    assert [json.loads(line)["Stage"] for line in lines] == ["alert", "run"]
+
+
+def test_counting_outside_a_run_is_ignored():
+    """Instrumented code still works when no run is active."""
+    count("requests")
+    with span("extract") as extract_span:
+        count("requests")
+    assert extract_span.counters["requests"] == 1
+
+
+def test_track_db_round_trips():
+    """Every statement sent through an instrumented engine is counted once,
+    however many runs instrument the same engine."""
+    engine = sqlalchemy.create_engine("sqlite://")
+    track_db_round_trips(engine)
+    track_db_round_trips(engine)
+    with span("load") as load_span:
+        with engine.connect() as conn:
+            conn.execute(sqlalchemy.text("SELECT 1"))
+            conn.execute(sqlalchemy.text("SELECT 2"))
+    assert load_span.counters["db_round_trips"] == 2
@@ -0,0 +1,62 @@
+# pylint: skip-file
+
+"""Tests the opt-in profiling mode for the lambda handlers."""
+
+import json
+import os
+import time
+from unittest.mock import patch
+from instrumentation import span, start_run
+from profiling import profile_handler
+
+
+def busy_handler(event, context):
+    with start_run("pipeline", sink=lambda record: None):
+        with span("extract"):
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+        with span("transform"):
+            readings = [bytearray(1024) for _ in range(1000)]
+    return {"statusCode": 200, "rows": len(readings)}
+
+
+def test_profiling_off_calls_handler_directly(tmp_path, monkeypatch):
+    """Without the flag the handler runs as normal and nothing is written."""
+    monkeypatch.delenv("LNHM_PROFILE", raising=False)
+    monkeypatch.setenv("LNHM_PROFILE_DIR", str(tmp_path))
+    handler = profile_handler("pipeline")(busy_handler)
+
+    with patch("profiling.run_profiled") as fake_run_profiled:
+        assert handler({}, None)["statusCode"] == 200
+    fake_run_profiled.assert_not_called()
+    assert handler.__name__ == "busy_handler"
+    assert os.listdir(tmp_path) == []
+
+
+def test_profiling_on_writes_artifacts_per_stage(tmp_path, monkeypatch, capsys):
+    """With the flag set, CPU samples and memory figures are written per stage."""
+    monkeypatch.setenv("LNHM_PROFILE", "true")
+    monkeypatch.setenv("LNHM_PROFILE_DIR", str(tmp_path))
+    monkeypatch.delenv("LNHM_PROFILE_BUCKET", raising=False)
+
+    assert profile_handler("pipeline")(busy_handler)({}, None)["rows"] == 1000
+
+    (run_dir,) = [os.path.join(root, "") for root, dirs, files in os.walk(tmp_path)
+                  if "memory.json" in files]
+    with open(run_dir + "memory.json") as memory_file:
+        memory = json.load(memory_file)
+    assert [stage["stage"] for stage in memory["stages"]] == ["extract", "transform"]
+    transform = memory["stages"][1]
+    assert transform["peak_mb"] >= 1
+    assert transform["top_allocations"][0]["size_diff_kb"] > 500
+
+    with open(run_dir + "cpu_folded.txt") as folded_file:
+        folded = folded_file.read()
+    assert any(line.startswith("extract;") and "busy_handler" in line
+               for line in folded.splitlines())
+
+    record = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert record["Stage"] == "profile"
+    assert record["ProfileArtifacts"]["dir"] == run_dir.rstrip(os.sep)
+    assert record["CpuSamples"] > 0
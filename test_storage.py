@@ -0,0 +1,162 @@
+# pylint: skip-file
+
+"""Tests the local storage backends."""
+
+import datetime
+import pandas as pd
+import pytest
+import sqlalchemy
+from botocore.exceptions import ClientError
+from storage import (HistoricalStore, LocalObjectStore, SQLiteStore, SQLServerStore,
+                     archive_pattern, get_store, portable_statements)
+
+
+@pytest.fixture
+def store():
+    return SQLiteStore.from_path(":memory:")
+
+
+def test_portable_statements_skip_sql_server_ddl():
+    """Only the seed data and views are taken from schema.sql."""
+    statements = portable_statements(
+        "CREATE TABLE t (id SMALLINT IDENTITY(1,1),\n);\n"
+        "INSERT INTO t VALUES\n(1),\n(2);\n\nGO\n\nCREATE VIEW v AS\nSELECT id FROM t;\n\nGO\n")
+    assert statements == ["INSERT INTO t VALUES\n(1),\n(2)", "CREATE VIEW v AS\nSELECT id FROM t"]
+
+
+def test_sqlite_schema_is_seeded_once(tmp_path):
+    """The dimension tables are seeded from schema.sql and reopening doesn't duplicate them."""
+    path = str(tmp_path / "lnhm.db")
+    SQLiteStore.from_path(path)
+    store = SQLiteStore.from_path(path)
+    with store.engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM DIM_plant").scalar() == 60
+        assert conn.exec_driver_sql(
+            "SELECT scientific_name FROM DIM_plant WHERE plant_id = 8").scalar() == \
+            "Heliconia schiedeana 'Fire and Ice'"
+
+
+def test_summaries_accumulate_and_feed_the_views(store):
+    """Upserts add to existing summary rows, as the SQL Server MERGE does."""
+    rows = [{"plant_id": 1, "reading_count": 2, "temperature_count": 2, "temperature_sum": 30.0,
+             "soil_moisture_count": 2, "soil_moisture_sum": 100.0}]
+    bucket = [{"bucket_start": datetime.datetime(2025, 6, 5, 14, 30), "reading_count": 2,
+               "temperature_count": 2, "temperature_sum": 30.0, "soil_moisture_count": 2,
+               "soil_moisture_sum": 100.0}]
+    for _ in range(2):
+        with store.engine.begin() as conn:
+            store.update_summaries(conn, rows, bucket)
+
+    summary = pd.read_sql("SELECT * FROM VIEW_plant_summary", store.engine)
+    assert summary.to_dict("records") == [{"plant_name": "Venus flytrap", "avg_temp": 15.0,
+                                           "avg_moisture": 50.0, "reading_count": 4}]
+    trend = pd.read_sql("SELECT * FROM VIEW_temperature_trend", store.engine)
+    assert trend["temperature"].tolist() == [15.0]
+
+
+def test_current_state_keeps_the_latest_reading(store):
+    """Older readings don't replace newer ones, totals accumulate and the error state follows the batch."""
+    def state(recording_taken, temperature, error_msg):
+        return {"plant_id": 1, "recording_taken": recording_taken, "temperature": temperature,
+                "soil_moisture": 50.0, "last_watered": datetime.datetime(2025, 6, 5, 9, 0),
+                "error_msg": error_msg, "reading_count": 1, "temperature_count": 1,
+                "temperature_sum": temperature, "soil_moisture_count": 1,
+                "soil_moisture_sum": 50.0}
+    batches = [[state(datetime.datetime(2025, 6, 5, 14, 31), 20.0, None),
+                state(datetime.datetime(2025, 6, 5, 14, 31), 20.0, None) | {"plant_id": 2}],
+               [state(datetime.datetime(2025, 6, 5, 14, 30), 10.0, "low temperature error")]]
+    for batch in batches:
+        with store.engine.begin() as conn:
+            store.update_current_state(conn, batch)
+
+    plant_state = pd.read_sql("SELECT * FROM VIEW_plant_state ORDER BY plant_name", store.engine)
+    assert plant_state["plant_name"].tolist() == ["Corpse flower", "Venus flytrap"]
+    venus_flytrap = plant_state.iloc[1]
+    assert venus_flytrap["temperature"] == 20.0
+    assert venus_flytrap["avg_temp"] == 15.0
+    assert venus_flytrap["error_msg"] == "low temperature error"
+
+    store.clear_readings()
+    plant_state = pd.read_sql("SELECT * FROM VIEW_plant_state", store.engine)
+    assert plant_state["temperature"].tolist() == [20.0, 20.0]
+    assert plant_state["avg_temp"].isna().all()
+
+
+def test_read_and_clear_readings(store):
+    """Readings round-trip through FACT_plant_reading and are cleared with the summaries."""
+    readings = pd.DataFrame({"temperature": [15.5], "soil_moisture": [40.0],
+                             "recording_taken": [datetime.datetime(2025, 6, 5, 14, 30)],
+                             "last_watered": [datetime.datetime(2025, 6, 5, 9, 0)],
+                             "error_msg": [None], "plant_id": [3]})
+    with store.engine.begin() as conn:
+        store.append_readings(conn, readings)
+    assert store.read_readings()["plant_health_id"].tolist() == [1]
+
+    store.clear_readings()
+    assert store.read_readings().empty
+
+
+def test_get_store_by_backend(monkeypatch, tmp_path):
+    """STORAGE_BACKEND picks the store, unknown names are rejected."""
+    monkeypatch.setenv("STORAGE_BACKEND", "sqlite")
+    monkeypatch.setenv("STORAGE_PATH", str(tmp_path / "lnhm.db"))
+    assert isinstance(get_store(), SQLiteStore)
+    assert "MERGE SUMMARY_plant WITH (HOLDLOCK)" in str(SQLServerStore.plant_summary_sql)
+    assert "MERGE CURRENT_plant_state WITH (HOLDLOCK)" in SQLServerStore.current_state_sql
+    with pytest.raises(ValueError):
+        get_store("oracle")
+
+
+def test_local_object_store_behaves_like_s3(tmp_path):
+    """Missing keys raise NoSuchKey and a matching ETag raises 304."""
+    objects = LocalObjectStore(str(tmp_path))
+    with pytest.raises(ClientError) as exc:
+        objects.get_object(Bucket="b", Key="daily_summaries/missing.csv")
+    assert exc.value.response["Error"]["Code"] == "NoSuchKey"
+
+    etag = objects.put_object(Bucket="b", Key="daily_summaries/day.csv", Body="a,b\n1,2\n")["ETag"]
+    response = objects.get_object(Bucket="b", Key="daily_summaries/day.csv")
+    assert response["Body"].read() == b"a,b\n1,2\n"
+    assert response["ETag"] == etag
+    with pytest.raises(ClientError) as exc:
+        objects.get_object(Bucket="b", Key="daily_summaries/day.csv", IfNoneMatch=etag)
+    assert exc.value.response["Error"]["Code"] == "304"
+
+
+def test_local_object_store_conditional_puts(tmp_path):
+    """Puts conditional on an ETag, or on the object being missing, fail like S3's."""
+    objects = LocalObjectStore(str(tmp_path))
+    etag = objects.put_object(Bucket="b", Key="state.npz", Body=b"1", IfNoneMatch="*")["ETag"]
+    with pytest.raises(ClientError) as exc:
+        objects.put_object(Bucket="b", Key="state.npz", Body=b"2", IfNoneMatch="*")
+    assert exc.value.response["Error"]["Code"] == "PreconditionFailed"
+
+    objects.put_object(Bucket="b", Key="state.npz", Body=b"22", IfMatch=etag)
+    with pytest.raises(ClientError):
+        objects.put_object(Bucket="b", Key="state.npz", Body=b"3", IfMatch=etag)
+    assert objects.get_object(Bucket="b", Key="state.npz")["Body"].read() == b"22"
+
+
+def test_archive_pattern_follows_the_archive(monkeypatch):
+    """The archive is read locally under ARCHIVE_DIR, otherwise from S3_BUCKET."""
+    monkeypatch.setenv("S3_BUCKET", "lnhm-bucket")
+    monkeypatch.setenv("ARCHIVE_DIR", "/tmp/archive")
+    assert archive_pattern() == "/tmp/archive/daily_summaries/*.csv"
+    monkeypatch.delenv("ARCHIVE_DIR")
+    assert archive_pattern() == "s3://lnhm-bucket/daily_summaries/plant_readings_*.csv"
+
+
+def test_historical_store_queries_the_archive(tmp_path):
+    """DuckDB reads every archived day and filters by date."""
+    pytest.importorskip("duckdb")
+    objects = LocalObjectStore(str(tmp_path))
+    for day, temperature in (("2025-06-04", 15.0), ("2025-06-05", 17.0), ("2025-06-06", 40.0)):
+        objects.put_object(Bucket="b", Key=f"daily_summaries/plant_readings_{day}.csv",
+                           Body=f"plant_id,avg_temperature,avg_soil_moisture,recording_count,"
+                                f"last_watered,date\n1,{temperature},50.0,1440,{day} 09:00:00,{day}\n")
+
+    store = HistoricalStore(str(tmp_path / "daily_summaries" / "*.csv"))
+    start, end = datetime.date(2025, 6, 4), datetime.date(2025, 6, 5)
+    assert store.daily_summaries(start, end)["avg_temperature"].tolist() == [15.0, 17.0]
+    stats = store.plant_statistics(start, end)
+    assert stats[["days", "mean_temperature", "max_temperature"]].iloc[0].tolist() == [2, 16.0, 17.0]
@@ -0,0 +1,52 @@
+# pylint: skip-file
+
+"""Tests the shared utilities."""
+
+import sqlite3
+import pandas as pd
+import pytest
+import sqlalchemy
+from utils import read_sql_columnar
+
+
+@pytest.fixture
+def connection():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE FACT_plant_reading (plant_health_id INTEGER PRIMARY KEY, "
+                 "temperature FLOAT, error_msg TEXT)")
+    conn.executemany("INSERT INTO FACT_plant_reading VALUES (?, ?, ?)",
+                     [(1, None, "negative value error"), (2, None, None),
+                      (3, 15.5, None), (4, 16.5, None), (5, 17.5, None)])
+    return conn
+
+
+def test_read_sql_columnar_matches_read_sql(connection):
+    """Batched reads give the same frame as pd.read_sql, even when a batch is all NULL."""
+    query = "SELECT * FROM FACT_plant_reading"
+    df = read_sql_columnar(connection, query, batch_size=2)
+
+    pd.testing.assert_frame_equal(df, pd.read_sql(query, connection))
+    assert df["temperature"].dtype == "float64"
+
+
+def test_read_sql_columnar_params_and_empty_result(connection):
+    """Parameters are passed to the driver and empty results keep their columns."""
+    df = read_sql_columnar(connection, "SELECT plant_health_id FROM FACT_plant_reading "
+                           "WHERE plant_health_id > ?", params=[4])
+    assert df["plant_health_id"].tolist() == [5]
+
+    empty = read_sql_columnar(connection, "SELECT * FROM FACT_plant_reading "
+                              "WHERE plant_health_id > ?", params=[5])
+    assert empty.empty
+    assert empty.columns.tolist() == ["plant_health_id", "temperature", "error_msg"]
+
+
+def test_read_sql_columnar_sqlalchemy_engine(tmp_path):
+    """SQLAlchemy engines are read through a connection from the engine."""
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'plants.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE DIM_plant (plant_id INTEGER, plant_name TEXT)")
+        conn.exec_driver_sql("INSERT INTO DIM_plant VALUES (1, 'Venus flytrap')")
+
+    df = read_sql_columnar(engine, "SELECT * FROM DIM_plant")
+    assert df.to_dict("records") == [{"plant_id": 1, "plant_name": "Venus flytrap"}]
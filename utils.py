@@ -1,7 +1,12 @@
 """A script containing utility functions."""
+import threading
+import time
 from logging import getLogger, INFO, StreamHandler
 from sys import stdout
-import pandas as pd
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 def get_logger():
@@ -10,14 +15,19 @@ def get_logger():
 
 
 def set_logger():
-    """Set logger configuration."""
+    """Set logger configuration. Only one handler is ever added, as a
+    long-running worker calls this once per pipeline run."""
     logger = getLogger(__name__)
     logger.setLevel(INFO)
-    logger.addHandler(StreamHandler(stdout))
+    if not logger.handlers:
+        logger.addHandler(StreamHandler(stdout))
 
 
-def load_csv_to_df(file_path: str = 'data/output.csv') -> pd.DataFrame:
-    """Loads the unclean data from csv."""
+def load_csv_to_df(file_path: str = 'data/output.csv') -> "pd.DataFrame":
+    """Loads the unclean data from csv.
+    pandas is imported here so lightweight lambdas (e.g. the alerter)
+    don't pay for it just by importing this module."""
+    import pandas as pd  # pylint: disable=import-outside-toplevel
     logger = get_logger()
     if not isinstance(file_path, str):
         logger.critical("Invalid URL type.")
@@ -26,3 +36,72 @@ def load_csv_to_df(file_path: str = 'data/output.csv') -> pd.DataFrame:
         logger.critical("Filename doesn't end in .csv.")
         raise ValueError("Please end your filename in .csv.")
     return pd.read_csv(file_path)
+
+
+def _frame_from_cursor(cursor, columns: list[str], batch_size: int) -> "pd.DataFrame":
+    """Builds a DataFrame from an executed cursor, batch_size rows at a time."""
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+    frames = []
+    while rows := cursor.fetchmany(batch_size):
+        frames.append(pd.DataFrame.from_records(rows, columns=columns,
+                                                coerce_float=True))
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    if len(frames) == 1:
+        return frames[0]
+    # A batch of only NULLs comes back as object, so re-infer once combined.
+    return pd.concat(frames, ignore_index=True).infer_objects()
+
+
+def read_sql_columnar(connection, query: str, params=None,
+                      batch_size: int = 50_000) -> "pd.DataFrame":
+    """Runs a query and builds the result's NumPy columns from large
+    fetchmany batches, so the full result never exists as Python tuples
+    the way it does in pd.read_sql. Accepts a SQLAlchemy engine/connection
+    or a DBAPI connection; the query uses the driver's parameter style."""
+    if hasattr(connection, "exec_driver_sql"):
+        result = connection.exec_driver_sql(query, tuple(params or ()))
+        return _frame_from_cursor(result, list(result.keys()), batch_size)
+    if hasattr(connection, "connect"):
+        with connection.connect() as conn:
+            return read_sql_columnar(conn, query, params, batch_size)
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query, tuple(params or ()))
+        columns = [description[0] for description in cursor.description]
+        return _frame_from_cursor(cursor, columns, batch_size)
+    finally:
+        cursor.close()
+
+
+class PeriodicTask:
+    """Calls task on a daemon thread every interval seconds, measured from
+    the start of each call so slow calls don't push the schedule back,
+    until stopped. Used by the dashboard and API background refreshes."""
+
+    def __init__(self, task: Callable[[], object], interval: float, name: str):
+        self._task = task
+        self._interval = interval
+        self._name = name
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """Starts the thread if it isn't already running."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stops the thread after the current call."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self._task()
+            self._stop.wait(max(0.0, self._interval - (time.monotonic() - started)))